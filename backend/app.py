@@ -4,13 +4,15 @@ Flask Application
 Main application entry point for the CV Screening API.
 Registers blueprints and initializes services.
 """
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
 
 from src.utils.config import Config
 from src.database.db import init_db
 from src.api import jobs_bp, candidates_bp, analysis_bp, export_bp, settings_bp
+from src.services.ollama_monitor import OllamaMonitor
+from src.services.analysis_worker import AnalysisWorker
 
 
 def create_app():
@@ -42,14 +44,23 @@ def create_app():
     app.register_blueprint(export_bp)
     app.register_blueprint(settings_bp)
     
+    # Keep an Ollama health snapshot fresh in the background
+    OllamaMonitor.start()
+    
+    # Drain the persistent analysis queue (resumes work left by a restart)
+    AnalysisWorker.start()
+    
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
     def health():
-        """Health check endpoint"""
-        from src.services.ollama_client import OllamaClient
+        """
+        Health check endpoint.
         
-        ollama = OllamaClient()
-        ollama_available = ollama.check_availability()
+        Query params:
+            refresh: Probe Ollama now instead of using the background snapshot
+        """
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        ollama_available = OllamaMonitor.get_snapshot(refresh=refresh)['available']
         
         return jsonify({
             'status': 'healthy',
@@ -63,12 +74,19 @@ def create_app():
     # Status endpoint
     @app.route('/api/status', methods=['GET'])
     def status():
-        """Get system status and statistics"""
+        """
+        Get system status and statistics.
+        
+        Query params:
+            refresh: Probe Ollama now instead of using the background snapshot
+        """
         from src.services.job_service import JobService
-        from src.services.ollama_client import OllamaClient
+        from src.services.session_pool import SessionPool
+        from src.services.response_cache import ResponseCache
         
         jobs = JobService.get_all()
-        ollama = OllamaClient()
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        ollama = OllamaMonitor.get_snapshot(refresh=refresh)
         
         total_candidates = sum(job.get('total_candidates', 0) for job in jobs)
         total_analyzed = sum(job.get('excellent_count', 0) + 
@@ -83,10 +101,16 @@ def create_app():
                 'total_candidates': total_candidates,
                 'total_analyzed': total_analyzed,
                 'ollama': {
-                    'available': ollama.check_availability(),
-                    'host': ollama.host,
-                    'model': ollama.model
-                }
+                    'available': ollama['available'],
+                    'host': ollama['host'],
+                    'hosts': ollama['hosts'],
+                    'circuit': ollama['circuit'],
+                    'model': ollama['model'],
+                    'latency_ms': ollama['latency_ms'],
+                    'checked_at': ollama['checked_at'],
+                    'connections': SessionPool.get_stats()
+                },
+                'response_cache': ResponseCache.get_stats()
             }
         }), 200
     
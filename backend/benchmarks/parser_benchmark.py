@@ -0,0 +1,242 @@
+"""
+Response parser benchmark
+
+Compares ResponseParser with the per-field regex parser it replaced:
+checks that both produce identical fields for every response and times
+them. Uses the sample responses in data/responses.json, or the text
+responses stored in the LLM response cache with --from-cache.
+
+Usage (from backend/):
+    python benchmarks/parser_benchmark.py
+    python benchmarks/parser_benchmark.py --from-cache --iterations 200
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.response_parser import ResponseParser  # noqa: E402
+
+
+def legacy_parse(response: str) -> Dict[str, Any]:
+    """
+    Parse LLM response into structured data.
+
+    Copy of CVAnalyzer._parse_response before ResponseParser, without
+    _finalize_analysis (both parsers feed the same finalization).
+    """
+    # --- Pre-processing / Sanitization ---
+    # 1. Remove markdown bold/italic markers which confuse regex
+    clean_response = response.replace('**', '').replace('__', '')
+
+    # 2. Ensure critical headers are on their own lines (fix inline headers)
+    headers = [
+        'Name:', 'Email:', 'Phone:', 'Match Score:', 'Experience Years:',
+        'Matched Skills:', 'Missing Skills:', 'Education:', 
+        'Key Strengths:', 'Concerns:', 'Recommendation:', 'Summary:', 'Salary Estimate:'
+    ]
+    for header in headers:
+        # Add newline before header if it doesn't have one
+        # Use regex to replace "text Header:" with "text\nHeader:"
+        # CASE INSENSITIVE match for the header text
+        clean_response = re.sub(rf'(?<!\n)({re.escape(header)})', r'\n\1', clean_response, flags=re.IGNORECASE)
+
+    # Update response variable to use sanitized version for all closures below
+    response = clean_response
+
+    def extract(pattern: str, default: str = '') -> str:
+        """Extract single value using regex"""
+        # Updated to match sanitized response
+        match = re.search(pattern, response, re.IGNORECASE | re.MULTILINE)
+        return match.group(1).strip() if match else default
+
+    def extract_list(pattern: str) -> list:
+        """Extract comma-separated list (can be multiline)"""
+        # Use DOTALL to capture across newlines, stopping at double newline or next header
+        prefix = pattern.split('(')[0] # Extract "Header: " part
+        robust_pattern = rf'{prefix}(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)'
+
+        match = re.search(robust_pattern, response, re.IGNORECASE | re.DOTALL)
+        if match:
+            content = match.group(1)
+
+            # Extra safety: remove any text that looks like a known header from content
+            for header in headers:
+               if header.lower() in content.lower():
+                   # Cut off content before the next header if it leaked in
+                   idx = content.lower().find(header.lower())
+                   if idx > 0:
+                       content = content[:idx]
+
+            # Normalize separators:
+            # 1. Replace newlines with commas (handles vertical lists)
+            content = content.replace('\n', ',')
+
+            # 2. Replace common bullet separators (*, -, •) with commas
+            # Matches: start/space + bullet + space/end
+            # Uses regex to avoid replacing hyphens in words like "cross-functional"
+            content = re.sub(r'(?:^|\s)(?:[\*•\-])(?:\s|$)', ',', content)
+
+            items = content.split(',')
+            return [item.strip() for item in items if item.strip()]
+        return []
+
+    def extract_bullets(header: str) -> list:
+        """Extract bullet point list handling various formats"""
+        bullets = []
+
+        # Try multiple patterns for flexibility
+        patterns = [
+            # Pattern 1: Header followed by newline then bullets
+            rf'{header}:\s*\n(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)',
+            # Pattern 2: Header with content on same line or next lines  
+            rf'{header}:\s*(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)',
+            # Pattern 3: Just find header and grab everything after until next section
+            rf'{header}[:\s]+(.*?)(?:Concerns|Recommendation|Summary|$)',
+        ]
+
+        content = None
+        for pattern in patterns:
+            match = re.search(pattern, response, re.IGNORECASE | re.DOTALL)
+            if match and match.group(1).strip():
+                content = match.group(1).strip()
+                break
+
+        if not content:
+            return []
+
+        # Split by newlines first
+        lines = content.split('\n')
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            # Skip if this looks like another header
+            if re.match(r'^[A-Z][a-z]+:', line):
+                break
+
+            # Remove common bullet markers (•, -, *, 1., etc.)
+            cleaned = re.sub(r'^[\s•\-\*\>\+]+|^\d+[\.\)]\s*', '', line).strip()
+
+            # Skip very short or empty results
+            if cleaned and len(cleaned) > 3:
+                bullets.append(cleaned)
+
+        return bullets
+
+
+    # Extract score with validation
+    score_str = extract(r'Match Score:\s*(\d+)', '0')
+    score = int(score_str) if score_str.isdigit() else 0
+    score = max(0, min(100, score))  # Clamp between 0-100
+
+    # Extract experience years with validation
+    exp_str = extract(r'Experience Years:\s*(\d+)', '0')
+    experience_years = int(exp_str) if exp_str.isdigit() else 0
+
+    # Extract all fields
+    analysis = {
+        'name': extract(r'Name:\s*(.+?)(?:\n|$)', 'Unknown Candidate'),
+        'email': extract(r'Email:\s*([^\s]+@[^\s]+|\S+@\S+|Not provided)', None),
+        'phone': extract(r'Phone:\s*([+\d\s\-()]+|Not provided)', None),
+        'score': score,
+        'experience_years': experience_years,
+        'matched_skills': extract_list(r'Matched Skills:\s*(.+?)(?:\n|$)'),
+        'missing_skills': extract_list(r'Missing Skills:\s*(.+?)(?:\n|$)'),
+        'education': {
+            'summary': extract(r'Education:\s*(.+?)(?:\n|$)', 'Not specified')
+        },
+        'strengths': extract_bullets('Key Strengths'),
+        'concerns': extract_bullets('Concerns'),
+        'summary': extract(r'Summary:\s*(.+?)(?:\n\n|$)', 'No summary provided'),
+        'salary_estimate': extract(r'Salary Estimate:\s*(.+?)(?:\n|$)', 'Not available')
+    }
+
+    return analysis
+
+def load_corpus(from_cache: bool) -> List[str]:
+    """
+    Load the responses to parse.
+
+    Args:
+        from_cache: Read text responses from the llm_cache table instead
+            of the bundled samples
+
+    Returns:
+        List of raw responses
+    """
+    if not from_cache:
+        path = Path(__file__).resolve().parent / 'data' / 'responses.json'
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    from src.database.db import get_db
+
+    responses = []
+    with get_db() as conn:
+        for row in conn.execute('SELECT result FROM llm_cache'):
+            text = json.loads(row['result']).get('response', '')
+            # Structured (JSON) responses don't go through the text parser
+            if text and not text.lstrip().startswith('{'):
+                responses.append(text)
+    return responses
+
+
+def time_parser(parse, corpus: List[str], iterations: int) -> float:
+    """Seconds per response, best of three runs"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for response in corpus:
+                parse(response)
+        best = min(best, time.perf_counter() - start)
+    return best / (iterations * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis response parser')
+    parser.add_argument('--from-cache', action='store_true',
+                        help='use responses from the LLM response cache')
+    parser.add_argument('--iterations', type=int, default=500,
+                        help='passes over the corpus per timing run')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.from_cache)
+    if not corpus:
+        print("⚠️  No responses to parse")
+        return 1
+
+    print(f"🧪 Parsing {len(corpus)} responses")
+
+    mismatches = 0
+    for i, response in enumerate(corpus):
+        expected, actual = legacy_parse(response), ResponseParser.parse(response)
+        if expected != actual:
+            mismatches += 1
+            print(f"❌ Response {i} differs")
+            for key in expected:
+                if expected[key] != actual.get(key):
+                    print(f"   {key}: {expected[key]!r} != {actual.get(key)!r}")
+
+    if mismatches:
+        print(f"❌ {mismatches} of {len(corpus)} responses parsed differently")
+        return 1
+    print(f"✅ Identical output for all {len(corpus)} responses")
+
+    legacy = time_parser(legacy_parse, corpus, args.iterations)
+    current = time_parser(ResponseParser.parse, corpus, args.iterations)
+    print(f"⏱️  Regex-per-field parser: {legacy * 1e6:8.1f} µs/response")
+    print(f"⏱️  ResponseParser:         {current * 1e6:8.1f} µs/response")
+    print(f"🚀 Speedup: {legacy / current:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,27 +2,39 @@
 Analysis API Blueprint
 
 Handles CV analysis endpoints:
-- Start/resume analysis for a job
+- Queue analysis of a job's pending candidates (run by AnalysisWorker)
+- Pause, resume or cancel a job's analysis
 - Get analysis progress/status
+- Re-analyze candidates scored with an outdated prompt
 """
+import math
+
 from flask import Blueprint, request, jsonify
 from src.services.job_service import JobService
 from src.services.candidate_service import CandidateService
-from src.services.cv_analyzer import CVAnalyzer
+from src.services.cv_analyzer import CVAnalyzer, AnalysisCancelledError
+from src.services.analysis_progress import AnalysisProgress
+from src.services.analysis_queue import AnalysisQueue
+from src.services.analysis_worker import AnalysisWorker
+from src.services.circuit_breaker import OllamaUnavailableError
+from src.services.ollama_client import OllamaClient
+from src.utils.config import Config
 
 bp = Blueprint('analysis', __name__, url_prefix='/api')
 
-# Track active analysis jobs in memory
-# This prevents "stuck" in_progress states if the server restarts or requests fail
-ACTIVE_ANALYSES = set()
-
-
 @bp.route('/jobs/<int:job_id>/analyze', methods=['POST'])
 def start_analysis(job_id):
     """
     Start or resume CV analysis for a job asynchronously.
     
-    This returns immediately so the UI can poll for progress.
+    Pending candidates are added to the persistent analysis queue and
+    analyzed by the background worker, so the analysis survives a server
+    restart. This returns immediately so the UI can poll for progress.
+    
+    Body (JSON - optional):
+        {
+            "weight": 2  // Share of analysis slots relative to other running jobs
+        }
     """
     try:
         # Check if job exists
@@ -33,17 +45,26 @@ def start_analysis(job_id):
                 'message': f'Job {job_id} not found'
             }), 404
         
-        # Check if already running
-        if job_id in ACTIVE_ANALYSES:
-            return jsonify({
-                'status': 'success',
-                'message': 'Analysis already in progress',
-                'data': {'job_id': job_id}
-            }), 200
-
+        data = request.get_json(silent=True) or {}
+        weight = data.get('weight')
+        if weight is not None:
+            try:
+                weight = float(weight)
+            except (TypeError, ValueError):
+                return jsonify({
+                    'status': 'error',
+                    'message': 'weight must be a number'
+                }), 400
+            if weight <= 0:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'weight must be greater than 0'
+                }), 400
+        
+        result = AnalysisWorker.submit(job_id, weight=weight)
+        
         # Check if there are pending candidates
-        pending = CandidateService.get_pending(job_id)
-        if not pending:
+        if not result['pending']:
             return jsonify({
                 'status': 'success',
                 'message': 'No pending candidates to analyze',
@@ -54,49 +75,25 @@ def start_analysis(job_id):
                 }
             }), 200
         
-        # Mark job as active BEFORE starting thread to avoid race condition
-        # where polling checks status before thread has started
-        ACTIVE_ANALYSES.add(job_id)
-        
-        # Start analysis in background thread
-        import threading
-        thread = threading.Thread(target=run_async_analysis, args=(job_id,))
-        thread.daemon = True # Ensure thread dies if server restarts
-        thread.start()
+        if not result['queued'] and result['already_queued']:
+            return jsonify({
+                'status': 'success',
+                'message': 'Analysis already in progress',
+                'data': result
+            }), 200
         
         return jsonify({
             'status': 'success',
             'message': 'Analysis started in background',
-            'data': {'job_id': job_id}
+            'data': result
         }), 202  # Accepted
             
     except Exception as e:
-        ACTIVE_ANALYSES.discard(job_id) # Cleanup on error
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
-def run_async_analysis(job_id):
-    """
-    Background worker for analysis
-    """
-    try:
-        print(f"⚡ [ASYNC] Starting analysis for job {job_id}", flush=True)
-        # ACTIVE_ANALYSES.add(job_id) # Already added in main thread
-        
-        # Initialize analyzer - create new instance for this thread
-        analyzer = CVAnalyzer()
-        result = analyzer.analyze_batch(job_id)
-        
-        print(f"✅ [ASYNC] Analysis complete for job {job_id}", flush=True)
-        
-    except Exception as e:
-        print(f"❌ [ASYNC] Error in analysis thread: {e}", flush=True)
-        
-    finally:
-        ACTIVE_ANALYSES.discard(job_id)
-
 
 @bp.route('/jobs/<int:job_id>/analyze/status', methods=['GET'])
 def get_analysis_status(job_id):
@@ -126,17 +123,22 @@ def get_analysis_status(job_id):
         
         progress_percentage = (analyzed / total * 100) if total > 0 else 0
         
-        # Determine status - FIXED LOGIC WITH ACTIVE TRACKING:
+        queue = AnalysisQueue.get_counts(job_id)
+        
+        # Determine status from the persistent queue (shared by all processes)
         if total == 0:
             analysis_status = 'no_candidates'
         elif pending == 0:
             # All candidates processed
             analysis_status = 'complete'
-        elif job_id in ACTIVE_ANALYSES:
-            # Actively running in this server process
+        elif queue['paused'] and (queue['queued'] or queue['leased']):
+            # Queue kept but not claimed (candidates in progress still finish)
+            analysis_status = 'paused'
+        elif queue['queued'] or queue['leased']:
+            # Queued or being analyzed by a worker
             analysis_status = 'in_progress'
         else:
-            # Has pending items but NOT running (e.g. paused, crashed, or waiting)
+            # Has pending items but NOT queued (e.g. never started or deferred)
             # This allows the UI to enable the "Analyze" button so user can resume
             analysis_status = 'pending'
         
@@ -157,7 +159,10 @@ def get_analysis_status(job_id):
                     'average': stats.get('average', 0),
                     'below_average': stats.get('below_average', 0)
                 },
-                'average_score': stats.get('avg_score')
+                'average_score': stats.get('avg_score'),
+                'queue': queue,
+                # Fields parsed so far for candidates still streaming
+                'in_flight': AnalysisProgress.get(job_id)
             }
         }), 200
         
@@ -168,6 +173,114 @@ def get_analysis_status(job_id):
         }), 500
 
 
+@bp.route('/jobs/<int:job_id>/analyze/pause', methods=['POST'])
+def pause_analysis(job_id):
+    """
+    Pause a job's analysis.
+    
+    Takes effect between candidates: those already being analyzed finish,
+    the rest stay queued until the analysis is resumed.
+    
+    Returns:
+        JSON with the job's queue state
+    """
+    try:
+        job = JobService.get_by_id(job_id)
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'message': f'Job {job_id} not found'
+            }), 404
+        
+        if not AnalysisWorker.pause(job_id):
+            return jsonify({
+                'status': 'error',
+                'message': 'No analysis in progress for this job'
+            }), 400
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Analysis paused',
+            'data': {'job_id': job_id, 'queue': AnalysisQueue.get_counts(job_id)}
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/jobs/<int:job_id>/analyze/resume', methods=['POST'])
+def resume_analysis(job_id):
+    """
+    Resume a paused analysis.
+    
+    Returns:
+        JSON with the job's queue state
+    """
+    try:
+        job = JobService.get_by_id(job_id)
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'message': f'Job {job_id} not found'
+            }), 404
+        
+        if not AnalysisWorker.resume(job_id):
+            return jsonify({
+                'status': 'error',
+                'message': 'Analysis of this job is not paused'
+            }), 400
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Analysis resumed',
+            'data': {'job_id': job_id, 'queue': AnalysisQueue.get_counts(job_id)}
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/jobs/<int:job_id>/analyze/cancel', methods=['POST'])
+def cancel_analysis(job_id):
+    """
+    Cancel a job's analysis.
+    
+    Queued candidates are removed from the queue and the Ollama requests
+    in progress are aborted. All of them stay pending, so the analysis
+    can be started again (e.g. after switching the model).
+    
+    Returns:
+        JSON with the number of removed and aborted candidates
+    """
+    try:
+        job = JobService.get_by_id(job_id)
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'message': f'Job {job_id} not found'
+            }), 404
+        
+        result = AnalysisWorker.cancel(job_id)
+        
+        return jsonify({
+            'status': 'success',
+            'message': f"Analysis cancelled: {result['removed']} queued, {result['aborted']} in progress",
+            'data': result
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
 @bp.route('/jobs/<int:job_id>/analyze/retry', methods=['POST'])
 def retry_failed_analysis(job_id):
     """
@@ -175,7 +288,8 @@ def retry_failed_analysis(job_id):
     
     Body (JSON - optional):
         {
-            "candidate_ids": [1, 2, 3]  // Specific candidates to retry
+            "candidate_ids": [1, 2, 3],  // Specific candidates to retry
+            "bypass_cache": false        // Force fresh generations
         }
     
     Returns:
@@ -206,15 +320,65 @@ def retry_failed_analysis(job_id):
                             ('pending', cid)
                         )
         
-        # Now analyze pending (including retried ones)
-        analyzer = CVAnalyzer()
-        result = analyzer.analyze_batch(job_id)
+        # Now queue pending (including retried ones)
+        result = AnalysisWorker.submit(job_id, bypass_cache=bool(data.get('bypass_cache')))
         
         return jsonify({
             'status': 'success',
-            'message': f"Retry complete: {result['analyzed']} analyzed, {result['errors']} errors",
+            'message': f"Retry queued: {result['queued']} candidates",
             'data': result
-        }), 200
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/jobs/<int:job_id>/analyze/outdated', methods=['POST'])
+def rescore_outdated(job_id):
+    """
+    Re-analyze candidates scored with an older prompt template.
+    
+    Candidates whose stored prompt_version differs from the current
+    template are reset to pending and analyzed in the background.
+    
+    Body (JSON - optional):
+        {
+            "include_unversioned": true  // Also re-analyze candidates analyzed
+                                         // before prompt versions were recorded
+        }
+    
+    Returns:
+        JSON with the number of outdated candidates
+    """
+    try:
+        job = JobService.get_by_id(job_id)
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'message': f'Job {job_id} not found'
+            }), 404
+        
+        data = request.get_json(silent=True) or {}
+        analyzer = CVAnalyzer()
+        outdated = CandidateService.reset_outdated(job_id, analyzer.prompt_version,
+                                                   bool(data.get('include_unversioned')))
+        if not outdated:
+            return jsonify({
+                'status': 'success',
+                'message': 'All candidates were analyzed with the current prompt',
+                'data': {'job_id': job_id, 'outdated': 0, 'prompt_version': analyzer.prompt_version}
+            }), 200
+        
+        AnalysisWorker.submit(job_id)
+        
+        return jsonify({
+            'status': 'success',
+            'message': f'Re-analyzing {outdated} candidates in background',
+            'data': {'job_id': job_id, 'outdated': outdated, 'prompt_version': analyzer.prompt_version}
+        }), 202
         
     except Exception as e:
         return jsonify({
@@ -228,6 +392,20 @@ def analyze_single_candidate(candidate_id):
     """
     Force re-analysis of a single candidate.
     
+    The candidate is analyzed by the queue worker ahead of any batch work;
+    the request waits up to QUEUE_PRIORITY_TIMEOUT for the result, then
+    answers 202 with the URL to poll (the candidate stays queued). While
+    Ollama is unavailable it answers 503 with Retry-After, and 409 if the
+    job's analysis is cancelled before the candidate ran. Identical
+    prompts are answered from the response cache unless the request asks
+    for a re-roll.
+    
+    Body (JSON - optional):
+        {
+            "bypass_cache": true,  // Generate a fresh response
+            "full_model": true     // Skip the cascade's fast model
+        }
+    
     Returns:
         JSON with new analysis results
     """
@@ -248,15 +426,33 @@ def analyze_single_candidate(candidate_id):
                 'message': f'Job {candidate["job_id"]} not found'
             }), 404
             
-        # Initialize analyzer
-        analyzer = CVAnalyzer()
+        data = request.get_json(silent=True) or {}
         
-        # Run analysis (this saves results to DB automatically)
-        result = analyzer.analyze_candidate(
-            candidate_id=candidate_id,
-            cv_text=candidate['cv_text'],
-            job=job
-        )
+        # Runs ahead of queued batch work, within the global in-flight limit
+        try:
+            result = AnalysisWorker.analyze_now(
+                candidate,
+                bypass_cache=bool(data.get('bypass_cache')),
+                full_model=bool(data.get('full_model'))
+            )
+        except OllamaUnavailableError as e:
+            retry_after = OllamaClient().breaker.get_status()['retry_in_seconds'] or Config.OLLAMA_BREAKER_COOLDOWN
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 503, {'Retry-After': str(math.ceil(retry_after))}
+        except AnalysisCancelledError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 409
+        except TimeoutError:
+            poll_url = f'/api/candidates/{candidate_id}'
+            return jsonify({
+                'status': 'success',
+                'message': 'Re-analysis queued; poll the candidate until it is no longer queued',
+                'data': {'candidate_id': candidate_id, 'queued': True, 'poll_url': poll_url}
+            }), 202, {'Location': poll_url}
         
         return jsonify({
             'status': 'success',
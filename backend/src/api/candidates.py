@@ -7,6 +7,7 @@ Handles candidate-related endpoints:
 - List candidates for a job
 - Get candidate details
 - Delete candidates
+- Match candidates against other jobs
 """
 from flask import Blueprint, request, jsonify, send_file
 from werkzeug.utils import secure_filename
@@ -17,6 +18,11 @@ from pathlib import Path
 
 from src.services.job_service import JobService
 from src.services.candidate_service import CandidateService
+from src.services.analysis_queue import AnalysisQueue
+from src.services.analysis_worker import AnalysisWorker
+from src.services.embedding_service import EmbeddingService
+from src.services.job_matcher import JobMatcher, DuplicateMatchError
+from src.services.settings_service import SettingsService
 from src.core.pdf_extractor import PDFExtractor
 from src.utils.config import Config
 
@@ -31,6 +37,8 @@ def list_candidates(job_id):
     Query params:
         category: Filter by category (excellent, good, average, below_average)
         status: Filter by status (pending, analyzed, error)
+        sort: 'similarity' to rank by embedding similarity to the job
+              (works before any LLM analysis); default is by score
     
     Returns:
         JSON array of candidates
@@ -53,6 +61,20 @@ def list_candidates(job_id):
             status=status
         )
         
+        if request.args.get('sort') == 'similarity':
+            try:
+                # CVs still being embedded get similarity None and go last
+                similarities = EmbeddingService.rank_candidates(job, candidates, stored_only=True)
+            except (ConnectionError, ValueError) as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Similarity ranking unavailable: {e}'
+                }), 503
+            for candidate in candidates:
+                candidate['similarity'] = similarities.get(candidate['id'])
+            candidates.sort(key=lambda c: -2 if c['similarity'] is None else c['similarity'],
+                            reverse=True)
+        
         return jsonify({
             'status': 'success',
             'data': candidates,
@@ -109,6 +131,7 @@ def upload_candidates(job_id):
             'candidates': [],
             'errors': []
         }
+        cv_texts = []
         
         # Process each file
         for file in files:
@@ -145,6 +168,7 @@ def upload_candidates(job_id):
                     cv_text=cv_text,
                     file_path=unique_name
                 )
+                cv_texts.append(cv_text)
                 
                 results['uploaded'] += 1
                 results['candidates'].append({
@@ -166,6 +190,10 @@ def upload_candidates(job_id):
                 if filepath.exists():
                     filepath.unlink()
         
+        # Embed the new CVs and rank them against the other active jobs in the background
+        EmbeddingService.embed_async(cv_texts)
+        JobMatcher.process_new_async([c['id'] for c in results['candidates']])
+        
         status_code = 200 if results['uploaded'] > 0 else 400
         
         return jsonify({
@@ -233,6 +261,9 @@ def paste_candidate_text(job_id):
         
         candidate = CandidateService.get_by_id(candidate_id)
         
+        EmbeddingService.embed_async([cv_text])
+        JobMatcher.process_new_async([candidate_id])
+        
         return jsonify({
             'status': 'success',
             'message': 'CV text added successfully. Analyze to extract candidate details.',
@@ -261,8 +292,14 @@ def get_candidate(candidate_id):
     """
     Get candidate details by ID.
     
+    Candidates analyzed in triage mode get their detail fields
+    (strengths, concerns, summary, ...) queued for generation on first
+    view. If they aren't ready within QUEUE_DETAILS_TIMEOUT the triage
+    result is returned with details_pending still set.
+    
     Returns:
-        JSON with candidate details
+        JSON with candidate details; queued is true while an analysis or
+        details generation of the candidate is waiting or running
     """
     try:
         candidate = CandidateService.get_by_id(candidate_id)
@@ -276,10 +313,15 @@ def get_candidate(candidate_id):
         # Get job info
         job = JobService.get_by_id(candidate['job_id'])
         
+        if candidate.get('details_pending') and job:
+            candidate = AnalysisWorker.request_details(job['id'], [candidate],
+                                                       Config.QUEUE_DETAILS_TIMEOUT)[0]
+        
         return jsonify({
             'status': 'success',
             'data': {
                 'candidate': candidate,
+                'queued': AnalysisQueue.is_queued(candidate_id),
                 'job': {
                     'id': job['id'],
                     'title': job['title'],
@@ -430,3 +472,136 @@ def get_candidate_cv(candidate_id):
         )
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@bp.route('/candidates/<int:candidate_id>/matches', methods=['GET'])
+def get_candidate_matches(candidate_id):
+    """
+    Get other active jobs this candidate's CV matches.
+    
+    Query params:
+        refresh: Re-rank against all active jobs now (default: true if
+                 no matches are stored yet)
+        top_k: Maximum number of proposals (default: cross_job_top_k setting)
+        min_similarity: Minimum similarity (default: cross_job_min_similarity setting)
+    
+    Returns:
+        JSON with proposed, added and dismissed matches
+    """
+    try:
+        candidate = CandidateService.get_by_id(candidate_id)
+        if not candidate:
+            return jsonify({
+                'status': 'error',
+                'message': f'Candidate {candidate_id} not found'
+            }), 404
+        
+        matches = JobMatcher.get_matches(candidate_id)
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        
+        if refresh or not matches:
+            try:
+                settings = SettingsService.get_settings()
+                matches = JobMatcher.find_matches(
+                    candidate_id,
+                    top_k=request.args.get('top_k', int(settings.get('cross_job_top_k', 3)), type=int),
+                    min_similarity=request.args.get(
+                        'min_similarity', float(settings.get('cross_job_min_similarity', 0.6)), type=float
+                    )
+                )
+            except ConnectionError as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Job matching unavailable: {e}'
+                }), 503
+        
+        return jsonify({
+            'status': 'success',
+            'data': matches,
+            'count': len(matches)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/candidates/<int:candidate_id>/matches/<int:job_id>', methods=['POST'])
+def accept_candidate_match(candidate_id, job_id):
+    """
+    Add the candidate's CV to another job as a pending candidate.
+    
+    Returns:
+        JSON with the new candidate ID (409 if the job already has the CV)
+    """
+    try:
+        job = JobService.get_by_id(job_id)
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'message': f'Job {job_id} not found'
+            }), 404
+        
+        try:
+            new_id = JobMatcher.accept(candidate_id, job_id)
+        except DuplicateMatchError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 409
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        if new_id is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'Candidate {candidate_id} not found'
+            }), 404
+        
+        return jsonify({
+            'status': 'success',
+            'message': f"Candidate added to {job['title']}. Analyze the job to score them.",
+            'data': {
+                'id': new_id,
+                'job_id': job_id,
+                'status': 'pending'
+            }
+        }), 201
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/candidates/<int:candidate_id>/matches/<int:job_id>', methods=['DELETE'])
+def dismiss_candidate_match(candidate_id, job_id):
+    """
+    Dismiss a proposed match.
+    
+    Returns:
+        JSON confirmation
+    """
+    try:
+        if not JobMatcher.dismiss(candidate_id, job_id):
+            return jsonify({
+                'status': 'error',
+                'message': f'No proposed match of candidate {candidate_id} for job {job_id}'
+            }), 404
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Match dismissed'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
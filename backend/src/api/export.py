@@ -11,6 +11,8 @@ from datetime import datetime
 
 from src.services.job_service import JobService
 from src.services.candidate_service import CandidateService
+from src.services.analysis_worker import AnalysisWorker
+from src.utils.config import Config
 
 bp = Blueprint('export', __name__, url_prefix='/api')
 
@@ -24,6 +26,9 @@ def export_candidates(job_id):
         format: 'csv' or 'excel' (default: csv)
         category: Filter by category (optional)
         min_score: Minimum score threshold (optional)
+        details: Wait up to QUEUE_DETAILS_TIMEOUT for pending triage
+            details before export (default: true); candidates still
+            waiting are exported with their details marked pending
     
     Returns:
         File download
@@ -55,6 +60,10 @@ def export_candidates(job_id):
                 'message': 'No candidates found matching criteria'
             }), 404
         
+        # Triaged candidates only have score and contact until details are generated
+        if request.args.get('details', 'true').lower() == 'true':
+            candidates = AnalysisWorker.request_details(job_id, candidates, Config.QUEUE_DETAILS_TIMEOUT)
+        
         # Generate filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{job['company']}_{job['title']}_candidates_{timestamp}"
@@ -71,6 +80,22 @@ def export_candidates(job_id):
         }), 500
 
 
+def _summary(candidate):
+    """
+    Summary column of a candidate.
+    
+    Args:
+        candidate: Candidate dictionary
+    
+    Returns:
+        Summary text, or a marker for triaged candidates whose details
+        are not generated yet
+    """
+    if candidate.get('details_pending'):
+        return 'Details pending'
+    return candidate.get('summary', '')
+
+
 def _export_csv(candidates, job, filename):
     """
     Export candidates as CSV.
@@ -126,7 +151,7 @@ def _export_csv(candidates, job, filename):
             ', '.join(candidate.get('missing_skills', [])),
             ' | '.join(candidate.get('strengths', [])),
             ' | '.join(candidate.get('concerns', [])),
-            candidate.get('summary', ''),
+            _summary(candidate),
             candidate.get('original_filename', '')
         ])
     
@@ -175,7 +200,7 @@ def _export_excel(candidates, job, filename):
                 'Missing Skills': ', '.join(candidate.get('missing_skills', [])),
                 'Strengths': ' | '.join(candidate.get('strengths', [])),
                 'Concerns': ' | '.join(candidate.get('concerns', [])),
-                'Summary': candidate.get('summary', ''),
+                'Summary': _summary(candidate),
                 'File': candidate.get('original_filename', '')
             })
         
@@ -7,6 +7,8 @@ Handles all job-related endpoints:
 """
 from flask import Blueprint, request, jsonify
 from src.services.job_service import JobService
+from src.services.telemetry_service import TelemetryService
+from src.services.embedding_service import EmbeddingService
 from werkzeug.exceptions import BadRequest
 
 bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
@@ -71,6 +73,8 @@ def create_job():
         # Create job
         job_id = JobService.create(data)
         job = JobService.get_by_id(job_id)
+        # Embedded up front so similarity ranking never waits on the model
+        EmbeddingService.embed_async([EmbeddingService.job_text(job)])
         
         return jsonify({
             'status': 'success',
@@ -149,6 +153,7 @@ def update_job(job_id):
         # Update job
         JobService.update(job_id, data)
         updated_job = JobService.get_by_id(job_id)
+        EmbeddingService.embed_async([EmbeddingService.job_text(updated_job)])
         
         return jsonify({
             'status': 'success',
@@ -206,7 +211,8 @@ def get_job_stats(job_id):
     Get detailed statistics for a job.
     
     Returns:
-        JSON with candidate statistics
+        JSON with candidate statistics and LLM telemetry per model
+        (token counts, tokens/sec, prompt vs generation time, load stalls)
     """
     try:
         # Check if job exists
@@ -224,7 +230,8 @@ def get_job_stats(job_id):
             'data': {
                 'job_id': job_id,
                 'job_title': job['title'],
-                'statistics': stats
+                'statistics': stats,
+                'telemetry': TelemetryService.get_job_summary(job_id)
             }
         }), 200
         
@@ -1,25 +1,32 @@
 from flask import Blueprint, request, jsonify
 from src.services.settings_service import SettingsService
 from src.services.ollama_client import OllamaClient
+from src.services.ollama_monitor import OllamaMonitor
 
 bp = Blueprint('settings', __name__, url_prefix='/api/settings')
 
 @bp.route('', methods=['GET'])
 def get_settings():
-    """Get current settings and available models"""
+    """
+    Get current settings and available models.
+    
+    Query params:
+        refresh: Probe Ollama now instead of using the background snapshot
+    """
     try:
         settings = SettingsService.get_settings()
         
-        # Get available models from Ollama
-        client = OllamaClient()
-        available_models = client.get_models()
+        # Model list comes from the background Ollama snapshot
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        ollama = OllamaMonitor.get_snapshot(refresh=refresh)
         
         return jsonify({
             'status': 'success',
             'data': {
                 'settings': settings,
-                'available_models': available_models,
-                'ollama_connected': client.check_availability()
+                'available_models': ollama['models'],
+                'ollama_connected': ollama['available'],
+                'checked_at': ollama['checked_at']
             }
         })
     except Exception as e:
@@ -48,3 +55,28 @@ def update_settings():
             'status': 'error',
             'message': str(e)
         }), 500
+
+@bp.route('/warmup', methods=['POST'])
+def warm_up_model():
+    """Pre-load the configured model into Ollama's memory"""
+    try:
+        client = OllamaClient()
+        result = client.warm_up()
+        
+        if not result['loaded']:
+            return jsonify({
+                'status': 'error',
+                'message': f"Failed to load model {result['model']}: {result['error']}",
+                'data': result
+            }), 503
+        
+        return jsonify({
+            'status': 'success',
+            'message': f"Model {result['model']} loaded",
+            'data': result
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
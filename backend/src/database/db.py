@@ -21,6 +21,9 @@ def init_db():
     DATABASE_PATH.parent.mkdir(exist_ok=True)
     
     with get_db() as conn:
+        # WAL lets readers (status polling) proceed while analysis workers write
+        conn.execute('PRAGMA journal_mode=WAL')
+        
         conn.executescript('''
             -- Jobs Table
             CREATE TABLE IF NOT EXISTS jobs (
@@ -75,12 +78,115 @@ def init_db():
                 FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
             );
             
+            -- LLM Response Cache (content-addressed, LRU by last_used_at)
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,             -- hash of model, prompt and options
+                model TEXT NOT NULL,
+                result TEXT NOT NULL,             -- JSON Ollama result
+                size INTEGER NOT NULL,            -- bytes of result
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER DEFAULT 0
+            );
+            
+            -- LLM Telemetry (one row per Ollama call)
+            CREATE TABLE IF NOT EXISTS llm_telemetry (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                candidate_id INTEGER,
+                job_id INTEGER,
+                model TEXT NOT NULL,
+                stage TEXT DEFAULT 'analysis',    -- which step made the call
+                prompt_version TEXT,              -- hash of the prompt template
+                host TEXT,
+                cached INTEGER DEFAULT 0,         -- served from response cache
+                stopped_early INTEGER DEFAULT 0,  -- counters estimated from stream
+                done_reason TEXT,
+                prompt_eval_count INTEGER,
+                eval_count INTEGER,
+                total_duration INTEGER,           -- nanoseconds (as reported by Ollama)
+                load_duration INTEGER,
+                prompt_eval_duration INTEGER,
+                eval_duration INTEGER,
+                first_token_duration INTEGER,     -- time to the first streamed token
+                estimated INTEGER,                -- timings estimated from a cut stream
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                
+                FOREIGN KEY (candidate_id) REFERENCES candidates(id) ON DELETE CASCADE,
+                FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            );
+            
+            -- Embeddings (content-addressed, shared by identical texts)
+            CREATE TABLE IF NOT EXISTS embeddings (
+                content_hash TEXT NOT NULL,       -- sha256 of the embedded text
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,             -- unit-length float32 array
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                
+                PRIMARY KEY (content_hash, model)
+            );
+            
+            -- Cross-job matches proposed for a candidate's CV
+            CREATE TABLE IF NOT EXISTS job_matches (
+                candidate_id INTEGER NOT NULL,
+                job_id INTEGER NOT NULL,
+                similarity REAL,
+                status TEXT DEFAULT 'proposed',   -- proposed, added, dismissed
+                matched_candidate_id INTEGER,     -- candidate created in job_id when added
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                
+                PRIMARY KEY (candidate_id, job_id),
+                FOREIGN KEY (candidate_id) REFERENCES candidates(id) ON DELETE CASCADE,
+                FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            );
+            
+            -- Durable analysis queue (one row per candidate waiting or being analyzed)
+            CREATE TABLE IF NOT EXISTS analysis_queue (
+                candidate_id INTEGER PRIMARY KEY,
+                job_id INTEGER NOT NULL,
+                status TEXT DEFAULT 'queued',     -- queued, leased
+                position INTEGER DEFAULT 0,       -- order within the job's batch
+                priority INTEGER DEFAULT 0,       -- single-candidate work jumps the queue
+                kind TEXT DEFAULT 'analysis',     -- analysis, or details of a triaged candidate
+                bypass_cache INTEGER DEFAULT 0,
+                full_model INTEGER DEFAULT 0,     -- skip the cascade's fast model
+                attempts INTEGER DEFAULT 0,       -- claims so far (a lost lease counts)
+                lease_owner TEXT,                 -- worker holding the lease (host:pid)
+                lease_expires_at REAL,
+                heartbeat_at REAL,
+                enqueued_at REAL NOT NULL,
+                progress_model TEXT,              -- model streaming the analysis
+                progress_fields TEXT,             -- JSON of the fields parsed so far
+                progress_started_at REAL,
+                progress_updated_at REAL,
+                
+                FOREIGN KEY (candidate_id) REFERENCES candidates(id) ON DELETE CASCADE,
+                FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            );
+            
+            -- Fair-share state of jobs in the analysis queue (stride scheduling)
+            CREATE TABLE IF NOT EXISTS analysis_shares (
+                job_id INTEGER PRIMARY KEY,
+                weight REAL DEFAULT 1,            -- relative share of analysis slots
+                pass REAL DEFAULT 0,              -- virtual time; lowest pass is served next
+                paused INTEGER DEFAULT 0,         -- keeps its entries but is not claimed
+                cancelled_at REAL,                -- last cancel (tells waiting re-analyses apart)
+                
+                FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            );
+            
             -- Indexes for performance
             CREATE INDEX IF NOT EXISTS idx_candidates_job_id ON candidates(job_id);
             CREATE INDEX IF NOT EXISTS idx_candidates_category ON candidates(category);
             CREATE INDEX IF NOT EXISTS idx_candidates_status ON candidates(status);
             CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
             CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at);
+            CREATE INDEX IF NOT EXISTS idx_llm_telemetry_job ON llm_telemetry(job_id, model);
+            CREATE INDEX IF NOT EXISTS idx_llm_telemetry_model ON llm_telemetry(model, prompt_version, stage);
+            CREATE INDEX IF NOT EXISTS idx_llm_telemetry_candidate ON llm_telemetry(candidate_id);
+            CREATE INDEX IF NOT EXISTS idx_analysis_queue_claim ON analysis_queue(status, enqueued_at, position);
+            CREATE INDEX IF NOT EXISTS idx_analysis_queue_job ON analysis_queue(job_id, status);
         ''')
         
         # Migration: Add file_path column if not exists
@@ -97,6 +203,42 @@ def init_db():
         except sqlite3.OperationalError:
             pass # Column already exists
     
+        # Migration: Add prescreened flag (rejected by the lexical pre-screen, no LLM call)
+        try:
+            conn.execute('ALTER TABLE candidates ADD COLUMN prescreened INTEGER DEFAULT 0')
+            print("  ✨ Added prescreened column to candidates table")
+        except sqlite3.OperationalError:
+            pass # Column already exists
+    
+        # Migration: Record which cascade tier and model produced the analysis
+        for column in ('analysis_tier', 'analysis_model'):
+            try:
+                conn.execute(f'ALTER TABLE candidates ADD COLUMN {column} TEXT')
+                print(f"  ✨ Added {column} column to candidates table")
+            except sqlite3.OperationalError:
+                pass # Column already exists
+    
+        # Migration: Add details_pending flag (triage pass, verbose fields not generated yet)
+        try:
+            conn.execute('ALTER TABLE candidates ADD COLUMN details_pending INTEGER DEFAULT 0')
+            print("  ✨ Added details_pending column to candidates table")
+        except sqlite3.OperationalError:
+            pass # Column already exists
+    
+        # Migration: Link candidates added from a cross-job match to the original
+        try:
+            conn.execute('ALTER TABLE candidates ADD COLUMN source_candidate_id INTEGER')
+            print("  ✨ Added source_candidate_id column to candidates table")
+        except sqlite3.OperationalError:
+            pass # Column already exists
+    
+        # Migration: Record the prompt template version each analysis was made with
+        try:
+            conn.execute('ALTER TABLE candidates ADD COLUMN prompt_version TEXT')
+            print("  ✨ Added prompt_version column to candidates table")
+        except sqlite3.OperationalError:
+            pass # Column already exists
+    
     print(f"✅ Database initialized at: {DATABASE_PATH}")
 
 
@@ -112,7 +254,8 @@ def get_db() -> Generator[sqlite3.Connection, None, None]:
     Yields:
         sqlite3.Connection with row_factory set to Row
     """
-    conn = sqlite3.connect(str(DATABASE_PATH))
+    # Generous busy timeout: concurrent analysis workers write at the same time
+    conn = sqlite3.connect(str(DATABASE_PATH), timeout=30)
     conn.row_factory = sqlite3.Row  # Allow column access by name
     conn.execute('PRAGMA foreign_keys = ON')  # Enable foreign key constraints
     
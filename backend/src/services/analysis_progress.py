@@ -0,0 +1,114 @@
+"""
+Analysis Progress
+
+Fields parsed so far for candidates whose analysis is still streaming,
+so the status endpoint can show a name and score before the rest of the
+response is generated. They are kept on the candidate's leased entry in
+the analysis queue, so any process can answer a status request; the
+entry (and its progress) goes away once the analysis is settled, and
+the final result is written to the candidate row as before.
+"""
+import json
+import time
+from typing import Dict, Any, List
+
+from src.database.db import get_db
+
+
+class AnalysisProgress:
+    """Partial results of in-flight analyses, per job"""
+
+    @staticmethod
+    def start(job_id: int, candidate_id: int, model: str):
+        """
+        Register a generation for a candidate, dropping earlier partial fields.
+
+        Args:
+            job_id: Job ID
+            candidate_id: Candidate ID
+            model: Model generating the response
+        """
+        now = time.time()
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE analysis_queue
+                SET progress_model = ?, progress_fields = '{}',
+                    progress_started_at = ?, progress_updated_at = ?
+                WHERE candidate_id = ? AND job_id = ? AND status = 'leased'
+            ''', (model, now, now, candidate_id, job_id))
+
+    @staticmethod
+    def update(job_id: int, candidate_id: int, fields: Dict[str, Any]):
+        """
+        Add completed fields to a candidate's entry.
+
+        Args:
+            job_id: Job ID
+            candidate_id: Candidate ID
+            fields: Newly completed fields
+        """
+        with get_db() as conn:
+            row = conn.execute('''
+                SELECT progress_fields FROM analysis_queue
+                WHERE candidate_id = ? AND job_id = ? AND progress_fields IS NOT NULL
+            ''', (candidate_id, job_id)).fetchone()
+            if row is None:
+                return
+
+            merged = {**json.loads(row['progress_fields']), **fields}
+            conn.execute('''
+                UPDATE analysis_queue SET progress_fields = ?, progress_updated_at = ?
+                WHERE candidate_id = ?
+            ''', (json.dumps(merged), time.time(), candidate_id))
+
+    @staticmethod
+    def clear(job_id: int, candidate_id: int):
+        """
+        Remove a candidate's partial fields once its analysis has finished or failed.
+
+        Args:
+            job_id: Job ID
+            candidate_id: Candidate ID
+        """
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE analysis_queue
+                SET progress_model = NULL, progress_fields = NULL,
+                    progress_started_at = NULL, progress_updated_at = NULL
+                WHERE candidate_id = ? AND job_id = ?
+            ''', (candidate_id, job_id))
+
+    @staticmethod
+    def get(job_id: int) -> List[Dict[str, Any]]:
+        """
+        Get the in-flight candidates of a job.
+
+        Entries of workers whose lease expired (a dead process) are left out.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            List of entries (candidate_id, model, fields, started_at,
+            updated_at), oldest first
+        """
+        with get_db() as conn:
+            rows = conn.execute('''
+                SELECT candidate_id, progress_model, progress_fields,
+                       progress_started_at, progress_updated_at
+                FROM analysis_queue
+                WHERE job_id = ? AND status = 'leased' AND lease_expires_at > ?
+                    AND progress_fields IS NOT NULL
+                ORDER BY progress_started_at
+            ''', (job_id, time.time())).fetchall()
+
+        return [
+            {
+                'candidate_id': row['candidate_id'],
+                'model': row['progress_model'],
+                'fields': json.loads(row['progress_fields']),
+                'started_at': row['progress_started_at'],
+                'updated_at': row['progress_updated_at']
+            }
+            for row in rows
+        ]
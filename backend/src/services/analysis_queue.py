@@ -0,0 +1,512 @@
+"""
+Analysis Queue
+
+Durable work queue for candidate analysis, stored in SQLite so that
+every server process shares it. Workers claim single candidates under a
+lease and renew it with heartbeats while the analysis runs; a lease that
+is not renewed (worker crashed or the server restarted) expires and the
+candidate is claimed again, up to QUEUE_MAX_ATTEMPTS times.
+
+Claims are scheduled across jobs: priority entries (single-candidate
+re-analysis) go first, then jobs take turns in proportion to their
+weight (stride scheduling), so a small job is not stuck behind a large
+one. At most QUEUE_MAX_INFLIGHT candidates are leased at once over all
+processes. A paused job keeps its entries but is skipped; cancelling a
+job removes them.
+
+Details of triaged candidates (strengths, concerns, summary, ...) are
+generated through the same queue, as priority entries of kind 'details',
+so page views and exports share the cap and the pause and cancel
+controls with batch analysis.
+"""
+import sqlite3
+import time
+from typing import List, Dict, Any, Optional
+
+from src.database.db import get_db
+from src.utils.config import Config
+
+
+class AnalysisQueue:
+    """Persistent queue of candidates waiting for analysis"""
+
+    @staticmethod
+    def enqueue(job_id: int, candidate_ids: List[int], bypass_cache: bool = False,
+                weight: Optional[float] = None) -> int:
+        """
+        Queue candidates of a job, in the given order.
+
+        Candidates that are already queued keep their place.
+
+        Args:
+            job_id: Job ID
+            candidate_ids: Candidate IDs in analysis order
+            bypass_cache: Force fresh generations for these candidates
+            weight: Job's share of analysis slots relative to other jobs
+                (default: keep the current weight, 1 for a new job)
+
+        Returns:
+            int: Number of candidates newly queued
+        """
+        now = time.time()
+        with get_db() as conn:
+            AnalysisQueue._join_shares(conn, job_id, weight)
+            cursor = conn.executemany('''
+                INSERT OR IGNORE INTO analysis_queue
+                    (candidate_id, job_id, position, bypass_cache, enqueued_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(cid, job_id, i, 1 if bypass_cache else 0, now) for i, cid in enumerate(candidate_ids)])
+            return cursor.rowcount
+
+    @staticmethod
+    def enqueue_priority(job_id: int, candidate_id: int, bypass_cache: bool = False,
+                         full_model: bool = False):
+        """
+        Queue one candidate ahead of all batch work.
+
+        A candidate already waiting in a batch is moved to the front, and
+        queued details are replaced by the full analysis; one already being
+        analyzed is left alone.
+
+        Args:
+            job_id: Job ID
+            candidate_id: Candidate ID
+            bypass_cache: Force a fresh generation
+            full_model: Skip the cascade's fast model
+        """
+        with get_db() as conn:
+            conn.execute('''
+                INSERT INTO analysis_queue
+                    (candidate_id, job_id, priority, bypass_cache, full_model, enqueued_at)
+                VALUES (?, ?, 1, ?, ?, ?)
+                ON CONFLICT(candidate_id) DO UPDATE SET
+                    priority = 1, bypass_cache = excluded.bypass_cache, full_model = excluded.full_model,
+                    kind = 'analysis'
+                WHERE status = 'queued'
+            ''', (candidate_id, job_id, 1 if bypass_cache else 0, 1 if full_model else 0, time.time()))
+
+    @staticmethod
+    def enqueue_details(job_id: int, candidate_ids: List[int]) -> int:
+        """
+        Queue detail generation for triaged candidates, ahead of batch work.
+
+        Candidates that already have a queue entry are left alone, so
+        concurrent requests for the same candidate generate its details
+        once.
+
+        Args:
+            job_id: Job ID
+            candidate_ids: Candidate IDs
+
+        Returns:
+            int: Number of candidates newly queued
+        """
+        now = time.time()
+        with get_db() as conn:
+            cursor = conn.executemany('''
+                INSERT OR IGNORE INTO analysis_queue
+                    (candidate_id, job_id, position, priority, kind, enqueued_at)
+                VALUES (?, ?, ?, 1, 'details', ?)
+            ''', [(cid, job_id, i, now) for i, cid in enumerate(candidate_ids)])
+            return cursor.rowcount
+
+    @staticmethod
+    def _join_shares(conn, job_id: int, weight: Optional[float]):
+        """
+        Register a job with the fair-share scheduler.
+
+        A job that joins while others are queued starts at their lowest
+        pass, so it neither gets a burst of claims for the time it was idle
+        nor waits for the others to catch up.
+
+        Args:
+            conn: Open database connection
+            job_id: Job ID
+            weight: New weight, or None to keep the current one
+        """
+        active = conn.execute(
+            'SELECT 1 FROM analysis_queue WHERE job_id = ? LIMIT 1', (job_id,)
+        ).fetchone()
+        floor = AnalysisQueue._floor_pass(conn, job_id)
+
+        conn.execute('INSERT OR IGNORE INTO analysis_shares (job_id, pass) VALUES (?, ?)',
+                     (job_id, floor or 0))
+        if not active and floor is not None:
+            conn.execute('UPDATE analysis_shares SET pass = ? WHERE job_id = ?', (floor, job_id))
+        if weight is not None:
+            conn.execute('UPDATE analysis_shares SET weight = ? WHERE job_id = ?',
+                         (max(weight, 0.01), job_id))
+
+    @staticmethod
+    def _floor_pass(conn, job_id: int) -> Optional[float]:
+        """
+        Lowest pass of the other unpaused jobs with queued work.
+
+        Args:
+            conn: Open database connection
+            job_id: Job to leave out
+
+        Returns:
+            Pass value, or None if no other job is running
+        """
+        return conn.execute('''
+            SELECT MIN(s.pass) FROM analysis_shares s
+            WHERE s.job_id != ? AND s.paused = 0
+              AND EXISTS (SELECT 1 FROM analysis_queue q WHERE q.job_id = s.job_id)
+        ''', (job_id,)).fetchone()[0]
+
+    @staticmethod
+    def pause(job_id: int) -> bool:
+        """
+        Stop claiming a job's candidates; candidates in progress finish.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            bool: True if the job had queued work to pause
+        """
+        with get_db() as conn:
+            row = conn.execute(
+                'SELECT 1 FROM analysis_queue WHERE job_id = ? LIMIT 1', (job_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            conn.execute('''
+                INSERT INTO analysis_shares (job_id, paused) VALUES (?, 1)
+                ON CONFLICT(job_id) DO UPDATE SET paused = 1
+            ''', (job_id,))
+        return True
+
+    @staticmethod
+    def resume(job_id: int) -> bool:
+        """
+        Claim a paused job's candidates again.
+
+        The job rejoins at the other jobs' lowest pass, so it doesn't get
+        a burst of claims for the time it was paused.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            bool: True if the job was paused
+        """
+        with get_db() as conn:
+            share = conn.execute(
+                'SELECT paused, pass FROM analysis_shares WHERE job_id = ?', (job_id,)
+            ).fetchone()
+            if not share or not share['paused']:
+                return False
+            floor = AnalysisQueue._floor_pass(conn, job_id)
+            conn.execute('UPDATE analysis_shares SET paused = 0, pass = ? WHERE job_id = ?',
+                         (max(share['pass'], floor or 0), job_id))
+        return True
+
+    @staticmethod
+    def cancel(job_id: int) -> List[int]:
+        """
+        Remove all of a job's queue entries; the candidates stay pending.
+
+        Workers holding a removed lease notice the loss and abort their
+        analysis.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            List of candidate IDs whose analysis was in progress
+        """
+        with get_db() as conn:
+            leased = [row['candidate_id'] for row in conn.execute(
+                "SELECT candidate_id FROM analysis_queue WHERE job_id = ? AND status = 'leased'",
+                (job_id,)
+            )]
+            conn.execute('DELETE FROM analysis_queue WHERE job_id = ?', (job_id,))
+            conn.execute('''
+                INSERT INTO analysis_shares (job_id, cancelled_at) VALUES (?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET paused = 0, cancelled_at = excluded.cancelled_at
+            ''', (job_id, time.time()))
+        return leased
+
+    @staticmethod
+    def cancelled_since(job_id: int, since: float) -> bool:
+        """
+        Check whether a job's analysis was cancelled after a point in time.
+
+        Lets a caller waiting for an entry tell a cancelled entry from a
+        completed one, since both leave the queue.
+
+        Args:
+            job_id: Job ID
+            since: time.time() to compare with
+
+        Returns:
+            bool: True if the job was cancelled at or after since
+        """
+        with get_db() as conn:
+            row = conn.execute(
+                'SELECT cancelled_at FROM analysis_shares WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        return bool(row and row['cancelled_at'] is not None and row['cancelled_at'] >= since)
+
+    @staticmethod
+    def claim(owner: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Lease the next candidates to analyze.
+
+        Queued candidates and those whose lease expired are eligible:
+        priority entries first, then the next candidate of the job with
+        the lowest pass. Nothing is claimed while QUEUE_MAX_INFLIGHT
+        leases are active. Candidates that already lost
+        QUEUE_MAX_ATTEMPTS leases are marked as failed instead.
+
+        Args:
+            owner: Worker identifier
+            limit: Maximum number of candidates to claim
+
+        Returns:
+            List of claimed queue rows
+        """
+        now = time.time()
+        with get_db() as conn:
+            # Take the write lock first so two processes can't claim the same rows
+            conn.execute('BEGIN IMMEDIATE')
+
+            abandoned = [row['candidate_id'] for row in conn.execute('''
+                SELECT candidate_id FROM analysis_queue
+                WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+            ''', (now, Config.QUEUE_MAX_ATTEMPTS))]
+            for candidate_id in abandoned:
+                conn.execute('''
+                    UPDATE candidates SET status = 'error', error_message = ?
+                    WHERE id = ? AND status = 'pending'
+                ''', (f'Analysis abandoned after {Config.QUEUE_MAX_ATTEMPTS} attempts', candidate_id))
+                conn.execute('DELETE FROM analysis_queue WHERE candidate_id = ?', (candidate_id,))
+            if abandoned:
+                print(f"  ⚠️  Gave up on {len(abandoned)} candidates after repeated lost leases", flush=True)
+
+            inflight = conn.execute(
+                "SELECT COUNT(*) FROM analysis_queue WHERE status = 'leased' AND lease_expires_at >= ?",
+                (now,)
+            ).fetchone()[0]
+            slots = min(limit, Config.QUEUE_MAX_INFLIGHT - inflight)
+
+            claimed = []
+            for _ in range(max(slots, 0)):
+                row = AnalysisQueue._next(conn, now)
+                if row is None:
+                    break
+                conn.execute('''
+                    UPDATE analysis_queue SET
+                        status = 'leased', lease_owner = ?, lease_expires_at = ?,
+                        heartbeat_at = ?, attempts = attempts + 1,
+                        progress_fields = NULL
+                    WHERE candidate_id = ?
+                ''', (owner, now + Config.QUEUE_LEASE_SECONDS, now, row['candidate_id']))
+                if not row['priority']:
+                    # Advance the job's virtual time by its stride
+                    conn.execute('''
+                        UPDATE analysis_shares SET pass = pass + 1.0 / weight WHERE job_id = ?
+                    ''', (row['job_id'],))
+                claimed.append({**dict(row), 'status': 'leased', 'lease_owner': owner,
+                                'attempts': row['attempts'] + 1})
+            return claimed
+
+    @staticmethod
+    def _next(conn, now: float) -> Optional[sqlite3.Row]:
+        """
+        Pick the entry to claim next.
+
+        Args:
+            conn: Connection inside the claim transaction
+            now: Current time
+
+        Returns:
+            Queue row, or None if nothing is claimable
+        """
+        claimable = "(q.status = 'queued' OR (q.status = 'leased' AND q.lease_expires_at < :now))"
+
+        # Re-analyses always run; detail generation waits while its job is paused
+        row = conn.execute(f'''
+            SELECT q.* FROM analysis_queue q
+            LEFT JOIN analysis_shares s ON s.job_id = q.job_id
+            WHERE q.priority > 0 AND {claimable}
+              AND (q.kind != 'details' OR COALESCE(s.paused, 0) = 0)
+            ORDER BY q.priority DESC, q.enqueued_at, q.position
+            LIMIT 1
+        ''', {'now': now}).fetchone()
+        if row is not None:
+            return row
+
+        # Unpaused job with the lowest pass among those with claimable work
+        job = conn.execute(f'''
+            SELECT q.job_id, COALESCE(s.pass, 0) AS pass FROM analysis_queue q
+            LEFT JOIN analysis_shares s ON s.job_id = q.job_id
+            WHERE {claimable} AND COALESCE(s.paused, 0) = 0
+            GROUP BY q.job_id
+            ORDER BY pass, MIN(q.enqueued_at)
+            LIMIT 1
+        ''', {'now': now}).fetchone()
+        if job is None:
+            return None
+
+        return conn.execute(f'''
+            SELECT q.* FROM analysis_queue q
+            WHERE q.job_id = :job_id AND {claimable}
+            ORDER BY q.enqueued_at, q.position
+            LIMIT 1
+        ''', {'now': now, 'job_id': job['job_id']}).fetchone()
+
+    @staticmethod
+    def heartbeat(owner: str, candidate_ids: List[int]) -> int:
+        """
+        Renew the leases of candidates a worker is still analyzing.
+
+        Args:
+            owner: Worker identifier
+            candidate_ids: Candidates in progress
+
+        Returns:
+            int: Number of leases renewed
+        """
+        if not candidate_ids:
+            return 0
+
+        now = time.time()
+        placeholders = ', '.join(['?'] * len(candidate_ids))
+        with get_db() as conn:
+            cursor = conn.execute(f'''
+                UPDATE analysis_queue SET lease_expires_at = ?, heartbeat_at = ?
+                WHERE lease_owner = ? AND status = 'leased' AND candidate_id IN ({placeholders})
+            ''', [now + Config.QUEUE_LEASE_SECONDS, now, owner] + list(candidate_ids))
+            return cursor.rowcount
+
+    @staticmethod
+    def held(owner: str, candidate_ids: List[int]) -> List[int]:
+        """
+        Check which leases a worker still holds.
+
+        A lease is lost when the job is cancelled or when it expired and
+        another worker claimed the candidate.
+
+        Args:
+            owner: Worker identifier
+            candidate_ids: Candidates the worker is analyzing
+
+        Returns:
+            Candidate IDs whose lease the worker still holds
+        """
+        if not candidate_ids:
+            return []
+
+        placeholders = ', '.join(['?'] * len(candidate_ids))
+        with get_db() as conn:
+            rows = conn.execute(f'''
+                SELECT candidate_id FROM analysis_queue
+                WHERE lease_owner = ? AND status = 'leased' AND candidate_id IN ({placeholders})
+            ''', [owner] + list(candidate_ids)).fetchall()
+        return [row['candidate_id'] for row in rows]
+
+    @staticmethod
+    def complete(candidate_id: int, owner: str) -> bool:
+        """
+        Remove a finished candidate (analyzed or failed) from the queue.
+
+        Args:
+            candidate_id: Candidate ID
+            owner: Worker holding the lease
+
+        Returns:
+            bool: False if the lease had been lost to another worker
+        """
+        with get_db() as conn:
+            cursor = conn.execute(
+                'DELETE FROM analysis_queue WHERE candidate_id = ? AND lease_owner = ?',
+                (candidate_id, owner)
+            )
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def release(candidate_id: int, owner: str) -> bool:
+        """
+        Put a claimed candidate back without counting the attempt
+        (e.g. Ollama was unavailable).
+
+        Args:
+            candidate_id: Candidate ID
+            owner: Worker holding the lease
+
+        Returns:
+            bool: True if the candidate was re-queued
+        """
+        with get_db() as conn:
+            cursor = conn.execute('''
+                UPDATE analysis_queue SET
+                    status = 'queued', lease_owner = NULL, lease_expires_at = NULL,
+                    attempts = MAX(attempts - 1, 0)
+                WHERE candidate_id = ? AND lease_owner = ?
+            ''', (candidate_id, owner))
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def get_counts(job_id: int) -> Dict[str, int]:
+        """
+        Queue state of a job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Dictionary with queued and leased (in progress) counts, the
+            job's fair-share weight and whether it is paused
+        """
+        with get_db() as conn:
+            row = conn.execute('''
+                SELECT
+                    SUM(CASE WHEN status = 'queued' THEN 1 ELSE 0 END) as queued,
+                    SUM(CASE WHEN status = 'leased' THEN 1 ELSE 0 END) as leased
+                FROM analysis_queue WHERE job_id = ?
+            ''', (job_id,)).fetchone()
+            share = conn.execute(
+                'SELECT weight, paused FROM analysis_shares WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        return {'queued': row['queued'] or 0, 'leased': row['leased'] or 0,
+                'weight': share['weight'] if share else 1,
+                'paused': bool(share['paused']) if share else False}
+
+    @staticmethod
+    def is_queued(candidate_id: int) -> bool:
+        """
+        Check whether a candidate is waiting or being analyzed.
+
+        Args:
+            candidate_id: Candidate ID
+
+        Returns:
+            bool: True while the candidate has a queue entry
+        """
+        with get_db() as conn:
+            row = conn.execute(
+                'SELECT 1 FROM analysis_queue WHERE candidate_id = ?', (candidate_id,)
+            ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def get_summary() -> Dict[str, int]:
+        """
+        Queue state over all jobs.
+
+        Returns:
+            Dictionary with queued, leased and expired (lease lost) counts
+        """
+        now = time.time()
+        with get_db() as conn:
+            row = conn.execute('''
+                SELECT
+                    SUM(CASE WHEN status = 'queued' THEN 1 ELSE 0 END) as queued,
+                    SUM(CASE WHEN status = 'leased' AND lease_expires_at >= ? THEN 1 ELSE 0 END) as leased,
+                    SUM(CASE WHEN status = 'leased' AND lease_expires_at < ? THEN 1 ELSE 0 END) as expired
+                FROM analysis_queue
+            ''', (now, now)).fetchone()
+        return {'queued': row['queued'] or 0, 'leased': row['leased'] or 0, 'expired': row['expired'] or 0}
@@ -0,0 +1,501 @@
+"""
+Analysis Worker
+
+Background threads that drain the analysis queue. Every server process
+runs one worker; workers claim candidates from the shared SQLite queue
+under a lease, so a process that dies mid-analysis only delays its
+candidates until the lease expires and another worker picks them up.
+
+Pausing a job takes effect between candidates. Cancelling also aborts
+the analyses in progress: a worker that loses a lease sets the
+candidate's cancel event, which stops its streamed generation.
+
+The workers also generate the details of triaged candidates on request,
+so a page view or export never calls Ollama from the HTTP request.
+"""
+import os
+import socket
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from src.utils.config import Config
+from src.services.analysis_queue import AnalysisQueue
+from src.services.candidate_service import CandidateService
+from src.services.circuit_breaker import CircuitBreaker, OllamaUnavailableError
+from src.services.cv_analyzer import CVAnalyzer, AnalysisCancelledError
+
+
+class AnalysisWorker:
+    """Process-wide consumer of the analysis queue"""
+
+    _lock = threading.Lock()
+    _threads = []
+    _pid = None
+    _owner = None
+    _wake = threading.Event()
+
+    # Candidates this process holds a lease on (renewed by the heartbeat),
+    # with the event that cancels their analysis
+    _inflight: Dict[int, threading.Event] = {}
+
+    # Per-job analyzer and primed prompt sessions, shared by the claim loops
+    _contexts: Dict[int, Dict[str, Any]] = {}
+
+    @classmethod
+    def start(cls):
+        """Start the worker threads (idempotent, restarted after a fork)"""
+        if not Config.ANALYSIS_WORKER_ENABLED:
+            return
+
+        with cls._lock:
+            if cls._pid == os.getpid() and all(thread.is_alive() for thread in cls._threads):
+                return
+            cls._pid = os.getpid()
+            cls._owner = f"{socket.gethostname()}:{os.getpid()}"
+            cls._inflight = {}
+            cls._contexts = {}
+
+            workers = max(1, Config.OLLAMA_NUM_PARALLEL)
+            cls._threads = [
+                threading.Thread(target=cls._loop, name=f'analysis-worker-{i}', daemon=True)
+                for i in range(workers)
+            ]
+            cls._threads.append(threading.Thread(target=cls._heartbeat_loop,
+                                                 name='analysis-heartbeat', daemon=True))
+            for thread in cls._threads:
+                thread.start()
+
+        summary = AnalysisQueue.get_summary()
+        if summary['queued'] or summary['leased'] or summary['expired']:
+            print(f"📋 Analysis queue: {summary['queued']} queued, {summary['leased']} in progress, "
+                  f"{summary['expired']} to resume", flush=True)
+
+    @classmethod
+    def notify(cls):
+        """Wake idle claim loops after new work was queued"""
+        cls._wake.set()
+
+    @classmethod
+    def submit(cls, job_id: int, bypass_cache: bool = False,
+               weight: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Queue a job's pending candidates for analysis.
+
+        Runs the pre-screen and analysis ordering now, so the queue holds
+        only candidates that need the LLM, in the order they should run.
+
+        Args:
+            job_id: Job ID
+            bypass_cache: Force fresh generations instead of cached responses
+            weight: Job's share of analysis slots relative to other jobs
+
+        Returns:
+            Dictionary with pending, queued, already_queued and prescreened counts
+        """
+        from src.services.job_service import JobService
+
+        job = JobService.get_by_id(job_id)
+        if not job:
+            raise ValueError(f"Job {job_id} not found")
+
+        pending = CandidateService.get_pending(job_id)
+        if not pending:
+            return {'job_id': job_id, 'pending': 0, 'queued': 0, 'already_queued': 0, 'prescreened': 0}
+
+        candidates, prescreened_count = CVAnalyzer().prepare_batch(job, pending)
+        queued = AnalysisQueue.enqueue(job_id, [c['id'] for c in candidates], bypass_cache, weight)
+        # Starting a paused job again resumes it
+        AnalysisQueue.resume(job_id)
+
+        cls.start()
+        cls.notify()
+        if queued:
+            print(f"📥 Queued {queued} candidates of job {job_id} for analysis", flush=True)
+
+        return {
+            'job_id': job_id,
+            'pending': len(pending),
+            'queued': queued,
+            'already_queued': len(candidates) - queued,
+            'prescreened': prescreened_count
+        }
+
+    @classmethod
+    def pause(cls, job_id: int) -> bool:
+        """
+        Pause a job's analysis after the candidates in progress.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            bool: True if the job had queued work
+        """
+        paused = AnalysisQueue.pause(job_id)
+        if paused:
+            print(f"⏸️  Analysis of job {job_id} paused", flush=True)
+        return paused
+
+    @classmethod
+    def resume(cls, job_id: int) -> bool:
+        """
+        Resume a paused job's analysis.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            bool: True if the job was paused
+        """
+        resumed = AnalysisQueue.resume(job_id)
+        if resumed:
+            print(f"▶️  Analysis of job {job_id} resumed", flush=True)
+            cls.start()
+            cls.notify()
+        return resumed
+
+    @classmethod
+    def cancel(cls, job_id: int) -> Dict[str, Any]:
+        """
+        Cancel a job's analysis, aborting the candidates in progress.
+
+        Candidates are left pending, so the analysis can be started again.
+        Analyses running in other processes stop once their worker sees
+        the lost lease (within QUEUE_POLL_INTERVAL).
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Dictionary with the number of removed and aborted candidates
+        """
+        counts = AnalysisQueue.get_counts(job_id)
+        aborted = AnalysisQueue.cancel(job_id)
+        for candidate_id in aborted:
+            event = cls._inflight.get(candidate_id)
+            if event is not None:
+                event.set()
+
+        print(f"⏹️  Analysis of job {job_id} cancelled "
+              f"({counts['queued']} queued, {len(aborted)} in progress)", flush=True)
+        return {'job_id': job_id, 'removed': counts['queued'], 'aborted': len(aborted)}
+
+    @classmethod
+    def analyze_now(cls, candidate: Dict[str, Any], bypass_cache: bool = False,
+                    full_model: bool = False) -> Dict[str, Any]:
+        """
+        Re-analyze one candidate ahead of queued batch work and wait for it.
+
+        The candidate goes through the queue like any other, so it counts
+        against QUEUE_MAX_INFLIGHT, but it is claimed before any batch
+        candidate. It stays queued if the wait ends early.
+
+        Args:
+            candidate: Candidate dictionary
+            bypass_cache: Generate a fresh response
+            full_model: Skip the cascade's fast model
+
+        Returns:
+            Updated candidate dictionary
+
+        Raises:
+            OllamaUnavailableError: If the circuit breaker is or becomes open
+            TimeoutError: If no worker finished it within QUEUE_PRIORITY_TIMEOUT
+            AnalysisCancelledError: If the job's analysis was cancelled meanwhile
+            RuntimeError: If the analysis failed
+        """
+        from src.services.ollama_client import OllamaClient
+
+        breaker = OllamaClient().breaker
+        if not breaker.allow_request():
+            raise OllamaUnavailableError("Ollama is unavailable")
+
+        candidate_id = candidate['id']
+        started = time.time()
+        AnalysisQueue.enqueue_priority(candidate['job_id'], candidate_id, bypass_cache, full_model)
+        cls.start()
+        cls.notify()
+
+        deadline = time.time() + Config.QUEUE_PRIORITY_TIMEOUT
+        while AnalysisQueue.is_queued(candidate_id):
+            if breaker.get_status()['state'] == CircuitBreaker.OPEN:
+                raise OllamaUnavailableError("Ollama is unavailable, the candidate stays queued")
+            if time.time() > deadline:
+                raise TimeoutError(f"Candidate {candidate_id} was not analyzed within "
+                                   f"{Config.QUEUE_PRIORITY_TIMEOUT:.0f}s")
+            time.sleep(0.2)
+
+        # Cancelling the job removes the entry too, without analyzing it
+        if AnalysisQueue.cancelled_since(candidate['job_id'], started):
+            raise AnalysisCancelledError(f"Analysis of job {candidate['job_id']} was cancelled")
+
+        result = CandidateService.get_by_id(candidate_id)
+        if result is None:
+            raise ValueError(f"Candidate {candidate_id} not found")
+        if result['status'] == 'error':
+            raise RuntimeError(result.get('error_message') or 'Analysis failed')
+        return result
+
+    @classmethod
+    def request_details(cls, job_id: int, candidates: List[Dict[str, Any]],
+                        timeout: float) -> List[Dict[str, Any]]:
+        """
+        Queue details for the triaged candidates that lack them and wait
+        a bounded time for the workers to generate them.
+
+        Requests for candidates that are already queued share the queued
+        generation. Nothing is waited for while the circuit breaker is open.
+
+        Args:
+            job_id: Job ID
+            candidates: Candidate dictionaries
+            timeout: Seconds to wait for the details
+
+        Returns:
+            Candidates, reloaded if their details were queued; those still
+            waiting keep details_pending set
+        """
+        from src.services.ollama_client import OllamaClient
+
+        pending_ids = [c['id'] for c in candidates if c.get('details_pending')]
+        if not pending_ids:
+            return candidates
+
+        queued = AnalysisQueue.enqueue_details(job_id, pending_ids)
+        cls.start()
+        cls.notify()
+        if queued:
+            print(f"📥 Queued details for {queued} candidates of job {job_id}", flush=True)
+
+        if OllamaClient().breaker.allow_request():
+            deadline = time.time() + timeout
+            waiting = list(pending_ids)
+            while waiting and time.time() < deadline:
+                time.sleep(0.2)
+                waiting = [cid for cid in waiting if AnalysisQueue.is_queued(cid)]
+
+        reloaded = []
+        for candidate in candidates:
+            if candidate['id'] in pending_ids:
+                candidate = CandidateService.get_by_id(candidate['id']) or candidate
+            reloaded.append(candidate)
+        return reloaded
+
+    @classmethod
+    def _loop(cls):
+        """Claim and analyze one candidate at a time until the process exits"""
+        while True:
+            try:
+                claimed = AnalysisQueue.claim(cls._owner)
+            except Exception as e:
+                print(f"  ⚠️  Analysis queue claim failed: {e}", flush=True)
+                claimed = []
+
+            if not claimed:
+                cls._wake.wait(Config.QUEUE_POLL_INTERVAL)
+                cls._wake.clear()
+                continue
+
+            for item in claimed:
+                if item.get('kind') == 'details':
+                    cls._process_details(item)
+                else:
+                    cls._process(item)
+
+    @classmethod
+    def _heartbeat_loop(cls):
+        """
+        Renew the leases of candidates being analyzed in this process, and
+        abort those whose lease was lost (job cancelled, or lease expired
+        and claimed by another worker).
+        """
+        last_renewal = time.time()
+        while True:
+            time.sleep(Config.QUEUE_POLL_INTERVAL)
+            try:
+                inflight = dict(cls._inflight)
+                held = set(AnalysisQueue.held(cls._owner, list(inflight)))
+                for candidate_id, event in inflight.items():
+                    # Entries removed from _inflight meanwhile have just completed
+                    if candidate_id not in held and candidate_id in cls._inflight:
+                        event.set()
+
+                if time.time() - last_renewal >= Config.QUEUE_HEARTBEAT_SECONDS:
+                    AnalysisQueue.heartbeat(cls._owner, list(held))
+                    last_renewal = time.time()
+            except Exception as e:
+                print(f"  ⚠️  Analysis queue heartbeat failed: {e}", flush=True)
+
+    @classmethod
+    def _process(cls, item: Dict[str, Any]):
+        """
+        Analyze a claimed candidate and settle its queue entry.
+
+        Args:
+            item: Claimed queue row
+        """
+        candidate_id = item['candidate_id']
+        job_id = item['job_id']
+        cancel = threading.Event()
+        cls._inflight[candidate_id] = cancel
+        try:
+            candidate = CandidateService.get_by_id(candidate_id)
+            if not candidate or (candidate['status'] != 'pending' and not item['priority']):
+                # Deleted, or analyzed another way since it was queued
+                # (a priority entry is an explicit re-analysis, so it always runs)
+                AnalysisQueue.complete(candidate_id, cls._owner)
+                return
+
+            if item['attempts'] > 1:
+                print(f"  🔁 Resuming candidate {candidate_id} (attempt {item['attempts']})", flush=True)
+
+            context = None
+            try:
+                context = cls._get_context(job_id, cancel)
+                if context is None:
+                    AnalysisQueue.complete(candidate_id, cls._owner)
+                    return
+
+                context['analyzer'].analyze_candidate(
+                    candidate_id=candidate_id,
+                    cv_text=candidate['cv_text'],
+                    job=context['job'],
+                    session=context['session'],
+                    bypass_cache=bool(item['bypass_cache']),
+                    fast_session=context['fast_session'],
+                    full_model=bool(item['full_model']),
+                    cancel=cancel
+                )
+            except AnalysisCancelledError:
+                # The entry is gone (cancelled or re-claimed elsewhere), nothing to settle
+                return
+            except OllamaUnavailableError:
+                # Candidate is still pending; retry once the breaker lets requests through
+                AnalysisQueue.release(candidate_id, cls._owner)
+                cls._inflight.pop(candidate_id, None)
+                time.sleep(Config.OLLAMA_BREAKER_COOLDOWN)
+                return
+            except Exception:
+                # analyze_candidate has already marked the candidate as failed.
+                # If the job context failed to start, the lease is left to
+                # expire so the attempt counts towards QUEUE_MAX_ATTEMPTS
+                if context is None:
+                    raise
+
+            AnalysisQueue.complete(candidate_id, cls._owner)
+            # A slot is free: let idle claim loops pick up the next candidate
+            cls.notify()
+        except Exception as e:
+            print(f"  ❌ Analysis worker failed on candidate {candidate_id}: {e}", flush=True)
+        finally:
+            cls._inflight.pop(candidate_id, None)
+            try:
+                cls._drop_context_if_done(job_id)
+            except Exception as e:
+                print(f"  ⚠️  Analysis queue check for job {job_id} failed: {e}", flush=True)
+
+    @classmethod
+    def _process_details(cls, item: Dict[str, Any]):
+        """
+        Generate the details of a claimed triaged candidate.
+
+        A failed generation leaves the details pending (the triage result
+        stands), so the next page view or export queues them again.
+
+        Args:
+            item: Claimed queue row
+        """
+        from src.services.job_service import JobService
+
+        candidate_id = item['candidate_id']
+        cancel = threading.Event()
+        cls._inflight[candidate_id] = cancel
+        try:
+            candidate = CandidateService.get_by_id(candidate_id)
+            job = JobService.get_by_id(item['job_id'])
+            if candidate and job and candidate.get('details_pending'):
+                try:
+                    CVAnalyzer().generate_details(candidate, job, cancel)
+                except AnalysisCancelledError:
+                    return
+                except OllamaUnavailableError:
+                    AnalysisQueue.release(candidate_id, cls._owner)
+                    cls._inflight.pop(candidate_id, None)
+                    time.sleep(Config.OLLAMA_BREAKER_COOLDOWN)
+                    return
+                except Exception as e:
+                    print(f"  ⚠️  Could not generate details for candidate {candidate_id}: {e}", flush=True)
+
+            AnalysisQueue.complete(candidate_id, cls._owner)
+            cls.notify()
+        except Exception as e:
+            print(f"  ❌ Analysis worker failed on details of candidate {candidate_id}: {e}", flush=True)
+        finally:
+            cls._inflight.pop(candidate_id, None)
+
+    @classmethod
+    def _get_context(cls, job_id: int, cancel: Optional[threading.Event] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the analyzer and primed sessions for a job, creating them once.
+
+        Args:
+            job_id: Job ID
+            cancel: Cancel event of the candidate that needs the context;
+                aborts the priming (the sessions then start unprimed)
+
+        Returns:
+            Context dictionary, or None if the job no longer exists
+        """
+        from src.services.job_service import JobService
+
+        with cls._lock:
+            context = cls._contexts.get(job_id)
+            if context is None:
+                job = JobService.get_by_id(job_id)
+                if not job:
+                    return None
+                context = {'job': job, 'ready': threading.Event(), 'error': None}
+                cls._contexts[job_id] = context
+                owner = True
+            else:
+                owner = False
+
+        if owner:
+            try:
+                analyzer = CVAnalyzer()
+                context['analyzer'] = analyzer
+                print(f"\n🔍 Analyzing queued candidates for: {context['job']['title']}", flush=True)
+                context['session'], context['fast_session'] = analyzer.start_sessions(context['job'], cancel)
+            except Exception as e:
+                context['error'] = e
+                with cls._lock:
+                    cls._contexts.pop(job_id, None)
+            finally:
+                context['ready'].set()
+        else:
+            context['ready'].wait()
+
+        if context['error'] is not None:
+            raise context['error']
+        return context
+
+    @classmethod
+    def _drop_context_if_done(cls, job_id: int):
+        """
+        Release a job's context once nothing of it is queued or in progress.
+
+        Args:
+            job_id: Job ID
+        """
+        counts = AnalysisQueue.get_counts(job_id)
+        if counts['queued'] or counts['leased']:
+            return
+
+        with cls._lock:
+            context = cls._contexts.pop(job_id, None)
+        if context is not None and context.get('session') is not None:
+            prompt_cache = context['session'].get_stats()
+            print(f"✅ Analysis queue drained for job {job_id}. "
+                  f"Prompt cache: {prompt_cache['cache_hits']}/{prompt_cache['measured_calls']} hits, "
+                  f"~{prompt_cache['saved_tokens']} prompt tokens saved\n", flush=True)
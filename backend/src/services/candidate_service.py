@@ -12,7 +12,8 @@ class CandidateService:
     """Service for managing candidates"""
     
     @staticmethod
-    def create_pending(job_id: int, filename: str, cv_text: str, file_path: Optional[str] = None) -> int:
+    def create_pending(job_id: int, filename: str, cv_text: str, file_path: Optional[str] = None,
+                       source_candidate_id: Optional[int] = None) -> int:
         """
         Create a pending candidate record (before analysis).
         
@@ -21,6 +22,7 @@ class CandidateService:
             filename: Original filename of the CV
             cv_text: Extracted text from CV
             file_path: Relative path to stored file
+            source_candidate_id: Original candidate when added from a cross-job match
         
         Returns:
             int: ID of created candidate
@@ -34,10 +36,11 @@ class CandidateService:
                     cv_text, 
                     status,
                     category,
-                    file_path
+                    file_path,
+                    source_candidate_id
                 )
-                VALUES (?, ?, ?, ?, 'pending', 'pending', ?)
-            ''', (job_id, 'Pending Analysis', filename, cv_text, file_path))
+                VALUES (?, ?, ?, ?, 'pending', 'pending', ?, ?)
+            ''', (job_id, 'Pending Analysis', filename, cv_text, file_path, source_candidate_id))
             return cursor.lastrowid
     
     @staticmethod
@@ -61,6 +64,10 @@ class CandidateService:
                 - strengths (list)
                 - concerns (list)
                 - summary (str)
+                - analysis_tier (str, optional): fast or full (cascade)
+                - analysis_model (str, optional)
+                - details_pending (bool, optional): triage pass, details generated later
+                - prompt_version (str, optional): version of the prompt template used
         
         Returns:
             bool: True if updated successfully
@@ -82,7 +89,12 @@ class CandidateService:
                     concerns = ?,
                     summary = ?,
                     salary_estimate = ?,
+                    analysis_tier = ?,
+                    analysis_model = ?,
+                    details_pending = ?,
+                    prompt_version = ?,
                     status = 'analyzed',
+                    prescreened = 0,
                     analyzed_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             ''', (
@@ -100,10 +112,127 @@ class CandidateService:
                 json.dumps(analysis.get('concerns', [])),
                 analysis.get('summary', ''),
                 analysis.get('salary_estimate'),
+                analysis.get('analysis_tier'),
+                analysis.get('analysis_model'),
+                1 if analysis.get('details_pending') else 0,
+                analysis.get('prompt_version'),
                 candidate_id
             ))
             return True
     
+    @staticmethod
+    def update_details(candidate_id: int, details: Dict[str, Any]) -> bool:
+        """
+        Store lazily generated detail fields of a triaged candidate.
+        
+        Score, category and contact details are left untouched.
+        
+        Args:
+            candidate_id: Candidate ID
+            details: Dictionary with experience_years, matched_skills,
+                missing_skills, education, strengths, concerns, summary
+                and optionally salary_estimate
+        
+        Returns:
+            bool: True if updated successfully
+        """
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE candidates SET
+                    experience_years = ?,
+                    matched_skills = ?,
+                    missing_skills = ?,
+                    education = ?,
+                    strengths = ?,
+                    concerns = ?,
+                    summary = ?,
+                    salary_estimate = COALESCE(?, salary_estimate),
+                    details_pending = 0
+                WHERE id = ?
+            ''', (
+                details.get('experience_years', 0),
+                json.dumps(details.get('matched_skills', [])),
+                json.dumps(details.get('missing_skills', [])),
+                json.dumps(details.get('education', {})),
+                json.dumps(details.get('strengths', [])),
+                json.dumps(details.get('concerns', [])),
+                details.get('summary', ''),
+                details.get('salary_estimate'),
+                candidate_id
+            ))
+            return True
+    
+    @staticmethod
+    def mark_prescreened(candidate_id: int, result: Dict[str, Any]) -> bool:
+        """
+        Mark candidate as rejected by the pre-screen (no LLM analysis).
+        
+        Args:
+            candidate_id: Candidate ID
+            result: Pre-screen result from Prescreener.score()
+        
+        Returns:
+            bool: True if updated successfully
+        """
+        matched = result.get('matched_skills', [])
+        missing = result.get('missing_skills', [])
+        summary = (f"Pre-screened: mentions {len(matched)} of {len(matched) + len(missing)} "
+                   f"job keywords. Not analyzed by AI; re-analyze to get a full assessment.")
+        
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE candidates SET
+                    score = ?,
+                    category = 'below_average',
+                    recommendation = 'PASS',
+                    matched_skills = ?,
+                    missing_skills = ?,
+                    summary = ?,
+                    analysis_tier = 'prescreen',
+                    analysis_model = NULL,
+                    details_pending = 0,
+                    status = 'analyzed',
+                    prescreened = 1,
+                    analyzed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (
+                # Coverage as a score, kept inside the below_average band
+                min(49, int(result.get('coverage', 0) * 100)),
+                json.dumps(matched),
+                json.dumps(missing),
+                summary,
+                candidate_id
+            ))
+            return True
+    
+    @staticmethod
+    def reset_outdated(job_id: int, prompt_version: str, include_unversioned: bool = False) -> int:
+        """
+        Queue analyzed candidates whose prompt version is not the current one.
+        
+        Pre-screened candidates were never sent to the model and are left alone.
+        Candidates analyzed before prompt versions were recorded have none, and
+        their prompt may well be the current one, so they are only reset when
+        asked for.
+        
+        Args:
+            job_id: Job ID
+            prompt_version: Version of the current prompt template
+            include_unversioned: Also reset candidates without a prompt version
+            
+        Returns:
+            int: Number of candidates reset to pending
+        """
+        unversioned = 'prompt_version IS NULL OR ' if include_unversioned else ''
+        with get_db() as conn:
+            cursor = conn.execute(f'''
+                UPDATE candidates SET status = 'pending', error_message = NULL
+                WHERE job_id = ? AND status = 'analyzed'
+                    AND analysis_tier IS NOT 'prescreen'
+                    AND ({unversioned}prompt_version != ?)
+            ''', (job_id, prompt_version))
+            return cursor.rowcount
+    
     @staticmethod
     def mark_error(candidate_id: int, error_message: str) -> bool:
         """
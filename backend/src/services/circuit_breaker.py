@@ -0,0 +1,161 @@
+"""
+Circuit Breaker
+
+Stops sending work to Ollama once it is clearly down. After a run of
+consecutive connection failures the breaker opens and calls fail fast
+with OllamaUnavailableError. When the cooldown expires a single probe
+(GET /api/tags) decides whether to close the breaker again or to stay
+open for a longer, jittered cooldown.
+"""
+import random
+import threading
+import time
+from typing import Callable, Dict, Any, Optional, List, Tuple
+
+from src.utils.config import Config
+
+
+class OllamaUnavailableError(ConnectionError):
+    """Raised when the circuit breaker is open and Ollama is not being called"""
+    pass
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """
+    Jittered exponential backoff ("equal jitter").
+
+    Args:
+        attempt: 1-based retry attempt
+        base: Delay of the first attempt in seconds (default: OLLAMA_BACKOFF_BASE)
+        cap: Upper bound in seconds (default: OLLAMA_BACKOFF_MAX)
+
+    Returns:
+        Seconds to wait, between half and all of the exponential delay
+    """
+    base = Config.OLLAMA_BACKOFF_BASE if base is None else base
+    cap = Config.OLLAMA_BACKOFF_MAX if cap is None else cap
+    delay = min(cap, base * (2 ** (attempt - 1)))
+    return random.uniform(delay / 2, delay)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    _registry: Dict[Tuple[str, ...], 'CircuitBreaker'] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, probe: Callable[[], bool], threshold: Optional[int] = None,
+                 cooldown: Optional[float] = None, max_cooldown: Optional[float] = None):
+        """
+        Initialize breaker.
+
+        Args:
+            probe: Returns True if Ollama answers (used in half-open state)
+            threshold: Consecutive failures that open the breaker
+            cooldown: First open period in seconds
+            max_cooldown: Upper bound for the growing open period
+        """
+        self.probe = probe
+        self.threshold = threshold or Config.OLLAMA_BREAKER_THRESHOLD
+        self.base_cooldown = cooldown or Config.OLLAMA_BREAKER_COOLDOWN
+        self.max_cooldown = max_cooldown or Config.OLLAMA_BREAKER_MAX_COOLDOWN
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self._open_count = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_hosts(cls, hosts: List[str], probe: Callable[[], bool]) -> 'CircuitBreaker':
+        """
+        Get the process-wide breaker for a set of hosts.
+
+        Args:
+            hosts: Ollama base URLs
+            probe: Availability check used when the breaker is half-open
+
+        Returns:
+            Shared CircuitBreaker instance
+        """
+        key = tuple(hosts)
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(probe)
+            return cls._registry[key]
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go to Ollama.
+
+        In the open state this returns False until the cooldown expires;
+        then one caller runs the half-open probe on behalf of everyone.
+
+        Returns:
+            bool: True if the call should proceed
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN or time.time() < self.open_until:
+                return False
+            self.state = self.HALF_OPEN
+
+        # Probe outside the lock so other callers fail fast meanwhile
+        healthy = False
+        try:
+            healthy = self.probe()
+        except Exception:
+            healthy = False
+
+        if healthy:
+            self.record_success()
+            print("  ✅ Ollama reachable again, circuit closed", flush=True)
+        else:
+            with self._lock:
+                self._open()
+        return healthy
+
+    def record_success(self):
+        """Reset the breaker after a successful call"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._open_count = 0
+
+    def record_failure(self):
+        """Count a connection failure and open the breaker at the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= self.threshold:
+                self.trips += 1
+                self._open()
+
+    def _open(self):
+        """Open the breaker for a jittered, exponentially growing cooldown (lock held)"""
+        self._open_count += 1
+        cooldown = backoff_delay(self._open_count, self.base_cooldown, self.max_cooldown)
+        self.state = self.OPEN
+        self.open_until = time.time() + cooldown
+        print(f"  ⛔ Ollama unreachable, circuit open for {cooldown:.0f}s", flush=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get breaker state.
+
+        Returns:
+            Dictionary with state, failure count and seconds until next probe
+        """
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'trips': self.trips,
+                'retry_in_seconds': max(0, round(self.open_until - time.time(), 1))
+                if self.state == self.OPEN else 0
+            }
@@ -4,11 +4,30 @@ CV Analyzer Service
 Analyzes CVs against job requirements using Ollama LLM.
 Extracts structured data and categorizes candidates.
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable
 from src.services.ollama_client import OllamaClient
+from src.services.circuit_breaker import OllamaUnavailableError
 from src.services.candidate_service import CandidateService
 from src.services.settings_service import SettingsService
+from src.services.prompt_session import JobPromptSession
+from src.services.prompt_templates import PromptTemplate, CompiledPrompt, ANALYSIS_TEMPLATE
+from src.services.telemetry_service import TelemetryService
+from src.services.output_budget import OutputBudget
+from src.services.prompt_budget import PromptBudget
+from src.services.response_parser import ResponseParser, IncrementalResponseParser
+from src.services.analysis_progress import AnalysisProgress
+from src.services.prescreener import Prescreener
+from src.services.embedding_service import EmbeddingService
+from src.utils.config import Config
+import hashlib
+import json
 import re
+import threading
+
+
+class AnalysisCancelledError(Exception):
+    """Raised when a candidate's analysis is cancelled while it runs"""
+    pass
 
 
 class CVAnalyzer:
@@ -22,6 +41,136 @@ class CVAnalyzer:
         'below_average': 0
     }
     
+    # Template fields that must be complete before a streamed response
+    # can be cut off (in template order, ending with the last field)
+    REQUIRED_FIELDS = [
+        'Name:', 'Email:', 'Phone:', 'Match Score:', 'Experience Years:',
+        'Matched Skills:', 'Missing Skills:', 'Education:',
+        'Key Strengths:', 'Concerns:', 'Summary:', 'Salary Estimate:'
+    ]
+    
+    # Fields of the score-only triage pass
+    TRIAGE_FIELDS = ['Name:', 'Email:', 'Phone:', 'Match Score:']
+    TRIAGE_KEYS = ['name', 'email', 'phone', 'score']
+    
+    # Output budget of a triage pass (four short lines)
+    TRIAGE_NUM_PREDICT = 96
+    
+    # Verbose fields generated lazily after a triage pass
+    DETAIL_FIELDS = [
+        'experience_years', 'matched_skills', 'missing_skills', 'education',
+        'strengths', 'concerns', 'summary'
+    ]
+    
+    # JSON schema sent as Ollama's `format` in structured output mode
+    ANALYSIS_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'name': {'type': 'string'},
+            'email': {'type': 'string'},
+            'phone': {'type': 'string'},
+            'match_score': {'type': 'integer', 'minimum': 0, 'maximum': 100},
+            'experience_years': {'type': 'integer', 'minimum': 0},
+            'matched_skills': {'type': 'array', 'items': {'type': 'string'}},
+            'missing_skills': {'type': 'array', 'items': {'type': 'string'}},
+            'education': {'type': 'string'},
+            'key_strengths': {'type': 'array', 'items': {'type': 'string'}},
+            'concerns': {'type': 'array', 'items': {'type': 'string'}},
+            'summary': {'type': 'string'},
+            'salary_estimate': {'type': 'string'}
+        },
+        'required': [
+            'name', 'email', 'phone', 'match_score', 'experience_years',
+            'matched_skills', 'missing_skills', 'education',
+            'key_strengths', 'concerns', 'summary', 'salary_estimate'
+        ]
+    }
+    
+    # JSON schema of the triage pass in structured output mode
+    TRIAGE_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'name': {'type': 'string'},
+            'email': {'type': 'string'},
+            'phone': {'type': 'string'},
+            'match_score': {'type': 'integer', 'minimum': 0, 'maximum': 100}
+        },
+        'required': ['name', 'email', 'phone', 'match_score']
+    }
+    
+    # Instructions used when no custom system prompt is configured
+    DEFAULT_INSTRUCTIONS = """**INSTRUCTIONS:**
+Analyze this CV and provide a structured assessment. Extract information EXACTLY in this format:
+
+Name: [candidate's full name]
+Email: [email address if found, or "Not provided"]
+Phone: [phone number if found, or "Not provided"]
+Match Score: [number from 0-100 based on job fit]
+Experience Years: [total years of relevant experience]
+Matched Skills: [comma-separated list of skills from CV that match job requirements]
+Missing Skills: [comma-separated list of required skills NOT found in CV]
+Education: [highest degree and field, e.g., "BS Computer Science"]
+Key Strengths:
+- [strength 1 - specific achievement or skill]
+- [strength 2]
+- [strength 3]
+Concerns:
+- [concern 1 - gaps or missing qualifications]
+- [concern 2]
+Summary: [2-3 sentence overall assessment of candidate fit]
+Salary Estimate: [Estimate salary range in USD/month based on candidate level, job budget, and Cambodia market rates]
+
+
+**SCORING GUIDELINES:**
+- 85-100: Excellent match, exceeds requirements
+- 70-84: Good match, meets most requirements
+- 50-69: Average match, meets basic requirements
+- 0-49: Below requirements, significant gaps
+
+Be specific and honest. Base the score on actual qualifications, not potential."""
+    
+    # Instructions of the triage pass: score and contact only
+    TRIAGE_INSTRUCTIONS = """**INSTRUCTIONS:**
+Score how well this CV fits the job. Reply with EXACTLY these four lines and nothing else:
+
+Name: [candidate's full name]
+Email: [email address if found, or "Not provided"]
+Phone: [phone number if found, or "Not provided"]
+Match Score: [number from 0-100 based on job fit]
+
+**SCORING GUIDELINES:**
+- 85-100: Excellent match, exceeds requirements
+- 70-84: Good match, meets most requirements
+- 50-69: Average match, meets basic requirements
+- 0-49: Below requirements, significant gaps
+
+Base the score on actual qualifications, not potential."""
+    
+    # Stop generating once the model starts commentary after the last field
+    STOP_SEQUENCES = ['\n\n\n', '\nNote:', '\n---']
+    
+    # Template lines asked for again when a field is missing or implausible,
+    # with the output budget each line needs
+    REPAIR_LINES = {
+        'name': ("Name: [candidate's full name]", 16),
+        'score': ('Match Score: [number from 0-100 based on job fit]', 8),
+        'matched_skills': ('Matched Skills: [comma-separated list of skills from CV that match job requirements]', 48),
+        'missing_skills': ('Missing Skills: [comma-separated list of required skills NOT found in CV]', 48),
+        'strengths': ('Key Strengths:\n- [strength 1 - specific achievement or skill]\n- [strength 2]\n- [strength 3]', 96),
+        'summary': ('Summary: [2-3 sentence overall assessment of candidate fit]', 96)
+    }
+    
+    # Follow-up prompt appended to the original prompt and answer
+    REPAIR_INSTRUCTIONS = """
+
+**YOUR ANSWER:**
+{response}
+
+**FOLLOW-UP:**
+Some fields above are missing or invalid. Based on the CV, reply with ONLY these lines and nothing else:
+
+{lines}"""
+    
     def __init__(self):
         """Initialize CV analyzer with Ollama client"""
         settings = SettingsService.get_settings()
@@ -29,33 +178,88 @@ class CVAnalyzer:
         self.ollama = OllamaClient(model=settings.get('ollama_model'))
         self.custom_prompt = settings.get('system_prompt')
         self.temperature = float(settings.get('temperature', 0.2))
+        self.stream = bool(settings.get('stream_analysis', True))
+        self.structured_output = bool(settings.get('structured_output', False))
+        self.prescreen_mode = settings.get('prescreen_mode', 'off')
+        self.prescreen_cutoff = float(settings.get('prescreen_cutoff', 0.1))
+        self.queue_order = settings.get('queue_order', 'upload')
+        self.repair_fields = bool(settings.get('repair_fields', True))
+        # Cascade: a fast model scores everyone, the main model re-scores the uncertain band
+        self.fast_ollama = None
+        if settings.get('cascade_enabled') and settings.get('cascade_fast_model'):
+            self.fast_ollama = OllamaClient(model=settings['cascade_fast_model'])
+        band = settings.get('cascade_band') or [55, 80]
+        self.cascade_band = (int(band[0]), int(band[1]))
+        # Triage scores first and generates the verbose fields on demand
+        self.stage = 'triage' if settings.get('analysis_mode') == 'triage' else 'analysis'
+        # Templates per stage, and their compiled prompts per job, for this analyzer's lifetime
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._compiled: Dict[tuple, CompiledPrompt] = {}
+        # Output budget per (model, stage), frozen so a job keeps one num_ctx
+        self._num_predict: Dict[tuple, int] = {}
+        # Identifies the template so output lengths are learned per prompt
+        self.prompt_version = self._prompt_version(self.stage)
     
-    def analyze_candidate(self, candidate_id: int, cv_text: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_candidate(self, candidate_id: int, cv_text: str, job: Dict[str, Any],
+                          session: Optional[JobPromptSession] = None,
+                          bypass_cache: bool = False,
+                          fast_session: Optional[JobPromptSession] = None,
+                          full_model: bool = False,
+                          cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
         """
         Analyze a single candidate CV against job requirements.
         
+        In cascade mode the fast model scores the candidate first and the
+        main model only re-scores it if the score lands in the uncertainty
+        band.
+        
         Args:
             candidate_id: ID of candidate record in database
             cv_text: Extracted text from CV
             job: Job dictionary with requirements and description
+            session: Optional batch session that primed the job's prompt prefix
+            bypass_cache: Force a fresh generation instead of a cached response
+            fast_session: Optional batch session for the cascade's fast model
+            full_model: Skip the cascade and use the main model directly
+            cancel: Optional event that aborts the analysis (and its streamed
+                generation) when set
         
         Returns:
             Dictionary with analysis results
+            
+        Raises:
+            AnalysisCancelledError: If cancel was set; the candidate stays pending
         """
         try:
-            # Build prompt for LLM
-            prompt = self._build_prompt(cv_text, job)
+            # Build prompt for LLM (the job part is compiled once per job)
+            compiled = self._compile_prompt(job, self.stage)
+            prompt = compiled.render(PromptBudget.compress_cv(cv_text, job))
             
-            # Get LLM response
             print(f"  🤖 Analyzing candidate {candidate_id}...", flush=True)
-            response = self.ollama.generate(
-                prompt=prompt,
-                temperature=self.temperature,
-                num_predict=2000
-            )
+            analysis = None
+            if self.fast_ollama and not full_model:
+                analysis = self._run_model(self.fast_ollama, prompt, compiled, candidate_id, job,
+                                           fast_session, bypass_cache, self.stage, cancel)
+                analysis['analysis_tier'] = 'fast'
+                analysis['analysis_model'] = self.fast_ollama.model
+                
+                low, high = self.cascade_band
+                if low <= analysis['score'] <= high:
+                    print(f"  ⚖️  Score {analysis['score']} is borderline, "
+                          f"re-scoring with {self.ollama.model}", flush=True)
+                    analysis = None
             
-            # Parse response into structured data
-            analysis = self._parse_response(response)
+            if analysis is None:
+                analysis = self._run_model(self.ollama, prompt, compiled, candidate_id, job,
+                                           session, bypass_cache, self.stage, cancel)
+                analysis['analysis_tier'] = 'full'
+                analysis['analysis_model'] = self.ollama.model
+            
+            if self.stage == 'triage':
+                # Parser fallbacks are placeholders; real details come later
+                analysis.update({'matched_skills': [], 'missing_skills': [], 'experience_years': 0,
+                                 'education': {}, 'strengths': [], 'concerns': [], 'summary': '',
+                                 'salary_estimate': None, 'details_pending': True})
             
             # Categorize by score
             analysis['category'] = self._get_category(analysis['score'])
@@ -77,16 +281,408 @@ class CVAnalyzer:
             
             return analysis
             
+        except OllamaUnavailableError:
+            # Not the candidate's fault: leave it pending for the next run
+            print(f"  ⏸️  Ollama unavailable, candidate {candidate_id} left pending", flush=True)
+            raise
+        except AnalysisCancelledError:
+            print(f"  ⏹️  Analysis of candidate {candidate_id} cancelled, left pending", flush=True)
+            raise
         except Exception as e:
             error_msg = f"Analysis failed: {str(e)}"
             print(f"  ❌ Error analyzing candidate {candidate_id}: {error_msg}")
             CandidateService.mark_error(candidate_id, error_msg)
             raise
+        finally:
+            AnalysisProgress.clear(job.get('id'), candidate_id)
+    
+    def generate_details(self, candidate: Dict[str, Any], job: Dict[str, Any],
+                         cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Generate the verbose fields of a triaged candidate and store them.
+        
+        Runs the full analysis prompt with the main model but keeps the
+        triage score, category and contact details, so the ranking a
+        recruiter has seen doesn't change when they open a candidate.
+        Called by the analysis worker for queued detail requests.
+        
+        Args:
+            candidate: Candidate dictionary (with cv_text)
+            job: Job details
+            cancel: Optional event that aborts the generation when set
+            
+        Returns:
+            Updated candidate dictionary
+            
+        Raises:
+            AnalysisCancelledError: If cancel was set; details stay pending
+        """
+        compiled = self._compile_prompt(job, 'details')
+        prompt = compiled.render(PromptBudget.compress_cv(candidate.get('cv_text') or '', job))
+        
+        print(f"  📝 Generating details for candidate {candidate['id']}...", flush=True)
+        analysis = self._run_model(self.ollama, prompt, compiled, candidate['id'], job,
+                                   None, False, 'details', cancel)
+        
+        details = {field: analysis[field] for field in self.DETAIL_FIELDS}
+        # Salary follows the triage score unless the job has no range to derive it from
+        if not candidate.get('salary_estimate'):
+            details['salary_estimate'] = analysis.get('salary_estimate')
+        
+        CandidateService.update_details(candidate['id'], details)
+        return CandidateService.get_by_id(candidate['id'])
+    
+    def _run_model(self, ollama: OllamaClient, prompt: str, compiled: CompiledPrompt, candidate_id: int,
+                   job: Dict[str, Any], session: Optional[JobPromptSession],
+                   bypass_cache: bool, stage: str = 'analysis',
+                   cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Analyze a prompt with one model and parse the result.
+        
+        Args:
+            ollama: Client for the model to use
+            prompt: Full analysis prompt
+            compiled: The job's compiled prompt the prompt was rendered from
+            candidate_id: Candidate the call is made for
+            job: Job details
+            session: Optional batch session for this model
+            bypass_cache: Force a fresh generation instead of a cached response
+            stage: analysis, triage (score and contact only) or details
+            cancel: Optional event that aborts the analysis when set
+            
+        Returns:
+            Parsed analysis dictionary, with the prompt_version it was made with
+        """
+        prompt_version = compiled.version
+        
+        # Get LLM response
+        self._check_cancelled(cancel)
+        num_predict = self._get_num_predict(ollama, stage)
+        result = self._generate(ollama, prompt, num_predict, self._get_num_ctx(compiled, num_predict),
+                                bypass_cache, stage,
+                                self._track_progress(ollama, candidate_id, job, stage, cancel))
+        self._check_cancelled(cancel)
+        
+        if self._is_truncated(result, num_predict):
+            # Budget was too small for this CV: record it and retry bigger
+            TelemetryService.record(candidate_id, job.get('id'), ollama.model, result,
+                                    stage=stage, prompt_version=prompt_version)
+            OutputBudget.invalidate(ollama.model, prompt_version, stage)
+            num_predict = OutputBudget.expand(num_predict)
+            print(f"  📏 Output truncated, retrying with num_predict={num_predict}", flush=True)
+            result = self._generate(ollama, prompt, num_predict, self._get_num_ctx(compiled, num_predict),
+                                    bypass_cache, stage,
+                                    self._track_progress(ollama, candidate_id, job, stage, cancel))
+            self._check_cancelled(cancel)
+        
+        # Parse response into structured data
+        if self.structured_output:
+            analysis = self._parse_structured_response(result['response'])
+        else:
+            analysis = self._parse_response(result['response'])
+        
+        if session:
+            session.record(result, prompt)
+        TelemetryService.record(candidate_id, job.get('id'), ollama.model, result,
+                                stage=stage, prompt_version=prompt_version)
+        
+        # An aborted generation is partial on purpose (see _track_progress)
+        missing = self._find_invalid_fields(analysis, stage)
+        if missing and self.repair_fields and result.get('done_reason') != 'aborted':
+            # The job's window, not one sized for a retried budget: any other num_ctx reloads the model
+            num_ctx = self._get_num_ctx(compiled, self._get_num_predict(ollama, stage))
+            analysis.update(self._repair_fields(ollama, prompt, result['response'], missing,
+                                                candidate_id, job, num_ctx, bypass_cache, cancel))
+            self._check_cancelled(cancel)
+        
+        analysis['prompt_version'] = prompt_version
+        return self._finalize_analysis(analysis)
+    
+    @staticmethod
+    def _check_cancelled(cancel: Optional[threading.Event]):
+        """
+        Stop an analysis whose cancel event is set.
+        
+        Args:
+            cancel: Cancel event of the analysis, if any
+            
+        Raises:
+            AnalysisCancelledError: If the event is set
+        """
+        if cancel is not None and cancel.is_set():
+            raise AnalysisCancelledError("Analysis cancelled")
+    
+    def _find_invalid_fields(self, analysis: Dict[str, Any], stage: str) -> list:
+        """
+        Find fields the parser had to default, or that hold template text.
+        
+        A score of 0 is almost always a parsing miss rather than a bad fit,
+        so it is treated as missing too.
+        
+        Args:
+            analysis: Parsed fields (before _finalize_analysis)
+            stage: analysis, triage or details
+            
+        Returns:
+            List of field names to repair (keys of REPAIR_LINES)
+        """
+        def placeholder(text) -> bool:
+            return not text or text.startswith('[')
+        
+        invalid = []
+        if stage != 'details':
+            name = analysis['name']
+            if name == 'Unknown Candidate' or placeholder(name) or '@' in name:
+                invalid.append('name')
+            if not analysis['score']:
+                invalid.append('score')
+        
+        if stage != 'triage':
+            if not analysis['matched_skills'] and not analysis['missing_skills']:
+                invalid += ['matched_skills', 'missing_skills']
+            if not analysis['strengths']:
+                invalid.append('strengths')
+            if analysis['summary'] == 'No summary provided' or placeholder(analysis['summary']):
+                invalid.append('summary')
+        
+        return invalid
+    
+    def _repair_fields(self, ollama: OllamaClient, prompt: str, response: str,
+                       fields: list, candidate_id: int, job: Dict[str, Any],
+                       num_ctx: int, bypass_cache: bool,
+                       cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Ask the model again for just the fields that are missing.
+        
+        The follow-up extends the original prompt and answer, so Ollama
+        reuses the evaluated prompt and only a few lines are generated,
+        instead of a full re-analysis.
+        
+        Args:
+            ollama: Client for the model that gave the answer
+            prompt: Original analysis prompt
+            response: The model's answer
+            fields: Field names to repair (keys of REPAIR_LINES)
+            candidate_id: Candidate the call is made for
+            job: Job details
+            num_ctx: The job's context window (the model is loaded with it)
+            bypass_cache: Force a fresh generation instead of a cached response
+            cancel: Optional event that aborts the follow-up when set
+            
+        Returns:
+            Repaired fields that are now valid (may be empty)
+        """
+        lines = '\n'.join(self.REPAIR_LINES[field][0] for field in fields)
+        repair_prompt = prompt + self.REPAIR_INSTRUCTIONS.format(response=response.strip(), lines=lines)
+        repair_predict = sum(self.REPAIR_LINES[field][1] for field in fields)
+        
+        print(f"  🩹 Repairing {', '.join(fields)} for candidate {candidate_id}", flush=True)
+        try:
+            result = ollama.generate_full(
+                prompt=repair_prompt,
+                temperature=self.temperature,
+                num_predict=repair_predict,
+                num_ctx=num_ctx,
+                stop=self.STOP_SEQUENCES,
+                stream=cancel is not None,
+                on_token=self._cancel_watch(cancel),
+                use_cache=not bypass_cache
+            )
+        except OllamaUnavailableError:
+            raise
+        except (ConnectionError, TimeoutError, ValueError) as e:
+            print(f"  ⚠️  Field repair failed: {e}", flush=True)
+            return {}
+        
+        TelemetryService.record(candidate_id, job.get('id'), ollama.model, result,
+                                stage='repair', prompt_version=self._prompt_version('repair'))
+        
+        repaired = ResponseParser.parse(result['response'])
+        still_invalid = set(self._find_invalid_fields(repaired, 'analysis'))
+        fixed = {field: repaired[field] for field in fields if field not in still_invalid}
+        if fixed:
+            print(f"  ✅ Repaired {', '.join(fixed)}", flush=True)
+        return fixed
+    
+    def _get_num_predict(self, ollama: OllamaClient, stage: str) -> int:
+        """
+        Output budget for a stage.
+        
+        The learned budget is read once per model and stage and then kept
+        for the analyzer's lifetime (a job's batch): a budget that moves
+        mid-batch would change num_ctx and make Ollama reload the model.
+        
+        Args:
+            ollama: Client for the model to use
+            stage: analysis, triage or details
+            
+        Returns:
+            int: num_predict to send
+        """
+        if stage == 'triage':
+            return self.TRIAGE_NUM_PREDICT
+        key = (ollama.model, stage)
+        if key not in self._num_predict:
+            self._num_predict[key] = OutputBudget.get_num_predict(
+                ollama.model, self._prompt_version(stage), stage)
+        return self._num_predict[key]
+    
+    def _track_progress(self, ollama: OllamaClient, candidate_id: int, job: Dict[str, Any],
+                        stage: str, cancel: Optional[threading.Event] = None
+                        ) -> Optional[Callable[[str], bool]]:
+        """
+        Token callback publishing the fields of a streamed response as they
+        complete (see AnalysisProgress).
+        
+        In the cascade's fast pass it also aborts the generation as soon as
+        the score lands in the uncertainty band: the main model re-scores
+        the candidate, so the rest of the fast output would be discarded.
+        Setting the cancel event aborts the generation at the next token.
+        
+        Args:
+            ollama: Client for the model to use
+            candidate_id: Candidate the call is made for
+            job: Job details
+            stage: analysis, triage or details
+            cancel: Optional cancel event of the analysis
+            
+        Returns:
+            on_token callback for generate_full(). Responses that aren't
+            streamed as text, and on-demand details passes, publish no
+            fields: they only get a cancel watch (None without a cancel event)
+        """
+        if not self.stream or self.structured_output or stage == 'details':
+            return self._cancel_watch(cancel)
+        
+        job_id = job.get('id')
+        parser = IncrementalResponseParser(self.TRIAGE_KEYS if stage == 'triage' else None)
+        escalates = ollama is self.fast_ollama
+        low, high = self.cascade_band
+        AnalysisProgress.start(job_id, candidate_id, ollama.model)
+        
+        def on_token(token: str) -> bool:
+            if cancel is not None and cancel.is_set():
+                return True
+            fields = parser.feed(token)
+            if not fields:
+                return False
+            AnalysisProgress.update(job_id, candidate_id, fields)
+            if escalates and 'score' in fields and low <= fields['score'] <= high:
+                print(f"  ⚖️  Fast model scored {fields['score']}, "
+                      f"skipping the rest of its output", flush=True)
+                return True
+            return False
+        
+        return on_token
+    
+    @staticmethod
+    def _cancel_watch(cancel: Optional[threading.Event]) -> Optional[Callable[[str], bool]]:
+        """
+        Token callback that aborts a streamed generation once cancel is set.
+        
+        Args:
+            cancel: Cancel event of the analysis, if any
+            
+        Returns:
+            on_token callback for generate_full(), or None without an event
+        """
+        if cancel is None:
+            return None
+        return lambda token: cancel.is_set()
+    
+    def _generate(self, ollama: OllamaClient, prompt: str, num_predict: int, num_ctx: int,
+                  bypass_cache: bool = False, stage: str = 'analysis',
+                  on_token: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+        """
+        Run one analysis generation.
+        
+        Args:
+            ollama: Client for the model to use
+            prompt: Full analysis prompt
+            num_predict: Output token budget
+            num_ctx: Context window for prompt plus output
+            bypass_cache: Force a fresh generation instead of a cached response
+            stage: analysis, triage or details
+            on_token: Optional streamed-token callback. A call with one is
+                always streamed, so it can be aborted.
+            
+        Returns:
+            Ollama result from generate_full()
+        """
+        triage = stage == 'triage'
+        
+        if self.structured_output:
+            # Schema-constrained JSON ends on its own, no early stop needed.
+            # Ollama streams it like text, which lets a cancel abort it
+            return ollama.generate_full(
+                prompt=prompt,
+                temperature=self.temperature,
+                num_predict=num_predict,
+                num_ctx=num_ctx,
+                format=self.TRIAGE_SCHEMA if triage else self.ANALYSIS_SCHEMA,
+                stream=on_token is not None,
+                on_token=on_token,
+                use_cache=not bypass_cache
+            )
+        
+        fields = self.TRIAGE_FIELDS if triage else self.REQUIRED_FIELDS
+        return ollama.generate_full(
+            prompt=prompt,
+            temperature=self.temperature,
+            num_predict=num_predict,
+            num_ctx=num_ctx,
+            stop=self.STOP_SEQUENCES,
+            stream=self.stream or on_token is not None,
+            stop_when=(lambda text: self._is_response_complete(text, fields)) if self.stream else None,
+            on_token=on_token,
+            use_cache=not bypass_cache
+        )
+    
+    def _get_num_ctx(self, compiled: CompiledPrompt, num_predict: int) -> int:
+        """
+        Context window for any candidate of a job.
+        
+        Sized for the largest CV the budget allows rather than the actual
+        CV, so all candidates of a job share one num_ctx and Ollama doesn't
+        reload the model (and drop the cached prefix) between them.
+        
+        Args:
+            compiled: The job's compiled prompt
+            num_predict: Output token budget
+            
+        Returns:
+            int: num_ctx to send
+        """
+        prompt_tokens = (PromptBudget.estimate_tokens(compiled.render(''))
+                         + Config.PROMPT_CV_TOKENS)
+        return PromptBudget.num_ctx_for(prompt_tokens, num_predict)
+    
+    def _is_truncated(self, result: Dict[str, Any], num_predict: int) -> bool:
+        """
+        Check whether a generation ran out of output budget.
+        
+        Args:
+            result: Ollama result from generate_full()
+            num_predict: Budget the call was made with
+            
+        Returns:
+            bool: True if the output was cut off by num_predict
+        """
+        if result.get('stopped_early'):
+            return False
+        if result.get('done_reason') == 'length':
+            return True
+        # Older Ollama versions don't report done_reason
+        return (result.get('eval_count') or 0) >= num_predict
     
     def _build_prompt(self, cv_text: str, job: Dict[str, Any]) -> str:
         """
         Build structured prompt for LLM analysis.
         
+        The job block and instructions come first and the CV last, so every
+        candidate of a job shares a byte-identical prefix that Ollama can
+        serve from its prompt cache.
+        
         Args:
             cv_text: Extracted CV text
             job: Job details
@@ -94,212 +690,195 @@ class CVAnalyzer:
         Returns:
             Formatted prompt string
         """
-        # Format requirements
-        requirements_list = '\n'.join(f"- {req}" for req in job.get('requirements', []))
+        return self._compile_prompt(job, self.stage).render(PromptBudget.compress_cv(cv_text, job))
+    
+    def _compile_prompt(self, job: Dict[str, Any], stage: str = 'analysis') -> CompiledPrompt:
+        """
+        Compile a stage's prompt for a job (once per job and analyzer).
         
-        # Format skills
-        skills_str = ', '.join(job.get('skills', []))
+        Args:
+            job: Job details
+            stage: analysis, triage or details
+            
+        Returns:
+            CompiledPrompt whose prefix (job details and instructions) ends
+            right before the CV
+        """
+        key = (job.get('id'), stage)
+        compiled = self._compiled.get(key) if key[0] is not None else None
+        if compiled is None:
+            compiled = self._get_template(stage).compile(**PromptTemplate.job_fields(job))
+            if key[0] is not None:
+                self._compiled[key] = compiled
+        return compiled
+    
+    def _get_template(self, stage: str = 'analysis') -> PromptTemplate:
+        """
+        Get the prompt template of a stage.
         
-        # Default instructions
-        default_instructions = """**INSTRUCTIONS:**
-Analyze this CV and provide a structured assessment. Extract information EXACTLY in this format:
-
-Name: [candidate's full name]
-Email: [email address if found, or "Not provided"]
-Phone: [phone number if found, or "Not provided"]
-Match Score: [number from 0-100 based on job fit]
-Experience Years: [total years of relevant experience]
-Matched Skills: [comma-separated list of skills from CV that match job requirements]
-Missing Skills: [comma-separated list of required skills NOT found in CV]
-Education: [highest degree and field, e.g., "BS Computer Science"]
-Key Strengths:
-- [strength 1 - specific achievement or skill]
-- [strength 2]
-- [strength 3]
-Concerns:
-- [concern 1 - gaps or missing qualifications]
-- [concern 2]
-Summary: [2-3 sentence overall assessment of candidate fit]
-Salary Estimate: [Estimate salary range in USD/month based on candidate level, job budget, and Cambodia market rates]
-
-
-**SCORING GUIDELINES:**
-- 85-100: Excellent match, exceeds requirements
-- 70-84: Good match, meets most requirements
-- 50-69: Average match, meets basic requirements
-- 0-49: Below requirements, significant gaps
-
-Be specific and honest. Base the score on actual qualifications, not potential."""
+        Args:
+            stage: analysis, triage or details
+            
+        Returns:
+            PromptTemplate with the stage's instructions
+        """
+        template = self._templates.get(stage)
+        if template is None:
+            template = PromptTemplate(ANALYSIS_TEMPLATE, instructions=self._get_instructions(stage))
+            self._templates[stage] = template
+        return template
+    
+    def _get_instructions(self, stage: str = 'analysis') -> str:
+        """
+        Get the analysis instructions (custom prompt or default template).
+        
+        Args:
+            stage: analysis, triage or details
+        
+        Returns:
+            Instructions block placed before the CV
+        """
+        if stage == 'triage':
+            instructions = self.TRIAGE_INSTRUCTIONS
+            if getattr(self, 'structured_output', False):
+                instructions += """
 
+**OUTPUT FORMAT:**
+Respond with a single JSON object using these keys: name, email, phone, match_score."""
+            return instructions
+        
         # Use custom prompt if configured
-        instructions = default_instructions
+        instructions = self.DEFAULT_INSTRUCTIONS
         if getattr(self, 'custom_prompt', None) and len(self.custom_prompt.strip()) > 10:
             instructions = self.custom_prompt
+        
+        if getattr(self, 'structured_output', False):
+            instructions += """
 
-        prompt = f"""You are an expert HR recruiter analyzing a candidate's CV for a job position.
-
-**JOB DETAILS:**
-Position: {job['title']}
-Company: {job['company']}
-
-Job Description:
-{job['description']}
-
-Required Qualifications:
-{requirements_list}
-
-Desired Skills: {skills_str}
-Salary Range: {job.get('salary_range', 'Not specified')}
-
-**SALARY ESTIMATION CONTEXT:**
-- Base the estimate on the candidate's experience, skills match, and the job's salary range (if provided).
-- Consider the market rates for this role in **Cambodia**.
-- If the candidate is overqualified/underqualified, adjust the estimate accordingly within or outside the job's range.
-
----
-
-**CANDIDATE CV:**
-{cv_text[:4000]}
-
----
-
-{instructions}"""
+**OUTPUT FORMAT:**
+Respond with a single JSON object using these keys: name, email, phone, match_score,
+experience_years, matched_skills, missing_skills, education, key_strengths, concerns,
+summary, salary_estimate. Use "Not provided" for missing contact details."""
         
-        return prompt
+        return instructions
+    
+    def _prompt_version(self, stage: str = 'analysis') -> str:
+        """
+        Version hash of a stage's instructions.
+        
+        Args:
+            stage: analysis, triage, details or repair
+            
+        Returns:
+            12-character hash identifying the template
+        """
+        if stage == 'repair':
+            return hashlib.sha256(self.REPAIR_INSTRUCTIONS.encode('utf-8')).hexdigest()[:12]
+        return self._get_template(stage).version
+    
+    def _is_response_complete(self, response: str, fields: Optional[list] = None) -> bool:
+        """
+        Check whether a partial response already contains every field.
+        
+        The last field is only complete once its line has ended, so text
+        after it (commentary the model tends to add) can be skipped.
+        
+        Args:
+            response: Text generated so far
+            fields: Expected headers in template order (default: REQUIRED_FIELDS)
+            
+        Returns:
+            bool: True if all required fields have been received
+        """
+        fields = fields or self.REQUIRED_FIELDS
+        text = response.replace('**', '').replace('__', '').lower()
+        
+        for header in fields:
+            if header.lower() not in text:
+                return False
+        
+        last_header = fields[-1].lower()
+        tail = text[text.rfind(last_header) + len(last_header):]
+        value, newline, _ = tail.partition('\n')
+        return bool(newline) and bool(value.strip())
     
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """
         Parse LLM response into structured data.
+        
+        Fields the response lacks get parser defaults; call
+        _finalize_analysis() on the result.
+        """
+        return ResponseParser.parse(response)
+    
+    def _parse_structured_response(self, response: str) -> Dict[str, Any]:
         """
-        # --- Pre-processing / Sanitization ---
-        # 1. Remove markdown bold/italic markers which confuse regex
-        clean_response = response.replace('**', '').replace('__', '')
+        Parse a JSON (structured output) response into structured data.
         
-        # 2. Ensure critical headers are on their own lines (fix inline headers)
-        headers = [
-            'Name:', 'Email:', 'Phone:', 'Match Score:', 'Experience Years:',
-            'Matched Skills:', 'Missing Skills:', 'Education:', 
-            'Key Strengths:', 'Concerns:', 'Recommendation:', 'Summary:', 'Salary Estimate:'
-        ]
-        for header in headers:
-            # Add newline before header if it doesn't have one
-            # Use regex to replace "text Header:" with "text\nHeader:"
-            # CASE INSENSITIVE match for the header text
-            clean_response = re.sub(rf'(?<!\n)({re.escape(header)})', r'\n\1', clean_response, flags=re.IGNORECASE)
-            
-        # Update response variable to use sanitized version for all closures below
-        response = clean_response
-        
-        def extract(pattern: str, default: str = '') -> str:
-            """Extract single value using regex"""
-            # Updated to match sanitized response
-            match = re.search(pattern, response, re.IGNORECASE | re.MULTILINE)
-            return match.group(1).strip() if match else default
-        
-        def extract_list(pattern: str) -> list:
-            """Extract comma-separated list (can be multiline)"""
-            # Use DOTALL to capture across newlines, stopping at double newline or next header
-            prefix = pattern.split('(')[0] # Extract "Header: " part
-            robust_pattern = rf'{prefix}(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)'
-            
-            match = re.search(robust_pattern, response, re.IGNORECASE | re.DOTALL)
-            if match:
-                content = match.group(1)
-                
-                # Extra safety: remove any text that looks like a known header from content
-                for header in headers:
-                   if header.lower() in content.lower():
-                       # Cut off content before the next header if it leaked in
-                       idx = content.lower().find(header.lower())
-                       if idx > 0:
-                           content = content[:idx]
-                
-                # Normalize separators:
-                # 1. Replace newlines with commas (handles vertical lists)
-                content = content.replace('\n', ',')
-                
-                # 2. Replace common bullet separators (*, -, •) with commas
-                # Matches: start/space + bullet + space/end
-                # Uses regex to avoid replacing hyphens in words like "cross-functional"
-                content = re.sub(r'(?:^|\s)(?:[\*•\-])(?:\s|$)', ',', content)
-                
-                items = content.split(',')
-                return [item.strip() for item in items if item.strip()]
-            return []
-        
-        def extract_bullets(header: str) -> list:
-            """Extract bullet point list handling various formats"""
-            bullets = []
-            
-            # Try multiple patterns for flexibility
-            patterns = [
-                # Pattern 1: Header followed by newline then bullets
-                rf'{header}:\s*\n(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)',
-                # Pattern 2: Header with content on same line or next lines  
-                rf'{header}:\s*(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)',
-                # Pattern 3: Just find header and grab everything after until next section
-                rf'{header}[:\s]+(.*?)(?:Concerns|Recommendation|Summary|$)',
-            ]
-            
-            content = None
-            for pattern in patterns:
-                match = re.search(pattern, response, re.IGNORECASE | re.DOTALL)
-                if match and match.group(1).strip():
-                    content = match.group(1).strip()
-                    break
-            
-            if not content:
-                return []
-            
-            # Split by newlines first
-            lines = content.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Skip if this looks like another header
-                if re.match(r'^[A-Z][a-z]+:', line):
-                    break
-                    
-                # Remove common bullet markers (•, -, *, 1., etc.)
-                cleaned = re.sub(r'^[\s•\-\*\>\+]+|^\d+[\.\)]\s*', '', line).strip()
-                
-                # Skip very short or empty results
-                if cleaned and len(cleaned) > 3:
-                    bullets.append(cleaned)
+        Falls back to the regex parser if the model did not return valid JSON.
+        
+        Args:
+            response: Raw LLM response
             
-            return bullets
-
+        Returns:
+            Dictionary with analysis fields (before _finalize_analysis)
+        """
+        try:
+            data = json.loads(response)
+            if not isinstance(data, dict):
+                raise ValueError("Structured response is not a JSON object")
+        except ValueError:
+            print("  ⚠️  Structured output was not valid JSON, using text parser", flush=True)
+            return self._parse_response(response)
         
-        # Extract score with validation
-        score_str = extract(r'Match Score:\s*(\d+)', '0')
-        score = int(score_str) if score_str.isdigit() else 0
-        score = max(0, min(100, score))  # Clamp between 0-100
+        def as_int(value, default: int = 0) -> int:
+            try:
+                return int(float(value))
+            except (TypeError, ValueError):
+                return default
+        
+        def as_list(value) -> list:
+            if isinstance(value, str):
+                value = value.split(',')
+            if not isinstance(value, list):
+                return []
+            return [str(item).strip() for item in value if str(item).strip()]
         
-        # Extract experience years with validation
-        exp_str = extract(r'Experience Years:\s*(\d+)', '0')
-        experience_years = int(exp_str) if exp_str.isdigit() else 0
+        def as_text(value, default):
+            text = str(value).strip() if value is not None else ''
+            return text or default
         
-        # Extract all fields
         analysis = {
-            'name': extract(r'Name:\s*(.+?)(?:\n|$)', 'Unknown Candidate'),
-            'email': extract(r'Email:\s*([^\s]+@[^\s]+|\S+@\S+|Not provided)', None),
-            'phone': extract(r'Phone:\s*([+\d\s\-()]+|Not provided)', None),
-            'score': score,
-            'experience_years': experience_years,
-            'matched_skills': extract_list(r'Matched Skills:\s*(.+?)(?:\n|$)'),
-            'missing_skills': extract_list(r'Missing Skills:\s*(.+?)(?:\n|$)'),
+            'name': as_text(data.get('name'), 'Unknown Candidate'),
+            'email': as_text(data.get('email'), None),
+            'phone': as_text(data.get('phone'), None),
+            'score': max(0, min(100, as_int(data.get('match_score')))),
+            'experience_years': max(0, as_int(data.get('experience_years'))),
+            'matched_skills': as_list(data.get('matched_skills')),
+            'missing_skills': as_list(data.get('missing_skills')),
             'education': {
-                'summary': extract(r'Education:\s*(.+?)(?:\n|$)', 'Not specified')
+                'summary': as_text(data.get('education'), 'Not specified')
             },
-            'strengths': extract_bullets('Key Strengths'),
-            'concerns': extract_bullets('Concerns'),
-            'summary': extract(r'Summary:\s*(.+?)(?:\n\n|$)', 'No summary provided'),
-            'salary_estimate': extract(r'Salary Estimate:\s*(.+?)(?:\n|$)', 'Not available')
+            'strengths': as_list(data.get('key_strengths')),
+            'concerns': as_list(data.get('concerns')),
+            'summary': as_text(data.get('summary'), 'No summary provided'),
+            'salary_estimate': as_text(data.get('salary_estimate'), 'Not available')
         }
         
+        return analysis
+    
+    def _finalize_analysis(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply score-derived fields and defaults shared by all parsers.
+        
+        Args:
+            analysis: Parsed analysis fields
+            
+        Returns:
+            Completed analysis dictionary
+        """
+        score = analysis['score']
+        
         # Determine recommendation based on score (not LLM response)
         # This ensures consistency between score and recommendation
         if score >= 70:
@@ -399,63 +978,118 @@ Salary Range: {job.get('salary_range', 'Not specified')}
         
         return None
     
-    def analyze_batch(self, job_id: int) -> Dict[str, Any]:
+    def prepare_batch(self, job: Dict[str, Any], candidates: list):
         """
-        Analyze all pending candidates for a job.
+        Pre-screen pending candidates and put them in analysis order.
+        
+        The lexical pre-screen needs no LLM, so it runs even while Ollama
+        is down.
         
         Args:
-            job_id: Job ID
+            job: Job details
+            candidates: Pending candidates with cv_text
             
         Returns:
-            Dictionary with analysis statistics
+            Tuple (candidates to analyze in order, number rejected by the pre-screen)
         """
-        from src.services.job_service import JobService
+        candidates, prescreened_count = self._prescreen(job, candidates)
+        if candidates and self.queue_order == 'similarity':
+            candidates = self._order_by_similarity(job, candidates)
+        return candidates, prescreened_count
+    
+    def start_sessions(self, job: Dict[str, Any], cancel: Optional[threading.Event] = None):
+        """
+        Load the model(s) up front and evaluate the shared job prefix once,
+        so neither the first candidate nor later ones pay for it.
         
-        # Get job details
-        job = JobService.get_by_id(job_id)
-        if not job:
-            raise ValueError(f"Job {job_id} not found")
+        Args:
+            job: Job details
+            cancel: Optional event that aborts the priming when set
+            
+        Returns:
+            Tuple (session, fast_session); fast_session is None without a cascade
+        """
+        compiled = self._compile_prompt(job, self.stage)
+        session = self._start_session(self.ollama, compiled, cancel)
+        fast_session = self._start_session(self.fast_ollama, compiled, cancel) if self.fast_ollama else None
+        return session, fast_session
+    
+    def _start_session(self, ollama: OllamaClient, compiled: CompiledPrompt,
+                       cancel: Optional[threading.Event] = None) -> JobPromptSession:
+        """
+        Load a model and prime its prompt cache with the job prefix.
         
-        # Get pending candidates
-        pending_candidates = CandidateService.get_pending(job_id)
+        The model is loaded with the job's context window, since a
+        different num_ctx makes Ollama reload it.
         
-        if not pending_candidates:
-            return {
-                'job_id': job_id,
-                'total': 0,
-                'analyzed': 0,
-                'errors': 0,
-                'message': 'No pending candidates to analyze'
-            }
+        Args:
+            ollama: Client for the model
+            compiled: The job's compiled prompt (its prefix is shared by all candidates)
+            cancel: Optional event that aborts the priming when set
+            
+        Returns:
+            Primed session for the model
+        """
+        num_ctx = self._get_num_ctx(compiled, self._get_num_predict(ollama, self.stage))
+        ollama.warm_up(num_ctx=num_ctx)
         
-        print(f"\n🔍 Analyzing {len(pending_candidates)} candidates for: {job['title']}", flush=True)
-        print("=" * 60, flush=True)
+        session = JobPromptSession(ollama, compiled.prefix)
+        session.prime(cancel=cancel, temperature=self.temperature, num_ctx=num_ctx)
+        return session
+    
+    def _order_by_similarity(self, job: Dict[str, Any], candidates: list) -> list:
+        """
+        Order the queue by embedding similarity to the job, best first.
         
-        analyzed_count = 0
-        error_count = 0
+        Args:
+            job: Job details
+            candidates: Pending candidates with cv_text
+            
+        Returns:
+            Reordered candidates (unchanged if embeddings are unavailable).
+            Only stored vectors are used; CVs that aren't embedded yet keep
+            their upload order after the ranked ones.
+        """
+        try:
+            similarities = EmbeddingService.rank_candidates(job, candidates, stored_only=True)
+        except ValueError as e:
+            print(f"  ⚠️  Similarity ordering unavailable, using upload order: {e}", flush=True)
+            return candidates
         
-        for candidate in pending_candidates:
-            try:
-                self.analyze_candidate(
-                    candidate_id=candidate['id'],
-                    cv_text=candidate['cv_text'],
-                    job=job
-                )
-                analyzed_count += 1
-            except Exception as e:
-                error_count += 1
-                print(f"  ❌ Failed to analyze candidate {candidate['id']}: {e}")
-        
-        print("=" * 60)
-        print(f"✅ Analysis complete: {analyzed_count} analyzed, {error_count} errors\n")
-        
-        # Get updated statistics
-        stats = JobService.get_stats(job_id)
-        
-        return {
-            'job_id': job_id,
-            'total': len(pending_candidates),
-            'analyzed': analyzed_count,
-            'errors': error_count,
-            'stats': stats
-        }
+        print(f"  🧭 Queue ordered by similarity to the job "
+              f"({len(similarities)}/{len(candidates)} CVs embedded)", flush=True)
+        # Similarities range from -1 to 1: CVs without one go last
+        return sorted(candidates, key=lambda c: similarities.get(c['id'], -2), reverse=True)
+    
+    def _prescreen(self, job: Dict[str, Any], candidates: list):
+        """
+        Run the lexical pre-screen on pending candidates.
+        
+        In 'reject' mode candidates below the cutoff are saved as
+        below_average without an LLM call; in 'deprioritize' mode they are
+        moved to the end of the queue.
+        
+        Args:
+            job: Job details
+            candidates: Pending candidates with cv_text
+            
+        Returns:
+            Tuple (candidates to analyze, number rejected)
+        """
+        if self.prescreen_mode not in ('reject', 'deprioritize'):
+            return candidates, 0
+        
+        screener = Prescreener(job, candidates)
+        passed, below = screener.split(candidates, self.prescreen_cutoff)
+        if not below:
+            return candidates, 0
+        
+        if self.prescreen_mode == 'deprioritize':
+            print(f"  🔽 Pre-screen: {len(below)} low-relevance candidates moved to the end", flush=True)
+            return passed + [candidate for candidate, _ in below], 0
+        
+        for candidate, result in below:
+            CandidateService.mark_prescreened(candidate['id'], result)
+        print(f"  🚫 Pre-screen: {len(below)} candidates below {self.prescreen_cutoff:.0%} "
+              f"keyword coverage skipped the LLM", flush=True)
+        return passed, len(below)
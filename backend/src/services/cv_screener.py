@@ -1,12 +1,27 @@
 import re
 from typing import Dict, List
 from src.services.ollama_client import OllamaClient
+from src.services.output_budget import OutputBudget
+from src.services.prompt_budget import PromptBudget
+from src.services.prompt_templates import PromptTemplate, CompiledPrompt, SCREENING_TEMPLATE
+from src.services.telemetry_service import TelemetryService
 
 class CVScreener:
     """Screen CVs against job requirements using Ollama LLM"""
 
+    STAGE = 'screening'
+
+    # Stop generating once the model starts commentary after the last field
+    STOP_SEQUENCES = ['\n\n\n', '\nNote:', '\n---']
+
+    TEMPLATE = PromptTemplate(SCREENING_TEMPLATE)
+
     def __init__(self):
         self.ollama = OllamaClient()
+        # Output lengths are learned per template
+        self.prompt_version = self.TEMPLATE.version
+        # Compiled prompts per job, reused across the CVs of a batch
+        self._compiled: Dict[tuple, CompiledPrompt] = {}
 
     def screen(
         self,
@@ -18,50 +33,54 @@ class CVScreener:
     ) -> Dict:
         """Screen a CV against job requirements"""
 
+        # Keep the CV sections most relevant to the requirements within budget
+        cv_text = PromptBudget.compress_cv(cv_text, {'requirements': job_requirements})
         prompt = self._build_prompt(
             cv_text, job_title, job_description,
             job_requirements, company_name
         )
 
-        response = self.ollama.generate(
+        num_predict = OutputBudget.get_num_predict(self.ollama.model, self.prompt_version, self.STAGE)
+        num_ctx = PromptBudget.num_ctx_for(PromptBudget.estimate_tokens(prompt), num_predict)
+        result = self.ollama.generate_full(
             prompt=prompt,
             temperature=0.3,
-            num_predict=2000
+            num_predict=num_predict,
+            num_ctx=num_ctx,
+            stop=self.STOP_SEQUENCES
         )
-
-        return self._parse_response(response)
+        TelemetryService.record(None, None, self.ollama.model, result,
+                                stage=self.STAGE, prompt_version=self.prompt_version)
+
+        if result.get('done_reason') == 'length':
+            # Budget was too small for this CV: retry once with more room
+            OutputBudget.invalidate(self.ollama.model, self.prompt_version, self.STAGE)
+            result = self.ollama.generate_full(
+                prompt=prompt,
+                temperature=0.3,
+                num_predict=OutputBudget.expand(num_predict),
+                num_ctx=PromptBudget.num_ctx_for(PromptBudget.estimate_tokens(prompt), OutputBudget.expand(num_predict)),
+                stop=self.STOP_SEQUENCES
+            )
+            TelemetryService.record(None, None, self.ollama.model, result,
+                                    stage=self.STAGE, prompt_version=self.prompt_version)
+
+        return self._parse_response(result['response'])
 
     def _build_prompt(self, cv_text, job_title, job_description,
                       job_requirements, company_name) -> str:
-        """Build screening prompt for LLM"""
-        reqs = "\n".join(f"- {r}" for r in job_requirements)
-
-        return f"""You are an expert HR recruiter screening candidates.
-Evaluate this CV for {job_title} at {company_name}.
-
-Job Description:
-{job_description}
-
-Required Qualifications:
-{reqs}
-
-Candidate CV:
-{cv_text}
-
-Provide screening evaluation in EXACTLY this format:
-Match Score: [number 0-100]
-Candidate Name: [name]
-Matched Keywords: [keyword1], [keyword2], [keyword3]
-Missing Keywords: [keyword1], [keyword2]
-Key Strengths:
-• [strength1]
-• [strength2]
-• [strength3]
-Concerns:
-• [concern1]
-Experience Years: [number]
-Recommendation: [SHORTLIST/CONSIDER/PASS]
-Summary: [brief assessment]"""
+        """Build screening prompt for LLM (the job part is compiled once per job)"""
+        key = (job_title, job_description, tuple(job_requirements), company_name)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self.TEMPLATE.compile(**PromptTemplate.job_fields({
+                'title': job_title,
+                'company': company_name,
+                'description': job_description,
+                'requirements': job_requirements
+            }))
+            self._compiled[key] = compiled
+        return compiled.render(cv_text)
 
     def _parse_response(self, response: str) -> Dict:
         """Parse LLM response into structured format"""
@@ -0,0 +1,256 @@
+"""
+Embedding Service
+
+Embeds job descriptions and CVs with an Ollama embedding model and ranks
+candidates by cosine similarity to their job. Vectors are stored once
+per distinct text as unit-length float32 blobs, so ranking a job is a
+single matrix-vector product over its candidates.
+
+Texts are embedded in the background when CVs are uploaded and jobs are
+saved, so request handlers rank with stored vectors only and never wait
+on the embedding model.
+"""
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from src.database.db import get_db
+from src.utils.config import Config
+
+
+class EmbeddingService:
+    """Service for CV and job embeddings"""
+
+    _client = None
+    # Hashes being embedded in the background (not started twice)
+    _pending: set = set()
+    _pending_lock = threading.Lock()
+
+    @classmethod
+    def _get_client(cls):
+        """Get the client for the embedding model (created once)"""
+        if cls._client is None or cls._client.model != Config.OLLAMA_EMBED_MODEL:
+            from src.services.ollama_client import OllamaClient
+            cls._client = OllamaClient(model=Config.OLLAMA_EMBED_MODEL)
+        return cls._client
+
+    @staticmethod
+    def _prepare(text: str) -> str:
+        """Collapse whitespace and cap the length sent to the model"""
+        return ' '.join((text or '').split())[:Config.EMBEDDING_MAX_CHARS]
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        """Content hash identifying an embedded text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def job_text(job: Dict[str, Any]) -> str:
+        """
+        Text that represents a job for embedding.
+
+        Args:
+            job: Job dictionary
+
+        Returns:
+            Title, description, requirements and skills as one text
+        """
+        return '\n'.join([
+            job.get('title', ''),
+            job.get('description', ''),
+            'Requirements: ' + '; '.join(job.get('requirements', [])),
+            'Skills: ' + ', '.join(job.get('skills', []))
+        ])
+
+    @classmethod
+    def get_vectors(cls, texts: List[str]) -> np.ndarray:
+        """
+        Get unit-length embeddings, computing only the missing ones.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one row per text
+        """
+        model = Config.OLLAMA_EMBED_MODEL
+        prepared = [cls._prepare(text) for text in texts]
+        hashes = [cls._hash(text) for text in prepared]
+
+        vectors = cls._load(set(hashes), model)
+
+        # Embed each distinct missing text once
+        missing = list(dict.fromkeys(h for h in hashes if h not in vectors))
+        if missing:
+            by_hash = dict(zip(hashes, prepared))
+            client = cls._get_client()
+            for start in range(0, len(missing), Config.EMBEDDING_BATCH_SIZE):
+                batch = missing[start:start + Config.EMBEDDING_BATCH_SIZE]
+                embedded = client.embed([by_hash[h] for h in batch])
+                new = {h: cls._normalize(v) for h, v in zip(batch, embedded)}
+                cls._store(new, model)
+                vectors.update(new)
+            print(f"  🧭 Embedded {len(missing)} texts with {model}", flush=True)
+
+        if not hashes:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([vectors[h] for h in hashes])
+
+    @classmethod
+    def get_stored_vectors(cls, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Get the embeddings that are already stored, without calling the model.
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            One unit-length vector per text, or None where it isn't embedded yet
+        """
+        hashes = [cls._hash(cls._prepare(text)) for text in texts]
+        vectors = cls._load(set(hashes), Config.OLLAMA_EMBED_MODEL)
+        return [vectors.get(h) for h in hashes]
+
+    @classmethod
+    def embed_async(cls, texts: List[str]):
+        """
+        Embed texts in a background thread (e.g. new CVs or a saved job).
+
+        Texts that are stored already, or being embedded by an earlier
+        call, are skipped. Failures are logged; the texts are picked up
+        again by the next call that needs them.
+
+        Args:
+            texts: Texts to embed
+        """
+        by_hash = {cls._hash(cls._prepare(text)): text for text in texts}
+        with cls._pending_lock:
+            hashes = set(by_hash) - cls._pending
+            cls._pending.update(hashes)
+        if not hashes:
+            return
+
+        def run():
+            try:
+                cls.get_vectors([by_hash[h] for h in hashes])
+            except (ConnectionError, ValueError) as e:
+                print(f"  ⚠️  Background embedding failed: {e}", flush=True)
+            finally:
+                with cls._pending_lock:
+                    cls._pending.difference_update(hashes)
+
+        threading.Thread(target=run, name='embedder', daemon=True).start()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        """Scale to unit length so cosine similarity is a dot product"""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    @staticmethod
+    def _load(hashes: set, model: str) -> Dict[str, np.ndarray]:
+        """
+        Load stored vectors.
+
+        Args:
+            hashes: Content hashes to look up
+            model: Embedding model
+
+        Returns:
+            Dictionary of content hash to vector
+        """
+        if not hashes:
+            return {}
+
+        found = {}
+        keys = list(hashes)
+        with get_db() as conn:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ', '.join(['?'] * len(chunk))
+                rows = conn.execute(
+                    f'SELECT content_hash, vector FROM embeddings '
+                    f'WHERE model = ? AND content_hash IN ({placeholders})',
+                    [model] + chunk
+                ).fetchall()
+                for row in rows:
+                    found[row['content_hash']] = np.frombuffer(row['vector'], dtype=np.float32)
+        return found
+
+    @staticmethod
+    def _store(vectors: Dict[str, np.ndarray], model: str):
+        """
+        Store vectors as float32 blobs.
+
+        Args:
+            vectors: Dictionary of content hash to vector
+            model: Embedding model
+        """
+        with get_db() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO embeddings (content_hash, model, dim, vector)
+                VALUES (?, ?, ?, ?)
+            ''', [(h, model, len(v), v.astype(np.float32).tobytes()) for h, v in vectors.items()])
+
+    @classmethod
+    def rank_candidates(cls, job: Dict[str, Any], candidates: List[Dict[str, Any]],
+                        stored_only: bool = False) -> Dict[int, float]:
+        """
+        Cosine similarity of each candidate's CV to the job.
+
+        Args:
+            job: Job dictionary
+            candidates: Candidates with 'id' and 'cv_text'
+            stored_only: Use stored vectors only (for request handlers).
+                Missing ones are embedded in the background and their
+                candidates are left out of the result until then.
+
+        Returns:
+            Dictionary of candidate ID to similarity (-1 to 1)
+        """
+        if not candidates:
+            return {}
+
+        texts = [cls.job_text(job)] + [c.get('cv_text') or '' for c in candidates]
+        if not stored_only:
+            matrix = cls.get_vectors(texts)
+            scores = matrix[1:] @ matrix[0]
+            return {c['id']: round(float(score), 4) for c, score in zip(candidates, scores)}
+
+        vectors = cls.get_stored_vectors(texts)
+        missing = [text for text, vector in zip(texts, vectors) if vector is None]
+        if missing:
+            cls.embed_async(missing)
+        if vectors[0] is None:
+            return {}
+        return {
+            c['id']: round(float(vector @ vectors[0]), 4)
+            for c, vector in zip(candidates, vectors[1:]) if vector is not None
+        }
+
+    @classmethod
+    def get_job_similarities(cls, job_id: int) -> Dict[int, float]:
+        """
+        Similarity of every candidate of a job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Dictionary of candidate ID to similarity
+        """
+        from src.services.job_service import JobService
+
+        job = JobService.get_by_id(job_id)
+        if not job:
+            return {}
+
+        with get_db() as conn:
+            rows = conn.execute(
+                'SELECT id, cv_text FROM candidates WHERE job_id = ?', (job_id,)
+            ).fetchall()
+        return cls.rank_candidates(job, [dict(row) for row in rows])
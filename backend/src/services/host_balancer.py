@@ -0,0 +1,200 @@
+"""
+Ollama Host Balancer
+
+Spreads generate calls over several Ollama servers. Each call goes to the
+healthy host with the fewest outstanding requests; hosts that fail are
+ejected and re-probed in the background until they answer again.
+
+Every request also takes one of the process's QUEUE_MAX_INFLIGHT request
+slots, so analyses, details, repairs, embeddings and priming together
+never send more concurrent requests than the cap.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Generator, List, Optional, Tuple
+
+from src.services.session_pool import SessionPool
+from src.utils.config import Config
+
+
+class HostBalancer:
+    """Least-outstanding-requests balancer shared by clients of the same hosts"""
+
+    _registry: Dict[Tuple[str, ...], 'HostBalancer'] = {}
+    _registry_lock = threading.Lock()
+
+    # Requests in flight from this process, over all hosts and balancers
+    _slots: Optional[threading.BoundedSemaphore] = None
+
+    def __init__(self, hosts: List[str]):
+        """
+        Initialize balancer.
+
+        Args:
+            hosts: Ollama base URLs (e.g. http://10.0.0.5:11434)
+        """
+        self.hosts = list(hosts)
+        self.outstanding = {host: 0 for host in self.hosts}
+        self.healthy = {host: True for host in self.hosts}
+        self.served = {host: 0 for host in self.hosts}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._prober = None
+
+    @classmethod
+    def for_hosts(cls, hosts: List[str]) -> 'HostBalancer':
+        """
+        Get the process-wide balancer for a set of hosts.
+
+        Args:
+            hosts: Ollama base URLs
+
+        Returns:
+            Shared HostBalancer instance
+        """
+        key = tuple(hosts)
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(hosts)
+            return cls._registry[key]
+
+    @classmethod
+    @contextmanager
+    def slot(cls) -> Generator[None, None, None]:
+        """
+        Hold one of the process's request slots, waiting for a free one.
+
+        Yields:
+            None
+        """
+        with cls._registry_lock:
+            if cls._slots is None:
+                cls._slots = threading.BoundedSemaphore(max(1, Config.QUEUE_MAX_INFLIGHT))
+            slots = cls._slots
+
+        slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @contextmanager
+    def acquire(self) -> Generator[str, None, None]:
+        """
+        Reserve a request slot and the least busy healthy host for one request.
+
+        Falls back to all hosts when every host is ejected, so a request
+        still gets a chance while the background probe catches up.
+
+        Yields:
+            Host base URL
+        """
+        with self.slot():
+            with self._lock:
+                candidates = [h for h in self.hosts if self.healthy[h]] or self.hosts
+                least = min(self.outstanding[h] for h in candidates)
+                tied = [h for h in candidates if self.outstanding[h] == least]
+                # Rotate among equally loaded hosts so idle hosts all get work
+                host = tied[self._next % len(tied)]
+                self._next += 1
+                self.outstanding[host] += 1
+                self.served[host] += 1
+
+            try:
+                yield host
+            finally:
+                with self._lock:
+                    self.outstanding[host] -= 1
+
+    def healthy_hosts(self) -> List[str]:
+        """Get hosts currently in rotation"""
+        with self._lock:
+            return [h for h in self.hosts if self.healthy[h]]
+
+    def mark_down(self, host: str):
+        """
+        Eject a host from rotation and start re-probing it.
+
+        Args:
+            host: Host base URL that failed
+        """
+        with self._lock:
+            if not self.healthy.get(host, False):
+                return
+            self.healthy[host] = False
+            print(f"  🚫 Ollama host ejected: {host}", flush=True)
+
+            if self._prober is None or not self._prober.is_alive():
+                self._prober = threading.Thread(
+                    target=self._probe_loop,
+                    name='ollama-reprobe',
+                    daemon=True
+                )
+                self._prober.start()
+
+    def mark_up(self, host: str):
+        """
+        Return a host to rotation.
+
+        Args:
+            host: Host base URL that answered
+        """
+        with self._lock:
+            if self.healthy.get(host, True):
+                return
+            self.healthy[host] = True
+        print(f"  ✅ Ollama host back in rotation: {host}", flush=True)
+
+    def probe(self, host: str) -> bool:
+        """
+        Check one host via /api/tags and update its health.
+
+        Args:
+            host: Host base URL
+
+        Returns:
+            bool: True if the host answered
+        """
+        try:
+            response = SessionPool.get_session().get(f"{host}/api/tags", timeout=5)
+            available = response.status_code == 200
+        except Exception:
+            available = False
+
+        if available:
+            self.mark_up(host)
+        else:
+            self.mark_down(host)
+        return available
+
+    def _probe_loop(self):
+        """Background loop re-probing ejected hosts until all are back"""
+        while True:
+            time.sleep(Config.OLLAMA_REPROBE_INTERVAL)
+
+            with self._lock:
+                down = [h for h in self.hosts if not self.healthy[h]]
+            if not down:
+                return
+
+            for host in down:
+                self.probe(host)
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        """
+        Get per-host health and load.
+
+        Returns:
+            List of host status dictionaries
+        """
+        with self._lock:
+            return [
+                {
+                    'host': host,
+                    'healthy': self.healthy[host],
+                    'outstanding': self.outstanding[host],
+                    'served': self.served[host]
+                }
+                for host in self.hosts
+            ]
@@ -0,0 +1,245 @@
+"""
+Job Matcher
+
+Ranks a CV against every active job using the embedding index, so a CV
+uploaded for one opening is also proposed for (or added to) the other
+openings it fits. Proposals are stored in job_matches; accepting one
+creates a pending candidate in the other job that reuses the extracted
+text and stored file.
+"""
+import threading
+from typing import List, Optional, Dict, Any
+
+from src.database.db import get_db
+from src.services.candidate_service import CandidateService
+from src.services.embedding_service import EmbeddingService
+from src.services.job_service import JobService
+
+
+class DuplicateMatchError(ValueError):
+    """Raised when a CV is added to a job that already contains it"""
+
+
+class JobMatcher:
+    """Cross-job matching of candidates"""
+
+    @staticmethod
+    def find_matches(candidate_id: int, top_k: int = 3,
+                     min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Rank a candidate's CV against all other active jobs and store the
+        top matches as proposals.
+
+        Jobs the CV is already in (uploaded there, or added from a match)
+        are skipped, and dismissed proposals are not proposed again.
+
+        Args:
+            candidate_id: Candidate ID
+            top_k: Maximum number of proposals
+            min_similarity: Minimum cosine similarity for a proposal
+
+        Returns:
+            List of proposals ({job_id, title, company, similarity, status}), best first
+        """
+        candidate = CandidateService.get_by_id(candidate_id)
+        if not candidate:
+            return []
+
+        with get_db() as conn:
+            excluded = JobMatcher._jobs_with_cv(conn, candidate)
+            excluded |= {row['job_id'] for row in conn.execute(
+                "SELECT job_id FROM job_matches WHERE candidate_id = ? AND status = 'dismissed'",
+                (candidate_id,)
+            )}
+        jobs = [job for job in JobService.get_all(status='active') if job['id'] not in excluded]
+        if not jobs:
+            return []
+
+        matrix = EmbeddingService.get_vectors(
+            [candidate.get('cv_text') or ''] + [EmbeddingService.job_text(job) for job in jobs]
+        )
+        similarities = matrix[1:] @ matrix[0]
+
+        ranked = sorted(zip(jobs, similarities), key=lambda item: item[1], reverse=True)
+        ranked = [(job, float(sim)) for job, sim in ranked if sim >= min_similarity][:top_k]
+
+        with get_db() as conn:
+            conn.executemany('''
+                INSERT INTO job_matches (candidate_id, job_id, similarity)
+                VALUES (?, ?, ?)
+                ON CONFLICT(candidate_id, job_id) DO UPDATE SET similarity = excluded.similarity
+            ''', [(candidate_id, job['id'], round(sim, 4)) for job, sim in ranked])
+
+        return JobMatcher.get_matches(candidate_id)
+
+    @staticmethod
+    def _jobs_with_cv(conn, candidate: Dict[str, Any]) -> set:
+        """
+        Jobs that already contain this CV.
+
+        Args:
+            conn: Open database connection
+            candidate: Candidate dictionary
+
+        Returns:
+            Set of job IDs
+        """
+        source_id = candidate.get('source_candidate_id') or candidate['id']
+        rows = conn.execute('''
+            SELECT job_id FROM candidates
+            WHERE id = ? OR source_candidate_id = ? OR cv_text = ?
+            UNION
+            SELECT job_id FROM job_matches WHERE candidate_id = ? AND status = 'added'
+        ''', (source_id, source_id, candidate.get('cv_text'), candidate['id'])).fetchall()
+        return {row['job_id'] for row in rows}
+
+    @staticmethod
+    def get_matches(candidate_id: int) -> List[Dict[str, Any]]:
+        """
+        Get stored proposals for a candidate.
+
+        Args:
+            candidate_id: Candidate ID
+
+        Returns:
+            List of proposals with job title and company, best first
+        """
+        with get_db() as conn:
+            rows = conn.execute('''
+                SELECT m.job_id, j.title, j.company, m.similarity, m.status,
+                       m.matched_candidate_id, m.created_at
+                FROM job_matches m
+                JOIN jobs j ON j.id = m.job_id
+                WHERE m.candidate_id = ?
+                ORDER BY m.similarity DESC
+            ''', (candidate_id,)).fetchall()
+            return [dict(row) for row in rows]
+
+    @staticmethod
+    def accept(candidate_id: int, job_id: int) -> Optional[int]:
+        """
+        Add a candidate's CV to another job as a pending candidate.
+
+        The duplicate check, the copy and the match update run in one
+        transaction, so concurrent accepts can't add the CV twice.
+
+        Args:
+            candidate_id: Source candidate ID
+            job_id: Target job ID
+
+        Returns:
+            ID of the new candidate, or None if the source doesn't exist
+
+        Raises:
+            ValueError: If the job doesn't exist or is not active
+            DuplicateMatchError: If the job already contains the CV
+        """
+        candidate = CandidateService.get_by_id(candidate_id)
+        if not candidate:
+            return None
+
+        with get_db() as conn:
+            # Take the write lock before checking, so the check still holds at insert time
+            conn.execute('BEGIN IMMEDIATE')
+
+            job = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if job is None:
+                raise ValueError(f"Job {job_id} not found")
+            if job['status'] != 'active':
+                raise ValueError(f"Job {job_id} is not active")
+            if job_id in JobMatcher._jobs_with_cv(conn, candidate):
+                raise DuplicateMatchError(f"Candidate {candidate_id}'s CV is already in job {job_id}")
+
+            new_id = conn.execute('''
+                INSERT INTO candidates (
+                    job_id, name, original_filename, cv_text, status, category,
+                    file_path, source_candidate_id
+                )
+                VALUES (?, 'Pending Analysis', ?, ?, 'pending', 'pending', ?, ?)
+            ''', (job_id, candidate['original_filename'], candidate['cv_text'],
+                  candidate.get('file_path'), candidate.get('source_candidate_id') or candidate_id)).lastrowid
+
+            conn.execute('''
+                INSERT INTO job_matches (candidate_id, job_id, similarity, status, matched_candidate_id)
+                VALUES (?, ?, NULL, 'added', ?)
+                ON CONFLICT(candidate_id, job_id) DO UPDATE SET
+                    status = 'added', matched_candidate_id = excluded.matched_candidate_id
+            ''', (candidate_id, job_id, new_id))
+        return new_id
+
+    @staticmethod
+    def dismiss(candidate_id: int, job_id: int) -> bool:
+        """
+        Dismiss a proposal so it is not proposed again.
+
+        Args:
+            candidate_id: Candidate ID
+            job_id: Proposed job ID
+
+        Returns:
+            bool: True if a proposal was dismissed
+        """
+        with get_db() as conn:
+            cursor = conn.execute('''
+                UPDATE job_matches SET status = 'dismissed'
+                WHERE candidate_id = ? AND job_id = ? AND status = 'proposed'
+            ''', (candidate_id, job_id))
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def process_new(candidate_ids: List[int]):
+        """
+        Match newly uploaded candidates according to the settings.
+
+        In 'propose' mode matches are stored for review; in 'auto' mode
+        pending candidates are created in the matched jobs right away.
+
+        Args:
+            candidate_ids: IDs of the new candidates
+        """
+        from src.services.settings_service import SettingsService
+
+        settings = SettingsService.get_settings()
+        mode = settings.get('cross_job_mode', 'off')
+        if mode not in ('propose', 'auto'):
+            return
+
+        top_k = int(settings.get('cross_job_top_k', 3))
+        min_similarity = float(settings.get('cross_job_min_similarity', 0.6))
+
+        proposed = added = 0
+        for candidate_id in candidate_ids:
+            try:
+                matches = JobMatcher.find_matches(candidate_id, top_k, min_similarity)
+            except (ConnectionError, ValueError) as e:
+                print(f"  ⚠️  Cross-job matching stopped: {e}", flush=True)
+                return
+
+            for match in matches:
+                if match['status'] != 'proposed':
+                    continue
+                if mode == 'auto':
+                    try:
+                        JobMatcher.accept(candidate_id, match['job_id'])
+                        added += 1
+                    except ValueError:
+                        continue  # Added meanwhile, or the job was closed
+                else:
+                    proposed += 1
+
+        print(f"  🔀 Cross-job matching: {proposed} proposals, {added} candidates added "
+              f"for {len(candidate_ids)} new CVs", flush=True)
+
+    @staticmethod
+    def process_new_async(candidate_ids: List[int]):
+        """
+        Run process_new() in a background thread.
+
+        Args:
+            candidate_ids: IDs of the new candidates
+        """
+        if not candidate_ids:
+            return
+        thread = threading.Thread(target=JobMatcher.process_new, args=(list(candidate_ids),),
+                                  name='job-matcher', daemon=True)
+        thread.start()
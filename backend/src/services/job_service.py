@@ -167,6 +167,7 @@ class JobService:
                     SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending,
                     SUM(CASE WHEN status = 'analyzed' THEN 1 ELSE 0 END) as analyzed,
                     SUM(CASE WHEN status = 'error' THEN 1 ELSE 0 END) as errors,
+                    SUM(CASE WHEN prescreened = 1 THEN 1 ELSE 0 END) as prescreened,
                     AVG(CASE WHEN status = 'analyzed' THEN score ELSE NULL END) as avg_score
                 FROM candidates
                 WHERE job_id = ?
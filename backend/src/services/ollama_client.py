@@ -3,24 +3,36 @@ Ollama Client
 
 Handles communication with Ollama LLM server.
 Includes retry logic and error handling.
+All clients share one pooled keep-alive session (see SessionPool).
+Several hosts can be given; calls are then balanced across them (see HostBalancer).
 """
 import requests
+import json
 import os
 import time
-from typing import Optional
+from typing import Optional, Callable, Dict, Any, List, Union
+from src.services.session_pool import SessionPool
+from src.services.host_balancer import HostBalancer
+from src.services.circuit_breaker import CircuitBreaker, OllamaUnavailableError, backoff_delay
+from src.services.response_cache import ResponseCache
+from src.utils.config import Config
 
 
 class OllamaClient:
     """Client for interacting with Ollama API"""
 
-    def __init__(self, host: Optional[str] = None, model: Optional[str] = None, timeout: Optional[int] = None):
+    def __init__(self, host: Optional[Union[str, List[str]]] = None, model: Optional[str] = None,
+                 timeout: Optional[int] = None, keep_alive: Optional[str] = None):
         """
         Initialize Ollama client.
         
         Args:
-            host: Ollama server URL (default: from env or localhost:11434)
+            host: Ollama server URL, a comma-separated string or a list of URLs
+                (default: Config.OLLAMA_HOSTS, which falls back to OLLAMA_HOST)
             model: Model name (default: from settings -> env -> llama3)
             timeout: Request timeout in seconds (default: from env or 120)
+            keep_alive: How long Ollama keeps the model loaded after a call
+                (default: OLLAMA_KEEP_ALIVE)
         """
         # Try to load dynamic settings if model is not explicit
         settings_model = None
@@ -31,25 +43,66 @@ class OllamaClient:
         except Exception:
             pass # Fallback to env/default
 
-        self.host = host or os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+        hosts = host or Config.OLLAMA_HOSTS
+        if isinstance(hosts, str):
+            hosts = hosts.split(',')
+        self.hosts = [h.strip().rstrip('/') for h in hosts if h.strip()]
+        self.balancer = HostBalancer.for_hosts(self.hosts)
+        self.breaker = CircuitBreaker.for_hosts(self.hosts, probe=self._probe_any)
+        
+        # Primary host, kept for display and single-host callers
+        self.host = self.hosts[0]
         self.model = model or settings_model or os.getenv('OLLAMA_MODEL', 'llama3')
         self.timeout = timeout or int(os.getenv('OLLAMA_TIMEOUT', 120))
-        self.generate_url = f"{self.host}/api/generate"
-        self.tags_url = f"{self.host}/api/tags"
+        self.keep_alive = keep_alive or Config.OLLAMA_KEEP_ALIVE
         self.max_retries = 3
+        self.session = SessionPool.get_session()
         
         print(f"  🤖 OllamaClient initialized with model: {self.model}")
 
-    def generate(self, prompt: str, **kwargs) -> str:
+    def generate(self, prompt: str, stream: bool = False,
+                 stop_when: Optional[Callable[[str], bool]] = None, **kwargs) -> str:
         """
         Generate completion from Ollama with retry logic.
         
+        Thin wrapper around generate_full() that returns only the text.
+        
+        Returns:
+            Generated text response
+        """
+        return self.generate_full(prompt, stream=stream, stop_when=stop_when, **kwargs)['response']
+
+    def generate_full(self, prompt: str, stream: bool = False,
+                      stop_when: Optional[Callable[[str], bool]] = None,
+                      on_token: Optional[Callable[[str], bool]] = None,
+                      use_cache: bool = True, **kwargs) -> Dict[str, Any]:
+        """
+        Generate completion from Ollama and return the full result.
+        
         Args:
             prompt: Input prompt text
-            **kwargs: Additional options (temperature, top_p, num_predict)
+            stream: Read Ollama's NDJSON token stream incrementally
+            stop_when: Optional predicate called with the text generated so far
+                each time a line completes (stream mode only). When it returns
+                True the request is closed, which makes Ollama stop generating.
+            on_token: Optional callback called with each streamed token
+                (stream mode only). Returning True aborts the generation: the
+                partial result is returned with done_reason 'aborted' and is
+                not cached.
+            use_cache: Serve identical requests from the response cache and
+                store the result. Pass False to force a fresh generation that
+                is neither read from nor written to the cache (re-rolls,
+                prompt priming).
+            **kwargs: Additional options (temperature, top_p, num_predict, seed, stop, num_ctx).
+                `format` may be "json" or a JSON schema dict to constrain output.
         
         Returns:
-            Generated text response
+            Ollama's final response object: 'response' holds the generated
+            text, alongside counters such as prompt_eval_count and eval_count.
+            When a stream was stopped early Ollama never sends its counters;
+            the timings are then estimated from the stream and listed in
+            'estimated' (see _read_stream). 'cached' is True when the result
+            came from the response cache.
             
         Raises:
             ConnectionError: If unable to connect to Ollama
@@ -58,71 +111,317 @@ class OllamaClient:
         payload = {
             'model': self.model,
             'prompt': prompt,
-            'stream': False,
+            'stream': stream,
+            'keep_alive': self.keep_alive,
             'options': {
                 'temperature': kwargs.get('temperature', 0.3),
                 'top_p': kwargs.get('top_p', 0.9),
                 'num_predict': kwargs.get('num_predict', 2000)
             }
         }
+        
+        if kwargs.get('seed') is not None:
+            payload['options']['seed'] = kwargs['seed']
+        if kwargs.get('stop'):
+            payload['options']['stop'] = list(kwargs['stop'])
+        # Without num_ctx Ollama uses its default window and silently truncates long prompts
+        if kwargs.get('num_ctx'):
+            payload['options']['num_ctx'] = kwargs['num_ctx']
+        
+        # Structured output: Ollama constrains decoding to the given schema
+        if kwargs.get('format'):
+            payload['format'] = kwargs['format']
+        
+        num_predict = payload['options']['num_predict']
+        cache_key = ResponseCache.make_key(payload)
+        if use_cache:
+            cached = ResponseCache.get(cache_key)
+            # The budget isn't part of the key: the cached answer must fit in this one
+            if cached and (cached.get('eval_count') or 0) < num_predict:
+                print("  💾 Response served from cache", flush=True)
+                cached['cached'] = True
+                return cached
 
         last_error = None
         
         for attempt in range(1, self.max_retries + 1):
-            try:
-                response = requests.post(
-                    self.generate_url,
-                    json=payload,
-                    timeout=self.timeout
+            if not self.breaker.allow_request():
+                raise OllamaUnavailableError(
+                    f"Ollama at {', '.join(self.hosts)} is unavailable (circuit open). "
+                    f"Please ensure Ollama is running: ollama serve"
                 )
-                response.raise_for_status()
-                result = response.json().get('response', '')
+            
+            host = None
+            wait_time = backoff_delay(attempt)
+            try:
+                with self.balancer.acquire() as host:
+                    sent_at = time.monotonic()
+                    response = self.session.post(
+                        f"{host}/api/generate",
+                        json=payload,
+                        timeout=self.timeout,
+                        stream=stream
+                    )
+                    response.raise_for_status()
+                    if stream:
+                        result = self._read_stream(response, stop_when, on_token, sent_at)
+                    else:
+                        result = response.json()
                 
-                if not result:
+                self.breaker.record_success()
+                
+                if not result.get('response'):
                     raise ValueError("Empty response from Ollama")
                 
+                # Aborted or truncated generations are incomplete, and a
+                # truncated one would depend on the budget it was cut at
+                if use_cache and not self._is_incomplete(result, num_predict):
+                    ResponseCache.put(cache_key, self.model, result)
+                
+                result['host'] = host
+                result['cached'] = False
                 return result
                 
             except requests.exceptions.Timeout as e:
                 last_error = f"Request timed out after {self.timeout}s"
                 if attempt < self.max_retries:
-                    wait_time = attempt * 2
-                    print(f"  ⏱️  Timeout, retrying in {wait_time}s... (attempt {attempt}/{self.max_retries})")
+                    print(f"  ⏱️  Timeout, retrying in {wait_time:.1f}s... (attempt {attempt}/{self.max_retries})")
                     time.sleep(wait_time)
                     
             except requests.exceptions.ConnectionError as e:
-                last_error = f"Cannot connect to Ollama at {self.host}"
+                last_error = f"Cannot connect to Ollama at {host}"
+                # Take the host out of rotation; the retry goes elsewhere
+                self.balancer.mark_down(host)
+                self.breaker.record_failure()
                 if attempt < self.max_retries:
-                    wait_time = attempt * 2
-                    print(f"  🔄 Connection failed, retrying in {wait_time}s... (attempt {attempt}/{self.max_retries})")
+                    # Retry straight away if another host is still in rotation
+                    if self.balancer.healthy_hosts():
+                        wait_time = 0
+                    print(f"  🔄 Connection failed, retrying in {wait_time:.1f}s... (attempt {attempt}/{self.max_retries})")
                     time.sleep(wait_time)
                     
             except requests.exceptions.RequestException as e:
                 last_error = str(e)
                 if attempt < self.max_retries:
-                    wait_time = attempt
-                    print(f"  ⚠️  Request failed, retrying in {wait_time}s... (attempt {attempt}/{self.max_retries})")
+                    print(f"  ⚠️  Request failed, retrying in {wait_time:.1f}s... (attempt {attempt}/{self.max_retries})")
                     time.sleep(wait_time)
         
         # All retries failed
+        if self.breaker.get_status()['state'] != CircuitBreaker.CLOSED:
+            raise OllamaUnavailableError(
+                f"Ollama at {', '.join(self.hosts)} is unavailable (circuit open). "
+                f"Last error: {last_error}. "
+                f"Please ensure Ollama is running: ollama serve"
+            )
         raise ConnectionError(
             f"Failed to generate completion after {self.max_retries} attempts. "
             f"Last error: {last_error}. "
             f"Please ensure Ollama is running: ollama serve"
         )
 
+    @staticmethod
+    def _is_incomplete(result: Dict[str, Any], num_predict: int) -> bool:
+        """Check whether a generation was aborted or cut off by num_predict"""
+        if result.get('done_reason') in ('aborted', 'length'):
+            return True
+        return (result.get('eval_count') or 0) >= num_predict
+
+    def _read_stream(self, response: requests.Response,
+                     stop_when: Optional[Callable[[str], bool]] = None,
+                     on_token: Optional[Callable[[str], bool]] = None,
+                     sent_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Accumulate a streamed completion, stopping early if requested.
+        
+        Args:
+            response: Open streaming response from /api/generate
+            stop_when: Optional completion predicate (see generate)
+            on_token: Optional token callback (see generate_full)
+            sent_at: time.monotonic() when the request was sent
+                (default: when reading starts)
+            
+        Returns:
+            Final response object with the accumulated text in 'response'
+            and the time to the first token in 'first_token_duration' (ns).
+            If the stream was stopped early Ollama never sends its counters,
+            so they are estimated: eval_count/eval_duration from the chunks
+            read (one token per chunk), and prompt_eval_duration from the
+            time to the first token, which covers model load plus prompt
+            evaluation. Estimated keys are listed in 'estimated';
+            prompt_eval_count and load_duration stay absent.
+        """
+        parts = []
+        final = {}
+        started = sent_at if sent_at is not None else time.monotonic()
+        first_token_at = None
+        aborted = False
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise requests.exceptions.RequestException(chunk['error'])
+                
+                token = chunk.get('response', '')
+                parts.append(token)
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                
+                if chunk.get('done'):
+                    final = chunk
+                    break
+                
+                if on_token and on_token(token):
+                    aborted = True
+                    break
+                
+                # Only re-check completion when a line has finished
+                if stop_when and '\n' in token and stop_when(''.join(parts)):
+                    print("  ✂️  All fields received, stopping generation early", flush=True)
+                    break
+        finally:
+            # Closing an unfinished stream drops the connection, which
+            # cancels generation on the Ollama side
+            response.close()
+        
+        final['response'] = ''.join(parts)
+        final['stopped_early'] = not final.get('done', False)
+        if first_token_at is not None:
+            final['first_token_duration'] = int((first_token_at - started) * 1e9)
+        
+        if final['stopped_early'] and first_token_at is not None:
+            now = time.monotonic()
+            final['eval_count'] = len(parts)
+            final['eval_duration'] = int((now - first_token_at) * 1e9)
+            final['prompt_eval_duration'] = final['first_token_duration']
+            final['total_duration'] = int((now - started) * 1e9)
+            final['done_reason'] = 'aborted' if aborted else 'early_stop'
+            final['estimated'] = ['eval_count', 'eval_duration', 'prompt_eval_duration', 'total_duration']
+        
+        return final
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Get embedding vectors for a batch of texts.
+        
+        Uses /api/embed, which accepts several inputs per request and
+        truncates each one to the embedding model's context.
+        
+        Args:
+            texts: Texts to embed (self.model must be an embedding model)
+            
+        Returns:
+            One vector per text, in input order
+            
+        Raises:
+            OllamaUnavailableError: If the circuit breaker is open
+            ConnectionError: If Ollama cannot be reached
+        """
+        if not self.breaker.allow_request():
+            raise OllamaUnavailableError(
+                f"Ollama at {', '.join(self.hosts)} is unavailable (circuit open). "
+                f"Please ensure Ollama is running: ollama serve"
+            )
+        
+        host = None
+        try:
+            with self.balancer.acquire() as host:
+                response = self.session.post(
+                    f"{host}/api/embed",
+                    json={'model': self.model, 'input': texts, 'keep_alive': self.keep_alive},
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                embeddings = response.json().get('embeddings') or []
+        except requests.exceptions.ConnectionError as e:
+            self.balancer.mark_down(host)
+            self.breaker.record_failure()
+            raise ConnectionError(f"Cannot connect to Ollama at {host}") from e
+        
+        self.breaker.record_success()
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings from {self.model}, got {len(embeddings)}")
+        return embeddings
+    
+    def warm_up(self, num_ctx: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Load the model into memory and pin it for keep_alive.
+        
+        A generate request without a prompt makes Ollama load the model and
+        return immediately, so the first real candidate doesn't pay the load.
+        Every host in rotation is warmed up.
+        
+        Args:
+            num_ctx: Context window the following requests will use
+        
+        Returns:
+            Dictionary with model, loaded flag and load time in seconds
+        """
+        start = time.time()
+        loaded = False
+        error = None
+        
+        hosts = self.balancer.healthy_hosts() or self.hosts
+        if not self.breaker.allow_request():
+            hosts = []
+            error = 'Ollama is unavailable (circuit open)'
+        
+        payload = {'model': self.model, 'keep_alive': self.keep_alive}
+        if num_ctx:
+            payload['options'] = {'num_ctx': num_ctx}
+        
+        for host in hosts:
+            try:
+                with self.balancer.slot():
+                    response = self.session.post(
+                        f"{host}/api/generate",
+                        json=payload,
+                        timeout=self.timeout
+                    )
+                response.raise_for_status()
+                loaded = True
+            except requests.exceptions.ConnectionError as e:
+                error = f"{host}: {e}"
+                self.balancer.mark_down(host)
+            except requests.exceptions.RequestException as e:
+                error = f"{host}: {e}"
+        
+        if loaded:
+            error = None
+            self.breaker.record_success()
+        elif hosts and not self.balancer.healthy_hosts():
+            self.breaker.record_failure()
+        
+        elapsed = round(time.time() - start, 2)
+        if loaded:
+            print(f"  🔥 Model {self.model} ready ({elapsed}s, keep_alive={self.keep_alive})", flush=True)
+        else:
+            print(f"  ⚠️  Could not warm up model {self.model}: {error}", flush=True)
+        
+        return {
+            'model': self.model,
+            'loaded': loaded,
+            'load_seconds': elapsed,
+            'keep_alive': self.keep_alive,
+            'error': error
+        }
+
     def check_availability(self) -> bool:
         """
         Check if Ollama server is available and responsive.
         
+        Every host is probed; hosts that fail are ejected from rotation.
+        
         Returns:
-            bool: True if Ollama is available, False otherwise
+            bool: True if at least one host is available, False otherwise
         """
-        try:
-            response = requests.get(self.tags_url, timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        results = [self.balancer.probe(host) for host in self.hosts]
+        return any(results)
+    
+    def _probe_any(self) -> bool:
+        """Half-open probe for the circuit breaker: True if any host answers /api/tags"""
+        return self.check_availability()
     
     def get_models(self) -> list:
         """
@@ -131,8 +430,9 @@ class OllamaClient:
         Returns:
             List of model names
         """
+        host = (self.balancer.healthy_hosts() or self.hosts)[0]
         try:
-            response = requests.get(self.tags_url, timeout=5)
+            response = self.session.get(f"{host}/api/tags", timeout=5)
             response.raise_for_status()
             models_data = response.json().get('models', [])
             return [model.get('name') for model in models_data]
@@ -0,0 +1,118 @@
+"""
+Ollama Monitor
+
+Background prober that keeps an in-memory snapshot of Ollama's
+availability, installed models and latency. Health, status and settings
+endpoints read the snapshot instead of calling Ollama on every poll.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from src.utils.config import Config
+
+
+class OllamaMonitor:
+    """Process-wide Ollama health snapshot refreshed on an interval"""
+
+    _lock = threading.Lock()
+    _refresh_lock = threading.Lock()
+    _thread = None
+    _pid = None
+    _client = None
+    _snapshot: Optional[Dict[str, Any]] = None
+    _probed_at = 0.0                  # monotonic start of the probe behind _snapshot
+
+    @classmethod
+    def start(cls):
+        """Start the background prober (idempotent, restarted after a fork)"""
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive() and cls._pid == os.getpid():
+                return
+            cls._pid = os.getpid()
+            cls._thread = threading.Thread(target=cls._loop, name='ollama-monitor', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _loop(cls):
+        """Refresh the snapshot every OLLAMA_PROBE_INTERVAL seconds"""
+        while True:
+            try:
+                cls.refresh()
+            except Exception as e:
+                print(f"  ⚠️  Ollama monitor refresh failed: {e}", flush=True)
+            time.sleep(Config.OLLAMA_PROBE_INTERVAL)
+
+    @classmethod
+    def _get_client(cls):
+        """Get the client used for probing (created once)"""
+        if cls._client is None:
+            from src.services.ollama_client import OllamaClient
+            cls._client = OllamaClient()
+        return cls._client
+
+    @classmethod
+    def refresh(cls) -> Dict[str, Any]:
+        """
+        Probe Ollama now and replace the snapshot.
+
+        Callers that waited while another probe ran get that probe's
+        snapshot when it started after they asked, instead of probing again.
+
+        Returns:
+            New snapshot dictionary
+        """
+        from src.services.settings_service import SettingsService
+
+        requested_at = time.monotonic()
+        with cls._refresh_lock:
+            # Concurrent refresh requests share one probe
+            if cls._snapshot is not None and cls._probed_at >= requested_at:
+                return cls._snapshot
+
+            client = cls._get_client()
+
+            probed_at = time.monotonic()
+            start = time.time()
+            available = client.check_availability()
+            latency_ms = round((time.time() - start) * 1000, 1)
+            models = client.get_models() if available else []
+
+            settings = SettingsService.get_settings()
+            snapshot = {
+                'available': available,
+                'models': models,
+                'latency_ms': latency_ms,
+                'checked_at': datetime.now().isoformat(timespec='seconds'),
+                'host': client.host,
+                'hosts': client.balancer.get_status(),
+                'circuit': client.breaker.get_status(),
+                'model': settings.get('ollama_model') or client.model
+            }
+            cls._snapshot = snapshot
+            cls._probed_at = probed_at
+            return snapshot
+
+    @classmethod
+    def get_snapshot(cls, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Get the latest snapshot.
+
+        Args:
+            refresh: Probe Ollama now instead of using the cached snapshot
+
+        Returns:
+            Snapshot dictionary with availability, models and latency
+        """
+        cls.start()
+        if refresh or cls._snapshot is None:
+            return cls.refresh()
+
+        snapshot = dict(cls._snapshot)
+        # Load balancer and breaker state is local, so always current
+        client = cls._get_client()
+        snapshot['hosts'] = client.balancer.get_status()
+        snapshot['circuit'] = client.breaker.get_status()
+        return snapshot
@@ -0,0 +1,102 @@
+"""
+Output Budget
+
+Learns how many tokens a model actually produces for a prompt version
+(from recorded telemetry) and sizes num_predict to a high percentile of
+that distribution plus headroom, so runaway generations are cut short.
+Budgets are rounded up to coarse buckets so that small shifts in the
+distribution don't change num_predict (and the num_ctx sized from it).
+"""
+import math
+import threading
+import time
+from typing import Dict, Tuple, Optional
+
+from src.database.db import get_db
+from src.utils.config import Config
+
+
+class OutputBudget:
+    """Adaptive num_predict per (model, prompt version)"""
+
+    DEFAULT_NUM_PREDICT = 2000   # used until enough samples exist
+    MIN_NUM_PREDICT = 256
+    MAX_NUM_PREDICT = 4096       # ceiling for truncation retries
+    BUCKET = 256                 # budgets are multiples of this
+    MIN_SAMPLES = 20
+    WINDOW = 200                 # most recent calls considered
+    CACHE_SECONDS = 60
+
+    _cache: Dict[Tuple[str, str, str], Tuple[float, int]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_num_predict(cls, model: str, prompt_version: Optional[str], stage: str = 'analysis') -> int:
+        """
+        Get the output budget for the next call.
+
+        Args:
+            model: Model name
+            prompt_version: Version hash of the prompt template
+            stage: Telemetry stage the samples come from
+
+        Returns:
+            int: num_predict to send
+        """
+        key = (model, prompt_version or '', stage)
+        now = time.time()
+
+        with cls._lock:
+            cached = cls._cache.get(key)
+            if cached and now - cached[0] < cls.CACHE_SECONDS:
+                return cached[1]
+
+        budget = cls._compute(model, prompt_version, stage)
+
+        with cls._lock:
+            cls._cache[key] = (now, budget)
+        return budget
+
+    @classmethod
+    def _compute(cls, model: str, prompt_version: Optional[str], stage: str) -> int:
+        """Compute the budget from the recent output-length distribution"""
+        with get_db() as conn:
+            rows = conn.execute('''
+                SELECT eval_count FROM llm_telemetry
+                WHERE model = ? AND prompt_version IS ? AND stage = ?
+                    AND cached = 0 AND eval_count IS NOT NULL
+                    AND (done_reason IS NULL OR done_reason != 'aborted')
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (model, prompt_version, stage, cls.WINDOW)).fetchall()
+
+        samples = sorted(row['eval_count'] for row in rows)
+        if len(samples) < cls.MIN_SAMPLES:
+            return cls.DEFAULT_NUM_PREDICT
+
+        # Nearest-rank percentile
+        rank = max(1, math.ceil(Config.OUTPUT_BUDGET_PERCENTILE / 100 * len(samples)))
+        percentile = samples[rank - 1]
+        budget = int(percentile * Config.OUTPUT_BUDGET_HEADROOM)
+        budget = math.ceil(budget / cls.BUCKET) * cls.BUCKET
+
+        return max(cls.MIN_NUM_PREDICT, min(cls.DEFAULT_NUM_PREDICT, budget))
+
+    @classmethod
+    def expand(cls, num_predict: int) -> int:
+        """
+        Budget for a retry after a truncated generation.
+
+        Args:
+            num_predict: Budget that was too small
+
+        Returns:
+            int: Larger budget (at least the default)
+        """
+        return min(cls.MAX_NUM_PREDICT, max(cls.DEFAULT_NUM_PREDICT, num_predict * 2))
+
+    @classmethod
+    def invalidate(cls, model: str, prompt_version: Optional[str], stage: str = 'analysis'):
+        """Drop the cached budget (e.g. after a truncation)"""
+        with cls._lock:
+            cls._cache.pop((model, prompt_version or '', stage), None)
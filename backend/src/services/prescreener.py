@@ -0,0 +1,169 @@
+"""
+Pre-screener
+
+Cheap lexical scoring of CVs against a job before any LLM call. A BM25
+index is built over the CVs of the batch once, and each CV also gets a
+keyword coverage (share of the job's skills and requirement terms it
+mentions). CVs below the coverage cutoff can be rejected without an LLM
+call or moved to the end of the queue.
+"""
+import math
+import re
+from collections import Counter
+from typing import List, Dict, Any
+
+
+class Prescreener:
+    """BM25 / keyword-coverage pre-screen for one job's candidates"""
+
+    # Standard BM25 parameters
+    K1 = 1.5
+    B = 0.75
+
+    STOPWORDS = {
+        'and', 'the', 'with', 'for', 'years', 'year', 'experience', 'knowledge', 'strong',
+        'good', 'ability', 'skills', 'must', 'have', 'plus', 'least', 'working', 'understanding',
+        'work', 'team', 'able', 'excellent', 'preferred', 'required', 'degree', 'related'
+    }
+
+    TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]')
+
+    def __init__(self, job: Dict[str, Any], candidates: List[Dict[str, Any]]):
+        """
+        Build the index for a batch.
+
+        Args:
+            job: Job dictionary with skills and requirements
+            candidates: Candidates with 'id' and 'cv_text'
+        """
+        self.skills = [skill.strip() for skill in job.get('skills', []) if skill.strip()]
+        self.terms = self._job_terms(job)
+
+        # Term frequencies per CV and document frequencies over the batch
+        self.docs: Dict[int, Counter] = {}
+        self.texts: Dict[int, str] = {}
+        df = Counter()
+        for candidate in candidates:
+            text = (candidate.get('cv_text') or '').lower()
+            tokens = self.tokenize(text)
+            self.docs[candidate['id']] = Counter(tokens)
+            self.texts[candidate['id']] = text
+            df.update(set(tokens))
+
+        n = max(1, len(self.docs))
+        self.avg_length = sum(sum(tf.values()) for tf in self.docs.values()) / n or 1
+        self.idf = {
+            term: math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            for term in self.terms
+        }
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """
+        Split lowercase text into index terms.
+
+        Args:
+            text: Lowercase text
+
+        Returns:
+            List of tokens (keeps c++, c#, node.js)
+        """
+        return cls.TOKEN_PATTERN.findall(text)
+
+    @classmethod
+    def _job_terms(cls, job: Dict[str, Any]) -> List[str]:
+        """
+        Query terms from the job's skills and requirements.
+
+        Args:
+            job: Job dictionary
+
+        Returns:
+            List of unique terms
+        """
+        text = ' '.join(job.get('skills', []) + job.get('requirements', [])).lower()
+        terms = [t for t in cls.tokenize(text) if t not in cls.STOPWORDS and not t.isdigit()]
+        return list(dict.fromkeys(terms))
+
+    def bm25(self, candidate_id: int) -> float:
+        """
+        BM25 score of a CV for the job terms.
+
+        Args:
+            candidate_id: Candidate ID
+
+        Returns:
+            float: Score (only comparable within this batch)
+        """
+        tf = self.docs.get(candidate_id)
+        if not tf:
+            return 0.0
+
+        length = sum(tf.values())
+        score = 0.0
+        for term in self.terms:
+            freq = tf.get(term, 0)
+            if freq:
+                norm = freq + self.K1 * (1 - self.B + self.B * length / self.avg_length)
+                score += self.idf[term] * freq * (self.K1 + 1) / norm
+        return score
+
+    def score(self, candidate_id: int) -> Dict[str, Any]:
+        """
+        Pre-screen a candidate.
+
+        Coverage uses the job's skills (matched as phrases) when the job
+        lists any, otherwise its requirement terms.
+
+        Args:
+            candidate_id: Candidate ID
+
+        Returns:
+            Dictionary with coverage (0-1), bm25, matched and missing skills
+        """
+        text = self.texts.get(candidate_id, '')
+        tf = self.docs.get(candidate_id, Counter())
+
+        if self.skills:
+            matched = [s for s in self.skills if self._contains(text, s.lower())]
+            missing = [s for s in self.skills if s not in matched]
+            coverage = len(matched) / len(self.skills)
+        else:
+            matched = [t for t in self.terms if t in tf]
+            missing = [t for t in self.terms if t not in tf]
+            coverage = len(matched) / len(self.terms) if self.terms else 1.0
+
+        return {
+            'coverage': round(coverage, 3),
+            'bm25': round(self.bm25(candidate_id), 3),
+            'matched_skills': matched,
+            'missing_skills': missing
+        }
+
+    @staticmethod
+    def _contains(text: str, phrase: str) -> bool:
+        """Whole-word phrase match (so 'go' doesn't match 'google')"""
+        return re.search(r'(?<![a-z0-9])' + re.escape(phrase) + r'(?![a-z0-9+#])', text) is not None
+
+    def split(self, candidates: List[Dict[str, Any]], cutoff: float):
+        """
+        Split candidates into those passing the cutoff and those below it.
+
+        Args:
+            candidates: Candidates to screen
+            cutoff: Minimum keyword coverage (0-1)
+
+        Returns:
+            Tuple (passed, below): passed keeps the original order, below is
+            a list of (candidate, score) sorted by BM25 best first
+        """
+        passed, below = [], []
+        for candidate in candidates:
+            result = self.score(candidate['id'])
+            if result['coverage'] < cutoff:
+                below.append((candidate, result))
+            else:
+                passed.append(candidate)
+
+        below.sort(key=lambda item: item[1]['bm25'], reverse=True)
+        return passed, below
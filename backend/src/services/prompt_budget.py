@@ -0,0 +1,283 @@
+"""
+Prompt Budget
+
+Fits a CV into a token budget instead of slicing a fixed number of
+characters. The CV is split into sections (experience, skills,
+education, ...), which are ranked by relevance to the job's skills and
+requirements so the most useful sections survive on long CVs. Also sizes
+Ollama's num_ctx so the prompt is never truncated by the default window.
+"""
+import math
+import re
+from typing import List, Dict, Any, Tuple
+
+from src.utils.config import Config
+
+
+class PromptBudget:
+    """Token estimates, CV compression and num_ctx sizing"""
+
+    # Rough average for English text with llama-style tokenizers
+    CHARS_PER_TOKEN = 4
+
+    # Contact details usually sit above the first heading
+    HEADER_MAX_TOKENS = 150
+
+    # Smallest window worth sending; Ollama's own default
+    MIN_NUM_CTX = 2048
+
+    # Base weight per section kind, before job relevance
+    SECTION_WEIGHTS = {
+        'skills': 3.0,
+        'experience': 3.0,
+        'projects': 2.0,
+        'certifications': 2.0,
+        'education': 2.0,
+        'summary': 1.5,
+        'languages': 1.0,
+        'other': 1.0,
+        'interests': 0.2,
+        'references': 0.1
+    }
+
+    # Heading words mapped to section kinds
+    SECTION_HEADINGS = {
+        'skills': ['skills', 'technical skills', 'core competencies', 'competencies', 'technologies', 'tools'],
+        'experience': ['experience', 'work experience', 'professional experience', 'employment',
+                       'employment history', 'work history', 'career history'],
+        'projects': ['projects', 'personal projects', 'key projects'],
+        'certifications': ['certifications', 'certificates', 'licenses', 'training', 'courses'],
+        'education': ['education', 'academic background', 'qualifications', 'academic qualifications'],
+        'summary': ['summary', 'profile', 'professional summary', 'objective', 'about me', 'career objective'],
+        'languages': ['languages'],
+        'interests': ['interests', 'hobbies', 'activities', 'volunteering'],
+        'references': ['references', 'referees']
+    }
+
+    STOPWORDS = {
+        'and', 'the', 'with', 'for', 'years', 'year', 'experience', 'knowledge', 'strong',
+        'good', 'ability', 'skills', 'must', 'have', 'plus', 'least', 'working', 'understanding'
+    }
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        Estimate the token count of a text.
+
+        Args:
+            text: Prompt text
+
+        Returns:
+            int: Approximate number of tokens
+        """
+        return math.ceil(len(text or '') / PromptBudget.CHARS_PER_TOKEN)
+
+    @staticmethod
+    def num_ctx_for(prompt_tokens: int, num_predict: int) -> int:
+        """
+        Context window needed for a prompt plus its output.
+
+        Rounded up to a power of two so that requests of one job share a
+        window: Ollama reloads the model whenever num_ctx changes.
+
+        Args:
+            prompt_tokens: Estimated prompt tokens
+            num_predict: Output token budget
+
+        Returns:
+            int: num_ctx to send
+        """
+        needed = prompt_tokens + num_predict
+        num_ctx = PromptBudget.MIN_NUM_CTX
+        while num_ctx < needed and num_ctx < Config.OLLAMA_NUM_CTX_MAX:
+            num_ctx *= 2
+        return min(num_ctx, Config.OLLAMA_NUM_CTX_MAX)
+
+    @staticmethod
+    def compress_cv(cv_text: str, job: Dict[str, Any], max_tokens: int = None) -> str:
+        """
+        Fit a CV into a token budget, keeping the most relevant sections.
+
+        Whitespace is normalized first; if the CV still doesn't fit,
+        sections are kept in order of relevance to the job and printed in
+        their original order. The header (text above the first heading) is
+        capped at HEADER_MAX_TOKENS only while other sections need the room;
+        a CV without headings is simply cut to the budget.
+
+        Args:
+            cv_text: Extracted CV text
+            job: Job dictionary with skills and requirements
+            max_tokens: Budget for the CV (default: PROMPT_CV_TOKENS)
+
+        Returns:
+            CV text that fits the budget
+        """
+        max_tokens = max_tokens or Config.PROMPT_CV_TOKENS
+        text = PromptBudget._normalize(cv_text)
+        if PromptBudget.estimate_tokens(text) <= max_tokens:
+            return text
+
+        sections = PromptBudget._split_sections(text)
+        keywords = PromptBudget._job_keywords(job)
+
+        # Without recognised headings the whole CV is one block: keep its start
+        if len(sections) == 1:
+            return PromptBudget._truncate(sections[0][1], max_tokens)
+
+        # The untitled block at the top holds name and contact details
+        kept: Dict[int, str] = {}
+        remaining = max_tokens
+        order = list(range(len(sections)))
+        if sections and sections[0][0] == 'header':
+            kept[0] = PromptBudget._truncate(sections[0][1], PromptBudget.HEADER_MAX_TOKENS)
+            remaining -= PromptBudget.estimate_tokens(kept[0])
+            order = order[1:]
+
+        ranked = sorted(
+            order,
+            key=lambda i: PromptBudget._score(sections[i], keywords),
+            reverse=True
+        )
+        for i in ranked:
+            body = sections[i][1]
+            tokens = PromptBudget.estimate_tokens(body)
+            if tokens <= remaining:
+                kept[i] = body
+                remaining -= tokens
+            elif remaining >= 50:
+                # Partial section is still better than nothing
+                kept[i] = PromptBudget._truncate(body, remaining)
+                remaining -= PromptBudget.estimate_tokens(kept[i])
+
+        # Budget the ranked sections left unused goes back to a capped header
+        if 0 in kept and sections[0][0] == 'header' and kept[0] != sections[0][1] and remaining > 0:
+            header_tokens = PromptBudget.estimate_tokens(kept[0])
+            kept[0] = PromptBudget._truncate(sections[0][1], header_tokens + remaining)
+
+        return '\n\n'.join(kept[i] for i in sorted(kept))
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Collapse runs of spaces and blank lines left by PDF extraction"""
+        text = re.sub(r'[ \t\xa0]+', ' ', text or '')
+        text = re.sub(r' *\n *', '\n', text)
+        text = re.sub(r'\n{3,}', '\n\n', text)
+        return text.strip()
+
+    @staticmethod
+    def _heading_kind(line: str) -> str:
+        """
+        Classify a line as a section heading.
+
+        Args:
+            line: One line of CV text
+
+        Returns:
+            Section kind, or '' if the line is not a heading
+        """
+        stripped = line.strip().rstrip(':').strip()
+        if not stripped or len(stripped) > 40:
+            return ''
+
+        lowered = stripped.lower()
+        for kind, headings in PromptBudget.SECTION_HEADINGS.items():
+            if lowered in headings:
+                return kind
+
+        # Short all-caps lines are headings we don't know by name
+        if stripped.isupper() and re.fullmatch(r'[A-Z &/]+', stripped) and len(stripped.split()) <= 4:
+            return 'other'
+        return ''
+
+    @staticmethod
+    def _split_sections(text: str) -> List[Tuple[str, str]]:
+        """
+        Split CV text into (kind, text) sections at heading lines.
+
+        Args:
+            text: Normalized CV text
+
+        Returns:
+            List of sections in document order; the first may be 'header'
+        """
+        sections: List[Tuple[str, str]] = []
+        kind, lines = 'header', []
+
+        for line in text.split('\n'):
+            heading = PromptBudget._heading_kind(line)
+            if heading:
+                if any(l.strip() for l in lines):
+                    sections.append((kind, '\n'.join(lines).strip()))
+                kind, lines = heading, [line]
+            else:
+                lines.append(line)
+
+        if any(l.strip() for l in lines):
+            sections.append((kind, '\n'.join(lines).strip()))
+        return sections
+
+    @staticmethod
+    def _job_keywords(job: Dict[str, Any]) -> List[str]:
+        """
+        Collect lowercase keywords from the job's skills and requirements.
+
+        Args:
+            job: Job dictionary
+
+        Returns:
+            List of unique keywords
+        """
+        keywords = [skill.strip().lower() for skill in job.get('skills', []) if skill.strip()]
+        for requirement in job.get('requirements', []):
+            for word in re.findall(r'[A-Za-z][A-Za-z0-9+#.]{2,}', requirement):
+                word = word.lower().rstrip('.')
+                if word not in PromptBudget.STOPWORDS:
+                    keywords.append(word)
+        return list(dict.fromkeys(keywords))
+
+    @staticmethod
+    def _score(section: Tuple[str, str], keywords: List[str]) -> float:
+        """
+        Relevance of a section: base weight times job keyword hits.
+
+        Args:
+            section: (kind, text) tuple
+            keywords: Job keywords
+
+        Returns:
+            float: Higher is more relevant
+        """
+        kind, body = section
+        lowered = body.lower()
+        hits = sum(1 for keyword in keywords if keyword in lowered)
+        return PromptBudget.SECTION_WEIGHTS.get(kind, 1.0) * (1 + hits)
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int) -> str:
+        """
+        Cut text at a line boundary to fit max_tokens.
+
+        Args:
+            text: Section text
+            max_tokens: Token budget
+
+        Returns:
+            Truncated text ending in '...'
+        """
+        if PromptBudget.estimate_tokens(text) <= max_tokens:
+            return text
+
+        kept, used = [], 0
+        for line in text.split('\n'):
+            tokens = PromptBudget.estimate_tokens(line + '\n')
+            if used + tokens > max_tokens:
+                # Fill the rest with the start of the line, cut at a word
+                room = (max_tokens - used) * PromptBudget.CHARS_PER_TOKEN
+                partial = line[:room].rsplit(' ', 1)[0]
+                if partial:
+                    kept.append(partial)
+                break
+            kept.append(line)
+            used += tokens
+
+        return '\n'.join(kept) + ' ...'
@@ -0,0 +1,127 @@
+"""
+Job Prompt Session
+
+Tracks prompt-prefix reuse for one analysis batch.
+
+Every candidate prompt of a job starts with the same job prefix. Ollama
+keeps the KV cache of the last prompt evaluated in each slot and only
+re-evaluates tokens after the longest common prefix, so once the prefix
+has been evaluated, later candidates only pay for their own CV. The
+session primes that cache and measures the savings from the
+prompt_eval_count Ollama reports or, for streams stopped before Ollama
+sends its counters, from the time to the first token.
+"""
+import threading
+from typing import Dict, Any, Optional
+
+
+class JobPromptSession:
+    """Shared job prefix and prompt cache statistics for a batch"""
+
+    def __init__(self, ollama, prefix: str):
+        """
+        Initialize session.
+
+        Args:
+            ollama: OllamaClient used for the batch
+            prefix: Byte-identical prompt prefix shared by all candidates
+        """
+        self.ollama = ollama
+        self.prefix = prefix
+        self.prefix_tokens = 0
+        self.prefix_eval_ns = 0
+        self.calls = 0
+        self.measured_calls = 0
+        self.cache_hits = 0
+        self.prompt_eval_tokens = 0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+
+    def prime(self, cancel: Optional[threading.Event] = None, **kwargs) -> bool:
+        """
+        Evaluate the prefix once so it sits in Ollama's prompt cache.
+
+        Also measures the prefix length in tokens and its evaluation time,
+        the baselines for the savings estimate. The one-token answer is
+        never read from or written to the response cache.
+
+        Args:
+            cancel: Optional event that aborts the priming when set
+            **kwargs: Generation options (e.g. temperature)
+
+        Returns:
+            bool: True if the prefix was evaluated
+        """
+        on_token = (lambda token: cancel.is_set()) if cancel is not None else None
+        try:
+            result = self.ollama.generate_full(prompt=self.prefix, num_predict=1, use_cache=False,
+                                               stream=on_token is not None, on_token=on_token, **kwargs)
+        except Exception as e:
+            print(f"  ⚠️  Could not prime prompt cache: {e}", flush=True)
+            return False
+
+        if result.get('done_reason') == 'aborted':
+            print("  ⏹️  Prompt cache priming cancelled", flush=True)
+            return False
+
+        self.prefix_tokens = result.get('prompt_eval_count') or 0
+        self.prefix_eval_ns = result.get('prompt_eval_duration') or 0
+        print(f"  🧠 Job prefix cached ({self.prefix_tokens} tokens)", flush=True)
+        return True
+
+    def record(self, result: Dict[str, Any], prompt: Optional[str] = None):
+        """
+        Record the prompt evaluation of one candidate call.
+
+        A call that evaluated fewer tokens than the prefix alone must have
+        been served the prefix from the cache. Without counters (stream
+        stopped early) the time to the first token is compared with the
+        time a cold evaluation of the whole prompt would take, at the
+        prefix's per-character rate: a hit skips the prefix, so it comes in
+        well under that.
+
+        Args:
+            result: Final Ollama response object from generate_full()
+            prompt: The call's prompt (needed for the time-based check)
+        """
+        evaluated = result.get('prompt_eval_count')
+        first_token_ns = result.get('first_token_duration')
+
+        with self._lock:
+            self.calls += 1
+            if result.get('cached'):
+                return  # No Ollama evaluation to measure
+
+            if evaluated is not None:
+                self.measured_calls += 1
+                self.prompt_eval_tokens += evaluated
+                hit = bool(self.prefix_tokens) and evaluated < self.prefix_tokens
+            elif first_token_ns and prompt and self.prefix_eval_ns and self.prefix:
+                self.measured_calls += 1
+                ns_per_char = self.prefix_eval_ns / len(self.prefix)
+                # Halfway between a cold prompt and one that skips the whole prefix
+                threshold = ns_per_char * (len(prompt) - len(self.prefix) / 2)
+                hit = first_token_ns < threshold
+            else:
+                return
+
+            if hit:
+                self.cache_hits += 1
+                self.saved_tokens += self.prefix_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get prompt cache statistics for the batch.
+
+        Returns:
+            Dictionary with prefix size, hits and estimated tokens saved
+        """
+        with self._lock:
+            return {
+                'prefix_tokens': self.prefix_tokens,
+                'calls': self.calls,
+                'measured_calls': self.measured_calls,
+                'cache_hits': self.cache_hits,
+                'prompt_eval_tokens': self.prompt_eval_tokens,
+                'saved_tokens': self.saved_tokens
+            }
@@ -0,0 +1,166 @@
+"""
+Prompt Templates
+
+Prompts sent to Ollama are built from templates with a {cv} slot. A
+template is compiled once per job into a fixed prefix and suffix, so a
+candidate's prompt is a single concatenation with its CV instead of a
+re-format of the job block and instructions.
+
+Each template is versioned by a hash of its source text and constant
+parts (e.g. the instructions), not of the job. The version is stored
+with every analysis so results made with an older prompt can be found
+and re-scored after the prompt changes.
+"""
+import hashlib
+from typing import Dict, Any
+
+
+ANALYSIS_TEMPLATE = """You are an expert HR recruiter analyzing a candidate's CV for a job position.
+
+**JOB DETAILS:**
+Position: {title}
+Company: {company}
+
+Job Description:
+{description}
+
+Required Qualifications:
+{requirements}
+
+Desired Skills: {skills}
+Salary Range: {salary_range}
+
+**SALARY ESTIMATION CONTEXT:**
+- Base the estimate on the candidate's experience, skills match, and the job's salary range (if provided).
+- Consider the market rates for this role in **Cambodia**.
+- If the candidate is overqualified/underqualified, adjust the estimate accordingly within or outside the job's range.
+
+---
+
+{instructions}
+
+---
+
+**CANDIDATE CV:**
+{cv}
+
+---
+
+Now assess this CV following the instructions above."""
+
+SCREENING_TEMPLATE = """You are an expert HR recruiter screening candidates.
+Evaluate this CV for {title} at {company}.
+
+Job Description:
+{description}
+
+Required Qualifications:
+{requirements}
+
+Candidate CV:
+{cv}
+
+Provide screening evaluation in EXACTLY this format:
+Match Score: [number 0-100]
+Candidate Name: [name]
+Matched Keywords: [keyword1], [keyword2], [keyword3]
+Missing Keywords: [keyword1], [keyword2]
+Key Strengths:
+• [strength1]
+• [strength2]
+• [strength3]
+Concerns:
+• [concern1]
+Experience Years: [number]
+Recommendation: [SHORTLIST/CONSIDER/PASS]
+Summary: [brief assessment]"""
+
+
+class CompiledPrompt:
+    """A template filled in for one job, ready to take a CV"""
+
+    def __init__(self, prefix: str, suffix: str, version: str):
+        """
+        Initialize compiled prompt.
+
+        Args:
+            prefix: Everything before the CV (byte-identical for all candidates)
+            suffix: Everything after the CV
+            version: Version of the template it was compiled from
+        """
+        self.prefix = prefix
+        self.suffix = suffix
+        self.version = version
+
+    def render(self, cv_text: str) -> str:
+        """
+        Build the prompt for one CV.
+
+        Args:
+            cv_text: CV text (already fitted to the prompt budget)
+
+        Returns:
+            Full prompt
+        """
+        return self.prefix + cv_text + self.suffix
+
+
+class PromptTemplate:
+    """Prompt source with a {cv} slot, versioned by content hash"""
+
+    CV_SLOT = '{cv}'
+
+    def __init__(self, source: str, **constants: str):
+        """
+        Initialize template.
+
+        Args:
+            source: Template text with one {cv} slot and {field} placeholders
+            **constants: Placeholders that are part of the template itself
+                (e.g. instructions) and therefore of its version
+        """
+        if source.count(self.CV_SLOT) != 1:
+            raise ValueError("Prompt template needs exactly one {cv} slot")
+
+        self.source = source
+        self.constants = constants
+        self._head, self._tail = source.split(self.CV_SLOT)
+
+        digest = hashlib.sha256(source.encode('utf-8'))
+        for key in sorted(constants):
+            digest.update(f'\0{key}\0{constants[key]}'.encode('utf-8'))
+        self.version = digest.hexdigest()[:12]
+
+    def compile(self, **fields: Any) -> CompiledPrompt:
+        """
+        Fill in the placeholders around the CV slot.
+
+        Args:
+            **fields: Values for the job placeholders (extra keys are ignored)
+
+        Returns:
+            CompiledPrompt with this template's version
+        """
+        values = {**fields, **self.constants}
+        return CompiledPrompt(self._head.format(**values), self._tail.format(**values), self.version)
+
+    @staticmethod
+    def job_fields(job: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Placeholder values for a job.
+
+        Args:
+            job: Job dictionary
+
+        Returns:
+            Dictionary with title, company, description, requirements
+            (one bullet per line), skills (comma-separated) and salary_range
+        """
+        return {
+            'title': job.get('title', ''),
+            'company': job.get('company', ''),
+            'description': job.get('description', ''),
+            'requirements': '\n'.join(f"- {req}" for req in job.get('requirements', [])),
+            'skills': ', '.join(job.get('skills', [])),
+            'salary_range': job.get('salary_range', 'Not specified')
+        }
@@ -0,0 +1,156 @@
+"""
+LLM Response Cache
+
+Content-addressed cache of Ollama generations stored in SQLite.
+Entries are keyed by model, prompt hash and sampling options, and the
+least recently used entries are evicted once the cache exceeds its
+size budget.
+"""
+import hashlib
+import json
+import time
+from typing import Optional, Dict, Any
+
+from src.database.db import get_db
+from src.utils.config import Config
+
+
+class ResponseCache:
+    """Service for caching raw LLM responses"""
+
+    # Options that change the output of a generation. num_predict and num_ctx
+    # are left out: only untruncated results are stored, and those don't depend
+    # on the budget or window (see OllamaClient.generate_full)
+    KEY_OPTIONS = ['temperature', 'top_p', 'seed', 'stop']
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """
+        Build the cache key for a generate payload.
+
+        Args:
+            payload: Ollama /api/generate request body
+
+        Returns:
+            Hex digest identifying the generation
+        """
+        options = payload.get('options', {})
+        key_data = {
+            'model': payload.get('model'),
+            'prompt': hashlib.sha256(payload.get('prompt', '').encode('utf-8')).hexdigest(),
+            'options': {name: options.get(name) for name in ResponseCache.KEY_OPTIONS},
+            # Structured output changes the response shape entirely
+            'format': payload.get('format')
+        }
+        raw = json.dumps(key_data, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get(key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Cached Ollama result dictionary or None on a miss
+        """
+        if not Config.LLM_CACHE_ENABLED:
+            return None
+
+        with get_db() as conn:
+            row = conn.execute(
+                'SELECT result FROM llm_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if not row:
+                return None
+
+            conn.execute(
+                'UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?',
+                (time.time(), key)
+            )
+            return json.loads(row['result'])
+
+    @staticmethod
+    def put(key: str, model: str, result: Dict[str, Any]) -> None:
+        """
+        Store a response, then evict old entries beyond the size budget.
+
+        Args:
+            key: Cache key from make_key()
+            model: Model that produced the response
+            result: Ollama result dictionary ('response' plus counters)
+        """
+        if not Config.LLM_CACHE_ENABLED:
+            return
+
+        data = json.dumps(result)
+        now = time.time()
+
+        with get_db() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_cache (key, model, result, size, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+            ''', (key, model, data, len(data.encode('utf-8')), now, now))
+
+            ResponseCache._evict(conn, Config.LLM_CACHE_MAX_BYTES)
+
+    @staticmethod
+    def _evict(conn, max_bytes: int) -> int:
+        """
+        Delete least recently used entries until the cache fits max_bytes.
+
+        Args:
+            conn: Open database connection
+            max_bytes: Size budget for all cached results
+
+        Returns:
+            int: Number of evicted entries
+        """
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM llm_cache').fetchone()[0]
+        if total <= max_bytes:
+            return 0
+
+        evicted = []
+        rows = conn.execute('SELECT key, size FROM llm_cache ORDER BY last_used_at ASC')
+        for row in rows:
+            if total <= max_bytes:
+                break
+            evicted.append(row['key'])
+            total -= row['size']
+
+        conn.executemany('DELETE FROM llm_cache WHERE key = ?', [(k,) for k in evicted])
+        return len(evicted)
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        """
+        Get cache size and hit statistics.
+
+        Returns:
+            Dictionary with entry count, bytes used and total hits
+        """
+        with get_db() as conn:
+            row = conn.execute('''
+                SELECT COUNT(*) as entries,
+                       COALESCE(SUM(size), 0) as size_bytes,
+                       COALESCE(SUM(hits), 0) as hits
+                FROM llm_cache
+            ''').fetchone()
+            stats = dict(row)
+            stats['max_bytes'] = Config.LLM_CACHE_MAX_BYTES
+            stats['enabled'] = Config.LLM_CACHE_ENABLED
+            return stats
+
+    @staticmethod
+    def clear() -> int:
+        """
+        Remove all cached responses.
+
+        Returns:
+            int: Number of deleted entries
+        """
+        with get_db() as conn:
+            cursor = conn.execute('DELETE FROM llm_cache')
+            return cursor.rowcount
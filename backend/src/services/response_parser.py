@@ -0,0 +1,297 @@
+"""
+Response Parser
+
+Single-pass parser for the text analysis template. One compiled scan
+finds every header (and puts inline headers on their own line, as the
+model sometimes runs them together); each field is then read with a
+precompiled pattern anchored at its header, so no field rescans the
+whole response.
+
+Output is identical to the original per-field regex parser.
+IncrementalResponseParser applies the same parsing to a streamed
+response and reports each field as soon as it is complete.
+"""
+import re
+from typing import Dict, Any, List, Optional
+
+
+# Headers of the analysis template (plus Recommendation, which some models add)
+HEADERS = [
+    'Name:', 'Email:', 'Phone:', 'Match Score:', 'Experience Years:',
+    'Matched Skills:', 'Missing Skills:', 'Education:',
+    'Key Strengths:', 'Concerns:', 'Recommendation:', 'Summary:', 'Salary Estimate:'
+]
+
+HEADER_PATTERN = re.compile('|'.join(re.escape(h) for h in HEADERS), re.IGNORECASE)
+
+# Field values, matched at the end of their header
+LINE_VALUE = re.compile(r'\s*(.+?)(?:\n|$)', re.IGNORECASE | re.MULTILINE)
+NUMBER_VALUE = re.compile(r'\s*(\d+)', re.IGNORECASE | re.MULTILINE)
+EMAIL_VALUE = re.compile(r'\s*([^\s]+@[^\s]+|\S+@\S+|Not provided)', re.IGNORECASE | re.MULTILINE)
+PHONE_VALUE = re.compile(r'\s*([+\d\s\-()]+|Not provided)', re.IGNORECASE | re.MULTILINE)
+BLOCK_VALUE = re.compile(r'\s*(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)', re.IGNORECASE | re.DOTALL)
+BLOCK_AFTER_NEWLINE = re.compile(r'\s*\n(.*?)(?:\n\n|\n[A-Z][a-z]+:|$)', re.IGNORECASE | re.DOTALL)
+
+# Last-resort bullet sections: header without colon, up to the next known section
+BULLET_FALLBACK = {
+    'key strengths': re.compile(r'Key Strengths[:\s]+(.*?)(?:Concerns|Recommendation|Summary|$)',
+                                re.IGNORECASE | re.DOTALL),
+    'concerns': re.compile(r'Concerns[:\s]+(.*?)(?:Concerns|Recommendation|Summary|$)',
+                           re.IGNORECASE | re.DOTALL)
+}
+
+# Any content after a header offset (streamed text is cut at a line end)
+NON_BLANK = re.compile(r'\s*\S')
+
+LIST_BULLET = re.compile(r'(?:^|\s)(?:[\*•\-])(?:\s|$)')
+LINE_HEADER = re.compile(r'^[A-Z][a-z]+:')
+BULLET_MARKER = re.compile(r'^[\s•\-\*\>\+]+|^\d+[\.\)]\s*')
+
+
+class ResponseParser:
+    """Parse a text-template analysis response into fields"""
+
+    @staticmethod
+    def tokenize(response: str):
+        """
+        Normalize a response and index its headers in one pass.
+
+        Markdown emphasis is removed and a newline is inserted before any
+        header that doesn't start a line.
+
+        Args:
+            response: Raw LLM response
+
+        Returns:
+            Tuple (text, positions): normalized text and, per lowercase
+            header, the offsets right after each of its occurrences
+        """
+        text = response.replace('**', '').replace('__', '')
+
+        parts = []
+        positions: Dict[str, List[int]] = {}
+        length = 0
+        last = 0
+        for match in HEADER_PATTERN.finditer(text):
+            start = match.start()
+            parts.append(text[last:start])
+            length += start - last
+            if not (start > 0 and text[start - 1] == '\n'):
+                parts.append('\n')
+                length += 1
+            header = match.group(0)
+            parts.append(header)
+            length += len(header)
+            positions.setdefault(header.lower(), []).append(length)
+            last = match.end()
+        parts.append(text[last:])
+
+        return ''.join(parts), positions
+
+    @staticmethod
+    def parse(response: str) -> Dict[str, Any]:
+        """
+        Parse a response into analysis fields.
+
+        Args:
+            response: Raw LLM response
+
+        Returns:
+            Dictionary with name, contact, score, skills, education,
+            strengths, concerns, summary and salary estimate
+        """
+        text, positions = ResponseParser.tokenize(response)
+
+        def value(header: str, pattern, default: Optional[str]) -> Optional[str]:
+            # First occurrence whose value fits the pattern, like re.search
+            for pos in positions.get(header, ()):
+                match = pattern.match(text, pos)
+                if match:
+                    return match.group(1).strip()
+            return default
+
+        def number(header: str) -> int:
+            raw = value(header, NUMBER_VALUE, '0')
+            return int(raw) if raw.isdigit() else 0
+
+        analysis = {
+            'name': value('name:', LINE_VALUE, 'Unknown Candidate'),
+            'email': value('email:', EMAIL_VALUE, None),
+            'phone': value('phone:', PHONE_VALUE, None),
+            'score': max(0, min(100, number('match score:'))),
+            'experience_years': number('experience years:'),
+            'matched_skills': ResponseParser._list(text, positions, 'matched skills:'),
+            'missing_skills': ResponseParser._list(text, positions, 'missing skills:'),
+            'education': {
+                'summary': value('education:', LINE_VALUE, 'Not specified')
+            },
+            'strengths': ResponseParser._bullets(text, positions, 'key strengths'),
+            'concerns': ResponseParser._bullets(text, positions, 'concerns'),
+            'summary': value('summary:', LINE_VALUE, 'No summary provided'),
+            'salary_estimate': value('salary estimate:', LINE_VALUE, 'Not available')
+        }
+        return analysis
+
+    @staticmethod
+    def _list(text: str, positions: Dict[str, List[int]], header: str) -> list:
+        """
+        Read a comma-separated (or vertical / bulleted) list field.
+
+        Args:
+            text: Normalized response
+            positions: Header offsets from tokenize()
+            header: Lowercase header with colon
+
+        Returns:
+            List of items
+        """
+        offsets = positions.get(header)
+        if not offsets:
+            return []
+
+        content = BLOCK_VALUE.match(text, offsets[0]).group(1)
+
+        # Cut before the first header that leaked into the value
+        # (a header right at the start of the value is left alone)
+        seen = set()
+        cut = None
+        for match in HEADER_PATTERN.finditer(content):
+            name = match.group(0).lower()
+            if name in seen:
+                continue
+            seen.add(name)
+            if match.start() > 0:
+                cut = match.start()
+                break
+        if cut is not None:
+            content = content[:cut]
+
+        content = LIST_BULLET.sub(',', content.replace('\n', ','))
+        return [item.strip() for item in content.split(',') if item.strip()]
+
+    @staticmethod
+    def _bullets(text: str, positions: Dict[str, List[int]], header: str) -> list:
+        """
+        Read a bulleted list section.
+
+        Args:
+            text: Normalized response
+            positions: Header offsets from tokenize()
+            header: Lowercase header without colon
+
+        Returns:
+            List of bullet texts
+        """
+        offsets = positions.get(header + ':', ())
+
+        content = None
+        # Bullets on the lines after the header
+        for pos in offsets:
+            match = BLOCK_AFTER_NEWLINE.match(text, pos)
+            if match:
+                content = match.group(1).strip()
+                break
+        # Bullets (or prose) starting on the header line
+        if not content and offsets:
+            content = BLOCK_VALUE.match(text, offsets[0]).group(1).strip()
+        if not content:
+            match = BULLET_FALLBACK[header].search(text)
+            content = match.group(1).strip() if match else None
+
+        if not content:
+            return []
+
+        bullets = []
+        for line in content.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+
+            # Stop at the next header
+            if LINE_HEADER.match(line):
+                break
+
+            # Remove common bullet markers (•, -, *, 1., etc.)
+            cleaned = BULLET_MARKER.sub('', line).strip()
+
+            # Skip very short or empty results
+            if cleaned and len(cleaned) > 3:
+                bullets.append(cleaned)
+
+        return bullets
+
+
+class IncrementalResponseParser:
+    """Report fields of a streamed text-template response as they complete"""
+
+    # Fields whose value is one line, by the header that introduces them
+    LINE_FIELDS = {
+        'name': 'name:', 'email': 'email:', 'phone': 'phone:', 'score': 'match score:',
+        'experience_years': 'experience years:', 'education': 'education:',
+        'summary': 'summary:', 'salary_estimate': 'salary estimate:'
+    }
+
+    # Fields spanning lines, complete once the next header starts
+    BLOCK_FIELDS = {
+        'matched_skills': 'matched skills:', 'missing_skills': 'missing skills:',
+        'strengths': 'key strengths:', 'concerns': 'concerns:'
+    }
+
+    def __init__(self, fields: Optional[List[str]] = None):
+        """
+        Start parsing a new response.
+
+        Args:
+            fields: Field names to report (default: all template fields)
+        """
+        self.pending = set(fields or list(self.LINE_FIELDS) + list(self.BLOCK_FIELDS))
+        self.fields: Dict[str, Any] = {}
+        self._parts: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        """True once every requested field has been reported"""
+        return not self.pending
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """
+        Add a chunk of streamed text.
+
+        Fields are only checked when a line ends, so a value is never
+        reported before the model has finished writing it.
+
+        Args:
+            chunk: Next piece of the response (e.g. one token)
+
+        Returns:
+            Fields completed by this chunk (empty if none), with the values
+            ResponseParser would give them
+        """
+        self._parts.append(chunk)
+        if '\n' not in chunk or not self.pending:
+            return {}
+
+        text = ''.join(self._parts)
+        text = text[:text.rfind('\n') + 1]
+        normalized, positions = ResponseParser.tokenize(text)
+        header_ends = sorted(pos for offsets in positions.values() for pos in offsets)
+
+        ready = []
+        for field in self.pending:
+            if field in self.LINE_FIELDS:
+                offsets = positions.get(self.LINE_FIELDS[field])
+                if offsets and NON_BLANK.match(normalized, offsets[0]):
+                    ready.append(field)
+            else:
+                offsets = positions.get(self.BLOCK_FIELDS[field])
+                if offsets and header_ends[-1] > offsets[0]:
+                    ready.append(field)
+
+        if not ready:
+            return {}
+
+        parsed = ResponseParser.parse(text)
+        completed = {field: parsed[field] for field in ready}
+        self.pending.difference_update(ready)
+        self.fields.update(completed)
+        return completed
@@ -0,0 +1,104 @@
+"""
+HTTP Session Pool
+
+Process-wide pool of keep-alive HTTP connections shared by every
+OllamaClient instance, so consecutive calls reuse TCP connections
+instead of opening a new one per request.
+"""
+import os
+import threading
+from typing import Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils.config import Config
+
+
+class SessionPool:
+    """Thread-safe holder for the shared requests.Session"""
+
+    _lock = threading.Lock()
+    _session = None
+    _adapter = None
+    _pid = None
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """
+        Get the shared session, creating it on first use.
+
+        A new session is created after a fork so worker processes never
+        share sockets with their parent.
+
+        Returns:
+            requests.Session mounted with a pooled adapter
+        """
+        if cls._session is not None and cls._pid == os.getpid():
+            return cls._session
+
+        with cls._lock:
+            if cls._session is None or cls._pid != os.getpid():
+                adapter = HTTPAdapter(
+                    pool_connections=Config.OLLAMA_POOL_CONNECTIONS,
+                    pool_maxsize=Config.OLLAMA_POOL_SIZE,
+                    pool_block=False
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+
+                cls._adapter = adapter
+                cls._session = session
+                cls._pid = os.getpid()
+
+        return cls._session
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """
+        Get connection reuse counters for the shared session.
+
+        Returns:
+            Dictionary with connections opened, requests sent and reuses
+        """
+        stats = {
+            'pool_size': Config.OLLAMA_POOL_SIZE,
+            'connections_opened': 0,
+            'requests_sent': 0,
+            'connections_reused': 0,
+            'hosts': {}
+        }
+
+        adapter = cls._adapter
+        if adapter is None or cls._pid != os.getpid():
+            return stats
+
+        pools = adapter.poolmanager.pools
+        with pools.lock:
+            host_pools = list(pools._container.items())
+
+        for key, pool in host_pools:
+            opened = pool.num_connections
+            sent = pool.num_requests
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            stats['hosts'][host] = {
+                'connections_opened': opened,
+                'requests_sent': sent,
+                'connections_reused': max(0, sent - opened)
+            }
+            stats['connections_opened'] += opened
+            stats['requests_sent'] += sent
+
+        stats['connections_reused'] = max(0, stats['requests_sent'] - stats['connections_opened'])
+        return stats
+
+    @classmethod
+    def reset(cls):
+        """Close the shared session and drop its connections"""
+        with cls._lock:
+            if cls._session is not None:
+                cls._session.close()
+            cls._session = None
+            cls._adapter = None
+            cls._pid = None
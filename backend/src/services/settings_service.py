@@ -10,7 +10,20 @@ class SettingsService:
     DEFAULT_SETTINGS = {
         'ollama_model': Config.OLLAMA_MODEL,
         'system_prompt': "",  # Empty means use default hardcoded prompt
-        'temperature': 0.2
+        'temperature': 0.2,
+        'stream_analysis': True,  # Stream tokens and stop once all fields are parsed
+        'structured_output': False,  # Ask Ollama for JSON matching ANALYSIS_SCHEMA
+        'prescreen_mode': 'off',  # off, reject (no LLM call) or deprioritize (analyze last)
+        'prescreen_cutoff': 0.1,  # Minimum share of job skills a CV must mention
+        'cascade_enabled': False,  # Score with a fast model first, re-score borderline ones
+        'cascade_fast_model': 'llama3.2:3b',
+        'cascade_band': [55, 80],  # Fast-model scores in this range go to the main model
+        'analysis_mode': 'full',  # full, or triage (score/contact first, details on demand)
+        'queue_order': 'upload',  # upload, or similarity (most similar CVs analyzed first)
+        'repair_fields': True,  # Re-ask only for missing/implausible fields instead of failing them
+        'cross_job_mode': 'off',  # off, propose, or auto (add new CVs to matching active jobs)
+        'cross_job_top_k': 3,
+        'cross_job_min_similarity': 0.6
     }
     
     @classmethod
@@ -0,0 +1,182 @@
+"""
+Telemetry Service
+
+Records the token counts and timings Ollama returns with every
+completion and aggregates them per job and model.
+
+Streams stopped early (the default analysis path) never receive Ollama's
+counters. Their prompt time is the time to the first token (model load
+plus prompt evaluation) and their output counts come from the chunks
+read; such rows are flagged as estimated.
+"""
+from typing import List, Optional, Dict, Any
+from src.database.db import get_db
+
+
+class TelemetryService:
+    """Service for LLM call telemetry"""
+
+    # Model loads longer than this (ns) count as a load stall
+    LOAD_STALL_NS = 1_000_000_000
+
+    @staticmethod
+    def record(candidate_id: Optional[int], job_id: Optional[int], model: str,
+               result: Dict[str, Any], stage: str = 'analysis',
+               prompt_version: Optional[str] = None) -> int:
+        """
+        Store the counters of one Ollama call.
+
+        Args:
+            candidate_id: Candidate the call was made for
+            job_id: Job the candidate belongs to
+            model: Model that served the call
+            result: Ollama result from OllamaClient.generate_full()
+            stage: Pipeline step that made the call (e.g. analysis)
+            prompt_version: Version hash of the prompt template used
+
+        Returns:
+            int: ID of the telemetry row
+        """
+        with get_db() as conn:
+            cursor = conn.execute('''
+                INSERT INTO llm_telemetry (
+                    candidate_id, job_id, model, stage, prompt_version, host, cached,
+                    stopped_early, done_reason, prompt_eval_count, eval_count,
+                    total_duration, load_duration, prompt_eval_duration, eval_duration,
+                    first_token_duration, estimated
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                candidate_id,
+                job_id,
+                model,
+                stage,
+                prompt_version,
+                result.get('host'),
+                1 if result.get('cached') else 0,
+                1 if result.get('stopped_early') else 0,
+                result.get('done_reason'),
+                result.get('prompt_eval_count'),
+                result.get('eval_count'),
+                result.get('total_duration'),
+                result.get('load_duration'),
+                result.get('prompt_eval_duration'),
+                result.get('eval_duration'),
+                result.get('first_token_duration'),
+                1 if result.get('estimated') else 0
+            ))
+            return cursor.lastrowid
+
+    @staticmethod
+    def get_by_candidate(candidate_id: int) -> List[Dict[str, Any]]:
+        """
+        Get all recorded calls for a candidate.
+
+        Args:
+            candidate_id: Candidate ID
+
+        Returns:
+            List of telemetry dictionaries, oldest first
+        """
+        with get_db() as conn:
+            rows = conn.execute(
+                'SELECT * FROM llm_telemetry WHERE candidate_id = ? ORDER BY id ASC',
+                (candidate_id,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+    @staticmethod
+    def get_job_summary(job_id: int) -> Dict[str, Any]:
+        """
+        Aggregate telemetry for a job, per model.
+
+        Cached calls are counted but excluded from token and timing sums,
+        since Ollama did no work for them. Prompt seconds include the
+        time-to-first-token estimates of early-stopped calls (counted in
+        estimated_calls); the prompt token rate only uses calls that
+        reported both count and duration.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Dictionary with per-model aggregates
+        """
+        with get_db() as conn:
+            rows = conn.execute('''
+                SELECT
+                    model,
+                    COUNT(*) as calls,
+                    SUM(cached) as cached_calls,
+                    SUM(CASE WHEN cached = 0 THEN stopped_early ELSE 0 END) as early_stops,
+                    SUM(CASE WHEN cached = 0 THEN estimated ELSE 0 END) as estimated_calls,
+                    SUM(CASE WHEN stage = 'repair' THEN 1 ELSE 0 END) as repairs,
+                    SUM(CASE WHEN cached = 0 THEN prompt_eval_count END) as prompt_tokens,
+                    SUM(CASE WHEN cached = 0 THEN eval_count END) as output_tokens,
+                    SUM(CASE WHEN cached = 0 THEN prompt_eval_duration END) as prompt_eval_ns,
+                    SUM(CASE WHEN cached = 0 THEN eval_duration END) as eval_ns,
+                    SUM(CASE WHEN cached = 0 THEN load_duration END) as load_ns,
+                    SUM(CASE WHEN cached = 0 THEN first_token_duration END) as first_token_ns,
+                    SUM(CASE WHEN cached = 0 AND first_token_duration IS NOT NULL
+                        THEN 1 ELSE 0 END) as first_token_calls,
+                    SUM(CASE WHEN cached = 0 THEN total_duration END) as total_ns,
+                    SUM(CASE WHEN cached = 0 AND load_duration > ? THEN 1 ELSE 0 END) as load_stalls,
+                    -- Token rates only from calls that report both count and duration
+                    SUM(CASE WHEN cached = 0 AND eval_duration > 0 THEN eval_count END) as timed_output_tokens,
+                    SUM(CASE WHEN cached = 0 AND prompt_eval_duration > 0
+                        THEN prompt_eval_count END) as timed_prompt_tokens,
+                    SUM(CASE WHEN cached = 0 AND prompt_eval_count > 0
+                        THEN prompt_eval_duration END) as timed_prompt_ns
+                FROM llm_telemetry
+                WHERE job_id = ?
+                GROUP BY model
+                ORDER BY calls DESC
+            ''', (TelemetryService.LOAD_STALL_NS, job_id)).fetchall()
+
+        models = [TelemetryService._summarize(dict(row)) for row in rows]
+
+        return {
+            'calls': sum(m['calls'] for m in models),
+            'repairs': sum(m['repairs'] for m in models),
+            'models': models
+        }
+
+    @staticmethod
+    def _summarize(row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert raw sums (nanoseconds) into readable rates and seconds.
+
+        Args:
+            row: Aggregated row for one model
+
+        Returns:
+            Summary dictionary
+        """
+        def seconds(ns) -> float:
+            return round((ns or 0) / 1e9, 2)
+
+        def rate(tokens, ns) -> Optional[float]:
+            return round(tokens / (ns / 1e9), 1) if tokens and ns else None
+
+        live_calls = row['calls'] - (row['cached_calls'] or 0)
+
+        return {
+            'model': row['model'],
+            'calls': row['calls'],
+            'cached_calls': row['cached_calls'] or 0,
+            'early_stops': row['early_stops'] or 0,
+            'estimated_calls': row['estimated_calls'] or 0,
+            'repairs': row['repairs'] or 0,
+            'prompt_tokens': row['prompt_tokens'] or 0,
+            'output_tokens': row['output_tokens'] or 0,
+            'prompt_eval_seconds': seconds(row['prompt_eval_ns']),
+            'generation_seconds': seconds(row['eval_ns']),
+            'load_seconds': seconds(row['load_ns']),
+            'total_seconds': seconds(row['total_ns']),
+            'load_stalls': row['load_stalls'] or 0,
+            'avg_first_token_seconds': (round(row['first_token_ns'] / 1e9 / row['first_token_calls'], 2)
+                                        if row['first_token_calls'] else None),
+            'prompt_tokens_per_second': rate(row['timed_prompt_tokens'], row['timed_prompt_ns']),
+            'output_tokens_per_second': rate(row['timed_output_tokens'], row['eval_ns']),
+            'avg_seconds_per_call': round(seconds(row['total_ns']) / live_calls, 2) if live_calls else None
+        }
@@ -30,8 +30,48 @@ class Config:
     
     # Ollama settings
     OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+    OLLAMA_HOSTS = os.getenv('OLLAMA_HOSTS', OLLAMA_HOST)  # comma-separated, calls are load balanced
+    OLLAMA_REPROBE_INTERVAL = int(os.getenv('OLLAMA_REPROBE_INTERVAL', 15))  # seconds between probes of ejected hosts
+    OLLAMA_PROBE_INTERVAL = int(os.getenv('OLLAMA_PROBE_INTERVAL', 10))  # seconds between health snapshots
     OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3')
     OLLAMA_TIMEOUT = int(os.getenv('OLLAMA_TIMEOUT', 120))  # seconds
+    OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', 10))  # keep-alive connections per host
+    OLLAMA_POOL_CONNECTIONS = int(os.getenv('OLLAMA_POOL_CONNECTIONS', 4))  # hosts kept in the pool
+    OLLAMA_NUM_PARALLEL = int(os.getenv('OLLAMA_NUM_PARALLEL', 1))  # candidates analyzed concurrently
+    OLLAMA_BACKOFF_BASE = float(os.getenv('OLLAMA_BACKOFF_BASE', 1))  # first retry delay, seconds
+    OLLAMA_BACKOFF_MAX = float(os.getenv('OLLAMA_BACKOFF_MAX', 30))  # retry delay cap, seconds
+    OLLAMA_BREAKER_THRESHOLD = int(os.getenv('OLLAMA_BREAKER_THRESHOLD', 3))  # consecutive failures to open
+    OLLAMA_BREAKER_COOLDOWN = float(os.getenv('OLLAMA_BREAKER_COOLDOWN', 15))  # first open period, seconds
+    OLLAMA_BREAKER_MAX_COOLDOWN = float(os.getenv('OLLAMA_BREAKER_MAX_COOLDOWN', 300))
+    OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')  # how long Ollama keeps the model loaded
+    
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024))  # 50MB default
+    
+    # Adaptive output budget: num_predict = percentile of observed output length x headroom
+    OUTPUT_BUDGET_PERCENTILE = float(os.getenv('OUTPUT_BUDGET_PERCENTILE', 95))
+    OUTPUT_BUDGET_HEADROOM = float(os.getenv('OUTPUT_BUDGET_HEADROOM', 1.25))
+    
+    # Prompt budget: CV tokens per prompt and the largest context window to request
+    PROMPT_CV_TOKENS = int(os.getenv('PROMPT_CV_TOKENS', 1200))
+    OLLAMA_NUM_CTX_MAX = int(os.getenv('OLLAMA_NUM_CTX_MAX', 8192))  # model's context length
+    
+    # Embeddings (CV-to-job similarity ranking)
+    OLLAMA_EMBED_MODEL = os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text')
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 16))
+    EMBEDDING_MAX_CHARS = int(os.getenv('EMBEDDING_MAX_CHARS', 8000))
+    
+    # Analysis queue (shared by all server processes through the database)
+    ANALYSIS_WORKER_ENABLED = os.getenv('ANALYSIS_WORKER_ENABLED', 'true').lower() == 'true'
+    QUEUE_LEASE_SECONDS = float(os.getenv('QUEUE_LEASE_SECONDS', 90))  # claim expires without heartbeats
+    QUEUE_HEARTBEAT_SECONDS = float(os.getenv('QUEUE_HEARTBEAT_SECONDS', 20))
+    QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', 3))  # lost leases before giving up
+    QUEUE_POLL_INTERVAL = float(os.getenv('QUEUE_POLL_INTERVAL', 2))  # seconds between claims when idle
+    # LLM analyses in flight across all processes (default: one per Ollama parallel slot)
+    QUEUE_MAX_INFLIGHT = int(os.getenv('QUEUE_MAX_INFLIGHT', 0)) or OLLAMA_NUM_PARALLEL
+    QUEUE_PRIORITY_TIMEOUT = float(os.getenv('QUEUE_PRIORITY_TIMEOUT', 60))  # wait for a re-analysis
+    QUEUE_DETAILS_TIMEOUT = float(os.getenv('QUEUE_DETAILS_TIMEOUT', 30))  # wait for triage details
     
     # Analysis settings
     CATEGORY_THRESHOLDS = {
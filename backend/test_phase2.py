@@ -4,10 +4,13 @@ Test script for Phase 2: Core CV Analysis Engine
 Tests PDF/image extraction and CV analysis.
 """
 import os
+import time
 from pathlib import Path
 from src.core.pdf_extractor import PDFExtractor
 from src.services.ollama_client import OllamaClient
 from src.services.cv_analyzer import CVAnalyzer
+from src.services.analysis_queue import AnalysisQueue
+from src.services.analysis_worker import AnalysisWorker
 from src.services.job_service import JobService
 from src.services.candidate_service import CandidateService
 
@@ -201,17 +204,27 @@ MIT (2007-2011)
     print()
     
     try:
-        result = analyzer.analyze_batch(job_id)
+        # Batches run through the durable queue and its worker threads
+        submitted = AnalysisWorker.submit(job_id)
+        print(f"   Queued {submitted['queued']} candidates, waiting for the analysis workers...")
+        while True:
+            counts = AnalysisQueue.get_counts(job_id)
+            if not counts['queued'] and not counts['leased']:
+                break
+            time.sleep(2)
+        
+        analyzed_count = len(CandidateService.get_by_job(job_id, status='analyzed'))
+        error_count = len(CandidateService.get_by_job(job_id, status='error'))
         
         print("\n" + "=" * 60)
         print("✅ Batch Analysis Complete!")
         print("=" * 60)
-        print(f"Total Candidates: {result['total']}")
-        print(f"Successfully Analyzed: {result['analyzed']}")
-        print(f"Errors: {result['errors']}")
+        print(f"Total Candidates: {len(candidate_ids)}")
+        print(f"Successfully Analyzed: {analyzed_count}")
+        print(f"Errors: {error_count}")
         
         # Show detailed results
-        if result['analyzed'] > 0:
+        if analyzed_count > 0:
             print("\n" + "-" * 60)
             print("CANDIDATE ANALYSIS RESULTS:")
             print("-" * 60)
@@ -233,7 +246,7 @@ MIT (2007-2011)
         print("\n" + "-" * 60)
         print("JOB STATISTICS:")
         print("-" * 60)
-        stats = result['stats']
+        stats = JobService.get_stats(job_id)
         print(f"📊 Total Candidates: {stats['total_candidates']}")
         print(f"   🟢 Excellent (85-100): {stats['excellent']}")
         print(f"   🟡 Good (70-84): {stats['good']}")
@@ -0,0 +1,35 @@
+"""
+Shared fixtures for tests that need a database
+"""
+import pytest
+
+import src.database.db as db
+from src.services.analysis_worker import AnalysisWorker
+from src.services.candidate_service import CandidateService
+from src.services.job_service import JobService
+from src.utils.config import Config
+
+
+@pytest.fixture
+def queue_db(tmp_path, monkeypatch):
+    """Fresh database file per test; no worker threads are started"""
+    monkeypatch.setattr(db, 'DATABASE_PATH', tmp_path / 'test.db')
+    monkeypatch.setattr(Config, 'QUEUE_MAX_INFLIGHT', 10)
+    monkeypatch.setattr(Config, 'QUEUE_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(Config, 'ANALYSIS_WORKER_ENABLED', False)
+    monkeypatch.setattr(AnalysisWorker, '_owner', 'test-worker')
+    monkeypatch.setattr(AnalysisWorker, '_inflight', {})
+    db.init_db()
+
+
+@pytest.fixture
+def make_job(queue_db):
+    """Factory creating a job with pending candidates; returns (job_id, candidate_ids)"""
+    def make(candidates=3):
+        job_id = JobService.create({
+            'title': 'Backend Developer', 'company': 'Acme', 'description': 'Build APIs.',
+            'requirements': ['Python'], 'skills': ['Python', 'Flask']
+        })
+        ids = [CandidateService.create_pending(job_id, f'cv{i}.pdf', f'CV {i}') for i in range(candidates)]
+        return job_id, ids
+    return make
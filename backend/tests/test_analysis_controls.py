@@ -0,0 +1,118 @@
+"""
+Tests for pausing, resuming and cancelling a job's analysis
+"""
+import threading
+
+import pytest
+from flask import Flask
+
+from src.api import analysis
+from src.services.analysis_queue import AnalysisQueue
+from src.services.analysis_worker import AnalysisWorker
+from src.services.candidate_service import CandidateService
+
+
+pytestmark = pytest.mark.usefixtures('queue_db')
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(analysis.bp)
+    return app.test_client()
+
+
+def test_paused_job_is_not_claimed_until_resumed(make_job):
+    paused_job, paused_ids = make_job(2)
+    other_job, other_ids = make_job(1)
+    AnalysisQueue.enqueue(paused_job, paused_ids)
+    AnalysisQueue.enqueue(other_job, other_ids)
+
+    assert AnalysisWorker.pause(paused_job)
+    assert AnalysisQueue.get_counts(paused_job)['paused']
+
+    # Only the other job's candidate is claimable
+    assert [row['candidate_id'] for row in AnalysisQueue.claim('w1', limit=5)] == other_ids
+    assert AnalysisQueue.claim('w1') == []
+    assert AnalysisQueue.get_counts(paused_job)['queued'] == 2
+
+    assert AnalysisWorker.resume(paused_job)
+    assert not AnalysisQueue.get_counts(paused_job)['paused']
+    assert [row['candidate_id'] for row in AnalysisQueue.claim('w1', limit=5)] == paused_ids
+
+
+def test_cancel_aborts_inflight_and_removes_queued_candidates(make_job):
+    job_id, ids = make_job(3)
+    AnalysisQueue.enqueue(job_id, ids)
+    claimed = AnalysisQueue.claim(AnalysisWorker._owner)
+    cancel = threading.Event()
+    AnalysisWorker._inflight[claimed[0]['candidate_id']] = cancel
+
+    result = AnalysisWorker.cancel(job_id)
+
+    assert result == {'job_id': job_id, 'removed': 2, 'aborted': 1}
+    assert cancel.is_set()
+    assert AnalysisQueue.get_counts(job_id)['queued'] == 0
+    assert AnalysisQueue.get_counts(job_id)['leased'] == 0
+    assert AnalysisQueue.held(AnalysisWorker._owner, ids) == []
+    for candidate_id in ids:
+        candidate = CandidateService.get_by_id(candidate_id)
+        assert candidate['status'] == 'pending'
+        assert candidate['error_message'] is None
+
+
+def test_cancelled_paused_job_can_be_started_again(make_job):
+    job_id, ids = make_job(2)
+    AnalysisQueue.enqueue(job_id, ids)
+    AnalysisWorker.pause(job_id)
+    AnalysisWorker.cancel(job_id)
+
+    AnalysisQueue.enqueue(job_id, ids)
+    assert not AnalysisQueue.get_counts(job_id)['paused']
+    assert len(AnalysisQueue.claim('w1', limit=5)) == 2
+
+
+def test_pause_without_queued_work_returns_400(client, make_job):
+    job_id, _ = make_job(1)
+
+    response = client.post(f'/api/jobs/{job_id}/analyze/pause')
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+def test_resume_of_job_that_is_not_paused_returns_400(client, make_job):
+    job_id, ids = make_job(1)
+    AnalysisQueue.enqueue(job_id, ids)
+
+    response = client.post(f'/api/jobs/{job_id}/analyze/resume')
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+def test_pause_and_resume_endpoints(client, make_job):
+    job_id, ids = make_job(2)
+    AnalysisQueue.enqueue(job_id, ids)
+
+    response = client.post(f'/api/jobs/{job_id}/analyze/pause')
+    assert response.status_code == 200
+    assert response.get_json()['data']['queue']['paused']
+
+    response = client.post(f'/api/jobs/{job_id}/analyze/resume')
+    assert response.status_code == 200
+    assert not response.get_json()['data']['queue']['paused']
+
+
+def test_reanalysis_of_a_cancelled_job_returns_409(client, make_job):
+    job_id, ids = make_job(1)
+    # No worker runs: the priority entry waits until the job is cancelled
+    timer = threading.Timer(0.5, AnalysisWorker.cancel, args=(job_id,))
+    timer.start()
+
+    response = client.post(f'/api/candidates/{ids[0]}/analyze')
+    timer.join()
+
+    assert response.status_code == 409
+    assert not AnalysisQueue.is_queued(ids[0])
+    assert CandidateService.get_by_id(ids[0])['status'] == 'pending'
@@ -0,0 +1,162 @@
+"""
+Tests for the durable SQLite analysis queue
+"""
+import threading
+import time
+
+import pytest
+
+from src.database.db import get_db
+from src.services.analysis_progress import AnalysisProgress
+from src.services.analysis_queue import AnalysisQueue
+from src.services.candidate_service import CandidateService
+from src.utils.config import Config
+
+
+pytestmark = pytest.mark.usefixtures('queue_db')
+
+
+def expire_leases():
+    with get_db() as conn:
+        conn.execute("UPDATE analysis_queue SET lease_expires_at = ? WHERE status = 'leased'",
+                     (time.time() - 1,))
+
+
+def test_enqueue_is_idempotent(make_job):
+    job_id, ids = make_job()
+
+    assert AnalysisQueue.enqueue(job_id, ids) == 3
+    assert AnalysisQueue.enqueue(job_id, ids) == 0
+    assert AnalysisQueue.enqueue(job_id, list(reversed(ids))) == 0
+
+    assert AnalysisQueue.get_counts(job_id)['queued'] == 3
+    # Candidates that were already queued keep their place
+    assert [row['candidate_id'] for row in AnalysisQueue.claim('w1', limit=3)] == ids
+
+
+def test_claim_respects_inflight_cap(monkeypatch, make_job):
+    monkeypatch.setattr(Config, 'QUEUE_MAX_INFLIGHT', 2)
+    job_id, ids = make_job()
+    AnalysisQueue.enqueue(job_id, ids)
+
+    assert len(AnalysisQueue.claim('w1', limit=3)) == 2
+    assert AnalysisQueue.claim('w2') == []
+
+    AnalysisQueue.complete(ids[0], 'w1')
+    assert [row['candidate_id'] for row in AnalysisQueue.claim('w2')] == [ids[2]]
+
+
+def test_concurrent_claims_never_share_a_candidate(make_job):
+    job_id, ids = make_job(10)
+    AnalysisQueue.enqueue(job_id, ids)
+
+    claimed = {}
+    def worker(owner):
+        claimed[owner] = [row['candidate_id'] for row in AnalysisQueue.claim(owner, limit=10)]
+
+    threads = [threading.Thread(target=worker, args=(f'w{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_claimed = [cid for rows in claimed.values() for cid in rows]
+    assert sorted(all_claimed) == sorted(ids)
+
+
+def test_heartbeat_and_held_track_the_lease_owner(make_job):
+    job_id, ids = make_job(2)
+    AnalysisQueue.enqueue(job_id, ids)
+    AnalysisQueue.claim('w1', limit=2)
+
+    assert AnalysisQueue.heartbeat('w1', ids) == 2
+    assert AnalysisQueue.heartbeat('w2', ids) == 0
+    assert AnalysisQueue.held('w1', ids) == ids
+    assert AnalysisQueue.held('w2', ids) == []
+
+
+def test_expired_lease_is_claimed_again(make_job):
+    job_id, ids = make_job(1)
+    AnalysisQueue.enqueue(job_id, ids)
+    AnalysisQueue.claim('w1')
+
+    # Lease still valid: nothing to claim
+    assert AnalysisQueue.claim('w2') == []
+
+    expire_leases()
+    claimed = AnalysisQueue.claim('w2')
+    assert [row['candidate_id'] for row in claimed] == ids
+    assert claimed[0]['attempts'] == 2
+
+    # The first worker lost its lease and can't settle the entry any more
+    assert AnalysisQueue.held('w1', ids) == []
+    assert not AnalysisQueue.complete(ids[0], 'w1')
+    assert AnalysisQueue.complete(ids[0], 'w2')
+    assert not AnalysisQueue.is_queued(ids[0])
+
+
+def test_restart_resumes_leases_of_a_dead_worker(make_job):
+    job_id, ids = make_job(3)
+    AnalysisQueue.enqueue(job_id, ids)
+    AnalysisQueue.claim('old-process', limit=2)
+
+    # The process dies: its leases are never renewed and expire
+    expire_leases()
+    assert AnalysisQueue.get_summary() == {'queued': 1, 'leased': 0, 'expired': 2}
+
+    resumed = AnalysisQueue.claim('new-process', limit=3)
+    assert sorted(row['candidate_id'] for row in resumed) == sorted(ids)
+    assert AnalysisQueue.get_summary() == {'queued': 0, 'leased': 3, 'expired': 0}
+
+
+def test_release_does_not_count_the_attempt(make_job):
+    job_id, ids = make_job(1)
+    AnalysisQueue.enqueue(job_id, ids)
+    AnalysisQueue.claim('w1')
+
+    assert AnalysisQueue.release(ids[0], 'w1')
+    assert AnalysisQueue.claim('w1')[0]['attempts'] == 1
+
+
+def test_candidate_is_abandoned_after_max_attempts(make_job):
+    job_id, ids = make_job(1)
+    AnalysisQueue.enqueue(job_id, ids)
+
+    for attempt in range(1, Config.QUEUE_MAX_ATTEMPTS + 1):
+        claimed = AnalysisQueue.claim(f'w{attempt}')
+        assert claimed[0]['attempts'] == attempt
+        expire_leases()
+
+    assert AnalysisQueue.claim('w-last') == []
+    assert not AnalysisQueue.is_queued(ids[0])
+
+    candidate = CandidateService.get_by_id(ids[0])
+    assert candidate['status'] == 'error'
+    assert f'{Config.QUEUE_MAX_ATTEMPTS} attempts' in candidate['error_message']
+
+
+def test_progress_is_stored_on_the_leased_entry(make_job):
+    job_id, ids = make_job(2)
+    AnalysisQueue.enqueue(job_id, ids)
+    AnalysisQueue.claim('w1')
+
+    AnalysisProgress.start(job_id, ids[0], 'llama3')
+    AnalysisProgress.update(job_id, ids[0], {'name': 'Jane Doe'})
+    AnalysisProgress.update(job_id, ids[0], {'score': 82})
+    # Not leased: nothing is in flight for it
+    AnalysisProgress.start(job_id, ids[1], 'llama3')
+
+    in_flight = AnalysisProgress.get(job_id)
+    assert [entry['candidate_id'] for entry in in_flight] == [ids[0]]
+    assert in_flight[0]['model'] == 'llama3'
+    assert in_flight[0]['fields'] == {'name': 'Jane Doe', 'score': 82}
+
+    # A dead worker's partial fields are hidden, then dropped when re-claimed
+    expire_leases()
+    assert AnalysisProgress.get(job_id) == []
+    assert len(AnalysisQueue.claim('w2', limit=2)) == 2
+    assert AnalysisProgress.get(job_id) == []
+
+    AnalysisProgress.start(job_id, ids[0], 'llama3')
+    AnalysisProgress.clear(job_id, ids[0])
+    assert AnalysisProgress.get(job_id) == []
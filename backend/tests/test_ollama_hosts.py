@@ -0,0 +1,165 @@
+"""
+Tests for balancing over several Ollama hosts, ejecting dead hosts and
+the circuit breaker's half-open probe, against local stub servers
+"""
+import json
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from src.services.circuit_breaker import CircuitBreaker, OllamaUnavailableError
+from src.services.host_balancer import HostBalancer
+from src.services.ollama_client import OllamaClient
+from src.utils.config import Config
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    """Answers /api/tags and /api/generate; drops the connection while down"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        if self.server.down:
+            self.close_connection = True
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.probes += 1
+        time.sleep(self.server.delay)
+        self._reply({'models': [{'name': 'llama3'}]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.delay)
+        if not self.server.down:
+            self.server.generated += 1
+        self._reply({'response': 'ok', 'done': True, 'done_reason': 'stop', 'eval_count': 1})
+
+
+@pytest.fixture
+def stub_hosts(monkeypatch):
+    """Start three stub hosts; returns their servers"""
+    # Ejected hosts stay out of rotation for the whole test
+    monkeypatch.setattr(Config, 'OLLAMA_REPROBE_INTERVAL', 60)
+    monkeypatch.setattr(Config, 'OLLAMA_BACKOFF_BASE', 0.01)
+
+    servers = []
+    for _ in range(3):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllama)
+        server.daemon_threads = True
+        server.down = False
+        server.delay = 0.0
+        server.probes = server.generated = 0
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def dead_url():
+    """URL of a port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{sock.getsockname()[1]}'
+
+
+def generate(client):
+    return client.generate_full('prompt', use_cache=False)
+
+
+def test_hosts_come_from_config(monkeypatch, stub_hosts):
+    monkeypatch.setattr(Config, 'OLLAMA_HOSTS', ','.join(url(s) for s in stub_hosts))
+
+    assert OllamaClient(model='llama3').hosts == [url(s) for s in stub_hosts]
+
+
+def test_concurrent_calls_are_spread_over_hosts(monkeypatch, stub_hosts):
+    # Enough request slots for all calls to be in flight at once
+    monkeypatch.setattr(HostBalancer, '_slots', threading.BoundedSemaphore(6))
+    for server in stub_hosts:
+        server.delay = 0.3
+    client = OllamaClient(host=[url(s) for s in stub_hosts], model='llama3')
+
+    threads = [threading.Thread(target=generate, args=(client,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [server.generated for server in stub_hosts] == [2, 2, 2]
+    assert all(status['outstanding'] == 0 for status in client.balancer.get_status())
+
+
+def test_dead_host_is_ejected_and_load_moves_to_the_others(stub_hosts):
+    dead = dead_url()
+    live = stub_hosts[:2]
+    client = OllamaClient(host=[dead] + [url(s) for s in live], model='llama3')
+
+    results = [generate(client) for _ in range(12)]
+
+    assert all(result['response'] == 'ok' for result in results)
+    assert [server.generated for server in live] == [6, 6]
+    assert client.balancer.healthy_hosts() == [url(s) for s in live]
+    # One failure is below the threshold: the breaker stays closed
+    assert client.breaker.get_status()['state'] == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_fails_fast_then_closes_after_one_probe(monkeypatch, stub_hosts):
+    monkeypatch.setattr(Config, 'OLLAMA_BREAKER_THRESHOLD', 2)
+    monkeypatch.setattr(Config, 'OLLAMA_BREAKER_COOLDOWN', 0.2)
+    monkeypatch.setattr(Config, 'OLLAMA_BREAKER_MAX_COOLDOWN', 0.2)
+    for server in stub_hosts:
+        server.down = True
+    client = OllamaClient(host=[url(s) for s in stub_hosts], model='llama3')
+
+    # Two connection failures open the breaker; the third attempt is not sent
+    with pytest.raises(OllamaUnavailableError):
+        generate(client)
+    assert client.breaker.get_status()['state'] == CircuitBreaker.OPEN
+
+    # While open, calls fail without reaching any host
+    with pytest.raises(OllamaUnavailableError):
+        generate(client)
+    assert sum(server.probes for server in stub_hosts) == 0
+
+    for server in stub_hosts:
+        server.down = False
+        server.delay = 0.2
+    time.sleep(0.25)
+
+    # After the cooldown one caller probes (half-open); the other fails fast meanwhile
+    outcomes = []
+    def call():
+        try:
+            outcomes.append(generate(client)['response'])
+        except OllamaUnavailableError:
+            outcomes.append('unavailable')
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ['ok', 'unavailable']
+    assert client.breaker.get_status()['state'] == CircuitBreaker.CLOSED
+    assert generate(client)['response'] == 'ok'
@@ -0,0 +1,68 @@
+"""
+Tests for JobPromptSession prefix-reuse accounting
+"""
+from src.services.prompt_session import JobPromptSession
+
+
+class FakeOllama:
+    """Answers the priming call with fixed counters"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def generate_full(self, **kwargs):
+        self.calls.append(kwargs)
+        return dict(self.result)
+
+
+PREFIX = 'Job details. ' * 200  # 2,600 characters
+CV = 'Candidate CV text. ' * 100  # 1,900 characters
+
+
+def primed_session():
+    # Cold prefix: 650 tokens in 650 ms (0.25 ms per character)
+    ollama = FakeOllama({'response': '.', 'prompt_eval_count': 650, 'prompt_eval_duration': 650_000_000})
+    session = JobPromptSession(ollama, PREFIX)
+    assert session.prime(temperature=0.3)
+    return session
+
+
+def test_record_counts_hit_from_prompt_eval_count():
+    session = primed_session()
+
+    session.record({'response': 'x', 'prompt_eval_count': 480})   # only the CV evaluated
+    session.record({'response': 'x', 'prompt_eval_count': 1130})  # prefix evaluated again
+
+    stats = session.get_stats()
+    assert stats['measured_calls'] == 2
+    assert stats['cache_hits'] == 1
+    assert stats['saved_tokens'] == 650
+
+
+def test_record_counts_hit_from_first_token_time_when_stream_was_cut():
+    session = primed_session()
+    prompt = PREFIX + CV
+    # Cold would be ~(2600 + 1900) * 0.25 ms = 1125 ms; a hit only pays for the CV (~475 ms)
+    early_stop = {'response': 'x', 'stopped_early': True, 'estimated': ['prompt_eval_duration']}
+
+    session.record({**early_stop, 'first_token_duration': 500_000_000}, prompt)
+    session.record({**early_stop, 'first_token_duration': 1_150_000_000}, prompt)
+
+    stats = session.get_stats()
+    assert stats['calls'] == 2
+    assert stats['measured_calls'] == 2
+    assert stats['cache_hits'] == 1
+    assert stats['saved_tokens'] == 650
+
+
+def test_record_skips_cached_and_unmeasurable_results():
+    session = primed_session()
+
+    session.record({'response': 'x', 'cached': True, 'prompt_eval_count': 10})
+    session.record({'response': 'x', 'stopped_early': True})
+
+    stats = session.get_stats()
+    assert stats['calls'] == 2
+    assert stats['measured_calls'] == 0
+    assert stats['cache_hits'] == 0
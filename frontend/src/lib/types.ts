@@ -75,7 +75,7 @@ export interface Education {
 export interface AnalysisProgress {
     job_id: number;
     job_title: string;
-    analysis_status: 'no_candidates' | 'pending' | 'in_progress' | 'complete';
+    analysis_status: 'no_candidates' | 'pending' | 'in_progress' | 'paused' | 'complete';
     progress_percentage: number;
     total_candidates: number;
     analyzed: number;